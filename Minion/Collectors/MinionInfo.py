@@ -56,6 +56,38 @@ def LatestTaskInfo(NamespaceID):
         pass
 
 
+# Returns coalescing stats for a namespace as: packets sent,datapoints sent,avg ms waited,max ms waited
+def CoalesceStats(NamespaceID):
+    try:
+        objNamespace = Namespace.GetNamespace(NamespaceID)
+        if None != objNamespace:
+            stats = objNamespace.GetCoalesceStats()
+            if None == stats:
+                return "Coalescing not enabled"
+
+            packets,datapoints,avgDelay,maxDelay = stats
+            return str(packets) + "," + str(datapoints) + "," + "{0:.2f}".format(avgDelay) + "," + str(maxDelay)
+
+    except Exception as Ex:
+        pass
+
+
+# Returns how late a collector has been collected vs. when it was due as: collections,avg ms late,max ms late,last ms late
+def CollectorLateness(NamespaceID,CollectorID):
+    try:
+        objNamespace = Namespace.GetNamespace(NamespaceID)
+        if None != objNamespace:
+            stats = objNamespace.GetCollectorLateness(CollectorID)
+            if None == stats:
+                return "No collections yet"
+
+            count,avgLate,maxLate,lastLate = stats
+            return str(count) + "," + "{0:.2f}".format(avgLate) + "," + str(maxLate) + "," + str(lastLate)
+
+    except Exception as Ex:
+        pass
+
+
 # Simply returns how long in seconds Minion has been running
 def MinionUptime():
     if not hasattr(MinionUptime, "uptime_start"):
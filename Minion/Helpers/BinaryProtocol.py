@@ -0,0 +1,168 @@
+##############################################################################
+#  Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+##############################################################################
+#    File Abstract:
+#    Compact binary encoding of datapoints sent from Minion to Oscar.
+#    Only used once both ends have agreed to it (see <BinaryVersion> in the
+#    ConnectionInformation and Capabilities packets), XML is the fallback.
+#    Same file lives in both Minion and Oscar.
+#
+#    Packet layout (network byte order):
+#       Header:  Magic (2 bytes) Version (1 byte) PacketNumber (4 bytes)
+#       Records: one or more of
+#          Namespace definition: Type(1) Index(2) Length(2) utf-8 Namespace
+#          ID definition:        Type(1) Index(2) Length(2) utf-8 ID
+#          Datapoint:            Type(1) NamespaceIndex(2) IDIndex(2)
+#                                ElapsedTime(4) Normalized(1) Length(4) utf-8 Value
+#
+#    A Namespace or ID string is sent once (and re-sent periodically, this is
+#    UDP after all), after that only the index is sent.
+##############################################################################
+import struct
+import threading
+from Util import Time
+
+MAGIC = b'\x00\xbf'  # XML packets always start with '<' or whitespace, so never confused
+VERSION = 1
+
+RECORD_NAMESPACE = 1
+RECORD_ID = 2
+RECORD_DATA = 3
+
+MAX_INDEX = 0xFFFF
+
+_HeaderFormat = struct.Struct('!2sBI')
+_DefinitionFormat = struct.Struct('!BHH')
+_DataFormat = struct.Struct('!BHHIBI')
+
+def IsBinaryPacket(rawData):
+    return isinstance(rawData,bytes) and rawData[:len(MAGIC)] == MAGIC
+
+def CreatePacket(records,packetNumber):
+    return _HeaderFormat.pack(MAGIC,VERSION,packetNumber & 0xFFFFFFFF) + records
+
+# Minion side - one per Namespace, turns datapoints into binary records
+class Encoder(object):
+    DictionaryRefreshInterval = 5000 # re-announce the dictionary every so often in case a definition was lost
+
+    def __init__(self):
+        self.__Lock = threading.Lock()
+        self.__NamespaceMap = {}
+        self.__IDMap = {}
+        self.__Announced = set()
+        self.__LastAnnounceReset = Time.GetCurrMS()
+
+    # forces all dictionary entries to be sent again, like when Oscar asks for a refresh
+    def Reset(self):
+        with self.__Lock:
+            self.__Announced = set()
+            self.__LastAnnounceReset = Time.GetCurrMS()
+
+    def __GetIndex(self,strValue,indexMap,recordType,records):
+        key = (recordType,strValue)
+        if strValue in indexMap:
+            index = indexMap[strValue]
+        else:
+            index = len(indexMap)
+            if index > MAX_INDEX:
+                return None
+            indexMap[strValue] = index
+
+        if not key in self.__Announced:
+            encoded = strValue.encode('utf-8')
+            records.append(_DefinitionFormat.pack(recordType,index,len(encoded)))
+            records.append(encoded)
+            self.__Announced.add(key)
+
+        return index
+
+    # returns the binary records for a single datapoint, or None if it can't be encoded (caller should use XML)
+    def EncodeDatapoint(self,namespace,ID,value,elapsedTime,normalized):
+        records = []
+        encodedValue = str(value).encode('utf-8')
+        with self.__Lock:
+            if self.__LastAnnounceReset + Encoder.DictionaryRefreshInterval < Time.GetCurrMS():
+                self.__Announced = set()
+                self.__LastAnnounceReset = Time.GetCurrMS()
+
+            nsIndex = self.__GetIndex(namespace,self.__NamespaceMap,RECORD_NAMESPACE,records)
+            idIndex = self.__GetIndex(ID,self.__IDMap,RECORD_ID,records)
+
+        if None == nsIndex or None == idIndex:
+            return None
+
+        elapsedTime = min(max(int(elapsedTime),0),0xFFFFFFFF)
+        records.append(_DataFormat.pack(RECORD_DATA,nsIndex,idIndex,elapsedTime,1 if normalized else 0,len(encodedValue)))
+        records.append(encodedValue)
+
+        return b''.join(records)
+
+# Oscar side - one per sending Minion namespace socket, turns a packet back into datapoints
+class Decoder(object):
+    def __init__(self):
+        self.__Namespaces = {}
+        self.__IDs = {}
+
+    # returns a tuple of ([(Namespace,ID,Value,ElapsedTime,Normalized),...] , # of datapoints that referred to unknown dictionary entries)
+    # raises ValueError if the packet is malformed
+    def Decode(self,rawData):
+        try:
+            magic,version,_ = _HeaderFormat.unpack_from(rawData,0)
+        except struct.error:
+            raise ValueError("Binary packet too short for header")
+
+        if magic != MAGIC or version > VERSION:
+            raise ValueError("Unsupported binary packet version: " + str(version))
+
+        datapoints = []
+        unknownCount = 0
+        offset = _HeaderFormat.size
+        dataLen = len(rawData)
+
+        try:
+            while offset < dataLen:
+                recordType = rawData[offset]
+                if RECORD_DATA == recordType:
+                    _,nsIndex,idIndex,elapsedTime,normalized,valueLen = _DataFormat.unpack_from(rawData,offset)
+                    offset += _DataFormat.size
+                    value = rawData[offset:offset+valueLen].decode('utf-8')
+                    offset += valueLen
+
+                    if nsIndex in self.__Namespaces and idIndex in self.__IDs:
+                        datapoints.append((self.__Namespaces[nsIndex],self.__IDs[idIndex],value,elapsedTime,1 == normalized))
+                    else:
+                        unknownCount += 1
+
+                elif RECORD_NAMESPACE == recordType or RECORD_ID == recordType:
+                    _,index,strLen = _DefinitionFormat.unpack_from(rawData,offset)
+                    offset += _DefinitionFormat.size
+                    strValue = rawData[offset:offset+strLen].decode('utf-8')
+                    offset += strLen
+
+                    if RECORD_NAMESPACE == recordType:
+                        self.__Namespaces[index] = strValue
+                    else:
+                        self.__IDs[index] = strValue
+
+                else:
+                    raise ValueError("Unknown binary record type: " + str(recordType))
+
+        except (struct.error,UnicodeDecodeError) as Ex:
+            raise ValueError("Truncated or corrupt binary packet: " + str(Ex))
+
+        if offset != dataLen:
+            raise ValueError("Truncated binary packet")
+
+        return (datapoints,unknownCount)
@@ -0,0 +1,150 @@
+##############################################################################
+#  Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+##############################################################################
+#    File Abstract:
+#    Packs datapoints from a namespace into as few packets as possible.
+#    A packet is sent when it is full (MTU) or when the oldest datapoint in
+#    it has waited the coalesce interval, whichever comes first.
+##############################################################################
+import threading
+from Helpers import ThreadManager
+from Util import Time
+
+XML_HEADER = "<?xml version=\"1.0\" encoding=\"utf-8\"?>"
+XML_GROUP_START = "<MinionGroup>"
+XML_GROUP_END = "</MinionGroup>"
+
+# datapoints from inside a <MinionGroup>, Oscar doesn't allow a group within a group
+def _GroupBody(buffer):
+    if buffer.startswith(XML_GROUP_START) and buffer.endswith(XML_GROUP_END):
+        return buffer[len(XML_GROUP_START):-len(XML_GROUP_END)]
+    return buffer
+
+class Coalescer(object):
+    _XMLOverhead = len(XML_HEADER) + len(XML_GROUP_START) + len(XML_GROUP_END)
+    _BinaryOverhead = 7  # binary packet header
+
+    def __init__(self,objNamespace,Interval,MaxSize):
+        self._NamespaceObject = objNamespace
+        self._Interval = Interval  # ms the oldest datapoint may wait
+        self._MaxSize = MaxSize    # max packet payload size
+        self.__Lock = threading.Condition()
+        self.__Pending = []
+        self.__PendingSize = 0
+        self.__FirstQueuedTime = 0
+        self.__ThreadName = None
+
+        self.__PacketsSent = 0
+        self.__DatapointsSent = 0
+        self.__TotalDelay = 0
+        self.__MaxDelay = 0
+
+    def Start(self):
+        self.__ThreadName = "Coalescer:" + str(self._NamespaceObject)
+        ThreadManager.GetThreadManager().CreateThread(self.__ThreadName,self.__WorkerProc)
+        ThreadManager.GetThreadManager().StartThread(self.__ThreadName)
+
+    # returns (packets sent, datapoints sent, average ms oldest datapoint waited, max ms waited)
+    def GetStats(self):
+        with self.__Lock:
+            if self.__PacketsSent > 0:
+                avgDelay = float(self.__TotalDelay) / self.__PacketsSent
+            else:
+                avgDelay = 0.0
+
+            return (self.__PacketsSent,self.__DatapointsSent,avgDelay,self.__MaxDelay)
+
+    def __Overhead(self,buffer):
+        if isinstance(buffer,str):
+            return Coalescer._XMLOverhead
+        return Coalescer._BinaryOverhead
+
+    # must hold the lock, returns a ready to send packet of everything pending
+    def __TakePending(self):
+        pending = self.__Pending
+        delay = Time.GetCurrMS() - self.__FirstQueuedTime
+
+        self.__Pending = []
+        self.__PendingSize = 0
+
+        self.__PacketsSent += 1
+        self.__DatapointsSent += len(pending)
+        self.__TotalDelay += delay
+        if delay > self.__MaxDelay:
+            self.__MaxDelay = delay
+
+        if not isinstance(pending[0],str): # binary records just get strung together
+            return b''.join(pending)
+
+        if 1 == len(pending):
+            return XML_HEADER + pending[0]
+
+        return XML_HEADER + XML_GROUP_START + "".join([_GroupBody(buffer) for buffer in pending]) + XML_GROUP_END
+
+    # queue up a datapoint (or group) buffer, without the xml header
+    def Add(self,buffer):
+        toSend = []
+        size = len(buffer)
+        if isinstance(buffer,str) and buffer.startswith(XML_GROUP_START): # group tags are already in the overhead
+            size -= len(XML_GROUP_START) + len(XML_GROUP_END)
+
+        with self.__Lock:
+            if len(self.__Pending) > 0:
+                if type(buffer) != type(self.__Pending[0]) or self.__PendingSize + size + self.__Overhead(buffer) > self._MaxSize:
+                    toSend.append(self.__TakePending()) # doesn't fit, or encoding changed, so send what we have
+
+            if 0 == len(self.__Pending):
+                self.__FirstQueuedTime = Time.GetCurrMS()
+                self.__Lock.notify()
+
+            self.__Pending.append(buffer)
+            self.__PendingSize += size
+
+            if self.__PendingSize + self.__Overhead(buffer) >= self._MaxSize:
+                toSend.append(self.__TakePending())
+
+        retVal = True
+        for packet in toSend:
+            if not self._NamespaceObject.SendPacket(packet):
+                retVal = False
+
+        return retVal
+
+    # sends everything pending once the oldest has waited long enough
+    def __WorkerProc(self,fnKillSignalled,userData):
+        while not fnKillSignalled():
+            packet = None
+            with self.__Lock:
+                if 0 == len(self.__Pending):
+                    self.__Lock.wait(0.25) # wake up once in a while to check if signalled to exit
+                    continue
+
+                remaining = self.__FirstQueuedTime + self._Interval - Time.GetCurrMS()
+                if remaining > 0:
+                    self.__Lock.wait(float(remaining)/1000.0)
+                    continue
+
+                packet = self.__TakePending()
+
+            self._NamespaceObject.SendPacket(packet)
+
+        with self.__Lock: # send anything left over
+            if len(self.__Pending) > 0:
+                packet = self.__TakePending()
+            else:
+                packet = None
+
+        if None != packet:
+            self._NamespaceObject.SendPacket(packet)
@@ -42,6 +42,9 @@ class Collector:
         self._OverrideID = ID
         self._ScriptName = ''
         self._ScriptActive = False
+        self._Persistent = False # script stays running, see Worker.PersistentProcess
+        self._PersistentTimeout = Worker.PersistentProcess.DefaultTimeout
+        self._LaunchArgs = [] # <Param Launch="True">, command line for a persistent script
         self._Normalize = False
         self._NormalizeValue = 0
         self._SendOnlyOnDelta = False
@@ -305,6 +308,12 @@ class Collector:
             namespaceStr = str(self._NamespaceObject)
         else:
             namespaceStr = self._NamespaceOverride
+
+        if self._NamespaceObject.UseBinaryEncoding(): # Oscar understands binary, so send that instead
+            buffer = self._NamespaceObject.EncodeBinaryDatapoint(namespaceStr,self.GetTransmitID(),value,elapsedtime,normalized)
+            if None != buffer:
+                return buffer
+
         buffer = ""
         buffer = buffer + "<Minion Type=\"Data\">"
         buffer = buffer + "<Version>1</Version>"
@@ -339,7 +348,10 @@ class Collector:
                 if not self._VerifyParams(self._Parameters):
                     return None  
 
-                collectedValue = Worker.Worker.RunScript(self._ScriptName,self._Parameters)
+                if self._Persistent:
+                    collectedValue = Worker.Worker.RunPersistentScript(self._ScriptName,self._LaunchArgs,self._Parameters,self._PersistentTimeout)
+                else:
+                    collectedValue = Worker.Worker.RunScript(self._ScriptName,self._Parameters)
                 return str(collectedValue)
             except Exception as Ex:
                 Log.getLogger().error("Error Calling: " + self._ScriptName + ": " + str(Ex))
@@ -493,9 +505,7 @@ class Collector:
             TimeToCollect = Time.GetCurrMS() - startCollectionTime
             #print(TimeToCollect)
             if None != buffer:
-                buffer = "<?xml version=\"1.0\" encoding=\"utf-8\"?>" + buffer
-                
-                if not  self._NamespaceObject.SendPacket(buffer):
+                if not  self._NamespaceObject.SendData(buffer): # namespace adds xml header, may pack with other data
                     return 0
 
                 #self._NamespaceObject.CheckMTU(len(buffer),self._MinionID)
@@ -549,9 +559,7 @@ class Collector:
         buffer = self.PerformCollection()
 
         if None != buffer:
-            buffer = "<?xml version=\"1.0\" encoding=\"utf-8\"?>" + buffer
-
-        self._NamespaceObject.SendPacket(buffer)
+            self._NamespaceObject.SendData(buffer)
 
         if params != []:
             self._Parameters = origParams.copy() #restore original params
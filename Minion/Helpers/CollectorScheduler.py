@@ -0,0 +1,166 @@
+##############################################################################
+#  Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+##############################################################################
+#    File Abstract:
+#    Runs the collectors for one namespace process thread.  Keeps a heap of
+#    when each collector is next due, sleeps until the earliest one and only
+#    touches collectors that are due.  Tracks how late each collection was.
+##############################################################################
+import heapq
+import threading
+from Helpers import Log
+from Util import Time
+from Util import Sleep
+
+class CollectorScheduler(object):
+    MaxIdleWait = 250     # ms, wake up at least this often to check if signalled to exit
+    RecheckInterval = 50  # ms, collector was due but didn't collect (like a dynamic collector waiting for data)
+    LatenessWarningThreshold = 2500
+
+    def __init__(self,objNamespace,processThreadID,collectorList):
+        self._NamespaceObject = objNamespace
+        self._ProcessThreadID = processThreadID
+        self.__CollectorList = collectorList # shared with the namespace, dynamic collectors get inserted into it
+        self.__Condition = threading.Condition()
+        self.__Heap = []
+        self.__Generation = 0
+        self.__RebuildRequested = True
+        self.__CollectNowRequested = False
+        self.__Lateness = {} # collector ID -> [count, total ms, max ms, last ms]
+
+    # collectors were added, go figure out schedule again
+    def Rebuild(self):
+        with self.__Condition:
+            self.__RebuildRequested = True
+            self.__Condition.notify()
+
+    # everything is due right now, like on a refresh request
+    def CollectNow(self):
+        with self.__Condition:
+            self.__CollectNowRequested = True
+            self.__RebuildRequested = True
+            self.__Condition.notify()
+
+    # returns (collections, avg ms late, max ms late, last ms late) or None if never collected
+    def GetLateness(self,collectorID):
+        with self.__Condition:
+            if not collectorID in self.__Lateness:
+                return None
+
+            count,total,maxLate,lastLate = self.__Lateness[collectorID]
+            return (count,float(total)/count,maxLate,lastLate)
+
+    def __NextDueTime(self,objCollector):
+        if objCollector._RunOnce and objCollector._LastCollectionTime > 0:
+            return None # never again
+
+        return objCollector._LastCollectionTime + objCollector._PollingInterval + 1 # NeedsCollecting() wants to be past the interval
+
+    # must hold the lock
+    def __BuildHeap(self,currTime):
+        heap = []
+        for order,objCollector in enumerate(list(self.__CollectorList)):
+            if objCollector.IsInGroup() or objCollector.IsOnDemand():
+                continue
+
+            if self.__CollectNowRequested:
+                dueTime = currTime
+            else:
+                dueTime = self.__NextDueTime(objCollector)
+
+            if None != dueTime:
+                heap.append((dueTime,order,objCollector)) # order is unique, so collector itself never compared
+
+        heapq.heapify(heap)
+        self.__Heap = heap
+        self.__Generation += 1
+        self.__RebuildRequested = False
+        self.__CollectNowRequested = False
+
+    def __RecordLateness(self,objCollector,lateness):
+        ID = objCollector.GetID()
+        if not ID in self.__Lateness:
+            self.__Lateness[ID] = [0,0,0,0]
+
+        entry = self.__Lateness[ID]
+        entry[0] += 1
+        entry[1] += lateness
+        entry[3] = lateness
+        if lateness > entry[2]:
+            entry[2] = lateness
+            if lateness > CollectorScheduler.LatenessWarningThreshold:
+                Log.getLogger().warning("Collector: " + ID + " collected " + str(lateness) + "ms later than scheduled.")
+
+    # returns list of (dueTime,order,collector) that are due, in the order they are in the namespace
+    def __WaitForDueCollectors(self):
+        with self.__Condition:
+            currTime = Time.GetCurrMS()
+            if self.__RebuildRequested:
+                self.__BuildHeap(currTime)
+
+            if 0 == len(self.__Heap):
+                self.__Condition.wait(float(CollectorScheduler.MaxIdleWait)/1000.0)
+                return ([],self.__Generation)
+
+            if self.__Heap[0][0] > currTime:
+                waitTime = min(self.__Heap[0][0] - currTime,CollectorScheduler.MaxIdleWait)
+                self.__Condition.wait(float(waitTime)/1000.0)
+                return ([],self.__Generation)
+
+            dueList = []
+            while len(self.__Heap) > 0 and self.__Heap[0][0] <= currTime:
+                dueList.append(heapq.heappop(self.__Heap))
+
+            dueList.sort(key=lambda entry: entry[1]) # operators may rely on collectors before them in the list
+            return (dueList,self.__Generation)
+
+    def Run(self,fnKillSignalled):
+        from Helpers import Configuration # circular import if I do at top of file
+        maxTx = Configuration.GetMaxTransmitBufferBeforeRest()
+
+        while not fnKillSignalled():
+            dueList,generation = self.__WaitForDueCollectors()
+            currTotal = 0
+
+            for dueTime,order,objCollector in dueList:
+                if fnKillSignalled(): # get out of possible long loop if we are to exit
+                    return
+
+                lastCollectionTime = objCollector._LastCollectionTime
+                startTime = Time.GetCurrMS()
+                SizeOfSentData = objCollector.alternateCollectionProc()
+                if SizeOfSentData > 0:
+                    self._NamespaceObject.IncrementSentBytes(SizeOfSentData)
+
+                currTotal += SizeOfSentData
+
+                with self.__Condition:
+                    if lastCollectionTime != objCollector._LastCollectionTime and lastCollectionTime > 0: # 1st collection is never late
+                        self.__RecordLateness(objCollector,max(startTime - dueTime,0))
+
+                    if generation != self.__Generation:
+                        continue # heap was rebuilt while collecting, and it already has this collector in it
+
+                    nextDueTime = self.__NextDueTime(objCollector)
+                    if None != nextDueTime:
+                        currTime = Time.GetCurrMS()
+                        if nextDueTime <= currTime: # was due, but didn't collect
+                            nextDueTime = currTime + max(min(objCollector._PollingInterval,CollectorScheduler.RecheckInterval),1)
+
+                        heapq.heappush(self.__Heap,(nextDueTime,order,objCollector))
+
+                if currTotal > maxTx:  # don't want to overload Oscar
+                    Sleep.SleepMs(50)
+                    currTotal = 0
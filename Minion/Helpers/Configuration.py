@@ -278,15 +278,33 @@ class Configuration():
     def __CreateCollectorObject(self,node,objNamespace,MinionID,IsInGroup):
         objCollector = None
         try:
-            ScriptName = Alias.Alias(node.getElementsByTagName('Executable')[0].firstChild.nodeValue)
+            exeNode = node.getElementsByTagName('Executable')[0]
+            ScriptName = Alias.Alias(exeNode.firstChild.nodeValue)
             objCollector = Collector.Collector(objNamespace,MinionID,IsInGroup)
             objCollector._ScriptName = ScriptName
 
+            # <Executable Persistent="True" Timeout="500">myscript.sh</Executable> - script started once, talked to over stdin/stdout
+            if "Persistent" in exeNode.attributes and Alias.Alias(exeNode.attributes["Persistent"].nodeValue).lower() == "true":
+                objCollector._Persistent = True
+                if "Timeout" in exeNode.attributes:
+                    try:
+                        objCollector._PersistentTimeout = int(Alias.Alias(exeNode.attributes["Timeout"].nodeValue))
+                        if objCollector._PersistentTimeout < 1:
+                            raise ValueError("Timeout must be at least 1ms")
+                    except Exception:
+                        Log.getLogger().error("Collector [" + MinionID + "] has invalid Persistent Timeout: " + exeNode.attributes["Timeout"].nodeValue)
+                        return None
+
             try:
                 _Which = 'Param'
                 kwargs={}
                 for param in node.getElementsByTagName(_Which): # Make an array of the params for the script
                     strParam = Alias.Alias(param.firstChild.nodeValue)
+                    # <Param Launch="True">myscript.py</Param> - passed on the command line when a persistent script is started
+                    if objCollector._Persistent and "Launch" in param.attributes and Alias.Alias(param.attributes["Launch"].nodeValue).lower() == "true":
+                        objCollector._LaunchArgs.append(strParam)
+                        continue
+
                     try:
                         key,value=strParam.split('=')
                         kwargs[key] = value
@@ -929,11 +947,44 @@ class Configuration():
                 objNamespace = Namespace.Namespace(ID,TargetIP,TargetPort,Interval)
                 objNamespace.setDefaultPrecision(Precision)
 
+                try:
+                    _Which = 'Encoding' # Binary (default, if Oscar supports it) or XML
+                    Encoding = Alias.Alias(inst.getElementsByTagName(_Which)[0].firstChild.nodeValue)
+                except:
+                    Encoding = None
+
+                if None != Encoding:
+                    if Encoding.lower() == "xml":
+                        objNamespace.SetAllowBinaryEncoding(False)
+                    elif Encoding.lower() != "binary":
+                        self.HandleInvalidXML("Invalid <Encoding>: " + Encoding + " - must be Binary or XML")
+                        return
+
             except Exception as Ex: 
                 Log.getLogger().error(str(Ex))
                 self.HandleInvalidXML(_Which)
                 return
 
+            nodeList = inst.getElementsByTagName("Coalesce") # <Coalesce Interval="5" MTU="1500"/> - pack datapoints into fewer packets
+            if None != nodeList and len(nodeList) > 0:
+                attributes = nodeList[0].attributes
+                try:
+                    Interval = int(Alias.Alias(attributes["Interval"].nodeValue))
+                    if "MTU" in attributes:
+                        MTU = int(Alias.Alias(attributes["MTU"].nodeValue))
+                    else:
+                        MTU = 1500
+
+                    if Interval < 0 or MTU < 576:
+                        raise ValueError("Interval must be >= 0 and MTU >= 576")
+
+                    objNamespace.SetCoalesceInfo(Interval,MTU)
+
+                except Exception as Ex:
+                    Log.getLogger().error(str(Ex))
+                    Log.getLogger().error("Invalid <Coalesce> settings for Namespace " + ID)
+                    return None
+
             nodeList = inst.getElementsByTagName("IncomingConnection")
             if None != nodeList and len(nodeList) > 0:
                 attributes = nodeList[0].attributes
@@ -977,6 +1028,10 @@ class Configuration():
                 continue # don't care
             elif node.nodeName.lower() == "defaultprecision":
                 continue # don't care
+            elif node.nodeName.lower() == "encoding":
+                continue # don't care
+            elif node.nodeName.lower() == "coalesce":
+                continue # don't care
 
             elif node.nodeName.lower() == "collector":
                 objCollector = self.__ReadCollector(node,objNamespace,False)
@@ -56,15 +56,24 @@ class Group(Collector.Collector):
 
         retValue = None
         collectedGroupData=""
+        binaryGroupData=b''
         for collector in self._CollectorList:
             id = collector.GetID()
             if self._ForceCollectionEvenIfNoUpdate or collector.NeedsCollecting(): # by default a group ALWAYS collects, but can override that with AlwaysCollect="False" as group attribute
                 collectorData = collector.PerformCollection()
                 if None != collectorData:
-                    collectedGroupData += collectorData
+                    if isinstance(collectorData,str):
+                        collectedGroupData += collectorData
+                    else: # binary records, can just be strung together
+                        binaryGroupData += collectorData
 
         if len(collectedGroupData) > 1:
             retValue ="<MinionGroup>" + collectedGroupData + "</MinionGroup>"
+            if len(binaryGroupData) > 0: # encoding changed part way through the group, send the binary part on its own
+                self._NamespaceObject.SendData(binaryGroupData)
+
+        elif len(binaryGroupData) > 0:
+            retValue = binaryGroupData
 
         if self._RefreshRequested:
             self._RefreshRequested = False
@@ -25,6 +25,9 @@ from Helpers import ThreadManager
 from Helpers import Log
 from Helpers import ServerUDP
 from Helpers import VersionMgr
+from Helpers import BinaryProtocol
+from Helpers import Coalescer
+from Helpers import CollectorScheduler
 import threading
 import fnmatch
 
@@ -42,6 +45,7 @@ class Namespace():
     ConnectionInfoUpdateInterval = 30000 # 30 seconds
     ConnectionUpdateThreadSleepinterval = 300 # how long to sleep each loop
     SleepIntervalIfNoDataCollected = 50 # If no data was collected in a loop, then take a little snooze
+    BinaryEncodingExpireInterval = 65000 # if Oscar hasn't confirmed binary encoding in this long (2 connection updates), go back to XML
 
     _LogTimePerProcessLoop = False   # logs how many ms it takes to do each loop of collections
     _LoopTimePeriodWarningThreshold = 2500
@@ -80,7 +84,15 @@ class Namespace():
         self._SentSizeLock = threading.Lock()
         self._SentBytes = 0
         self.__ProcessThreadGroupings = {} # a map of collector ProcessThreads
+        self.__Schedulers = {} # a map of ProcessThread -> CollectorScheduler
         self.__LastActorCalled="No Actors Called Yet"
+        self._AllowBinaryEncoding = sys.version_info >= (3, 0) # can be turned off in config with <Encoding>XML</Encoding>
+        self.__BinaryEncodingVersion = 0 # 0 means XML, otherwise what was agreed upon with Oscar
+        self.__BinaryEncodingConfirmedTime = 0
+        self.__BinaryEncoder = BinaryProtocol.Encoder()
+        self._CoalesceInterval = 0 # ms a datapoint can wait to be packed with others, 0 means send right away
+        self._CoalesceMTU = 1500
+        self.__Coalescer = None
 
         Log.getLogger().info("Namespace [" + ID + "] Target is " + TargetIP + ":" + str(TargetPort))
         
@@ -141,6 +153,10 @@ class Namespace():
 
         if True == runOnce:
             return len(self._Collectors)
+
+        if self._CoalesceInterval > 0:
+            self.__Coalescer = Coalescer.Coalescer(self,self._CoalesceInterval,self._CoalesceMTU - 20 - 8) # IPV4 + UDP Header
+            self.__Coalescer.Start()
         
         # may have specified listen port and ip
         if hasattr(self,"_Configuration__ListenIP"):
@@ -225,6 +241,8 @@ class Namespace():
             
             if objCollector.GetProcessThreadID() in self.__ProcessThreadGroupings.keys():
                 InsertAfterInList(self.__ProcessThreadGroupings[objCollector.GetProcessThreadID()],beforeID, objCollector)
+                if objCollector.GetProcessThreadID() in self.__Schedulers:
+                    self.__Schedulers[objCollector.GetProcessThreadID()].Rebuild()
             else:
                 Log.getLogger().error("Not supposed to end up here!")
         
@@ -245,12 +263,84 @@ class Namespace():
         self._LastFreshUniqueID = UniqueID
 
         Log.getLogger().debug("Namespace[" + str(self) + "] performing collector refresh")
+        self.__BinaryEncoder.Reset() # Oscar may have restarted, so send the binary dictionary again
         for collector in self._Collectors:
             collector.RequestRefresh()
 
+        for scheduler in list(self.__Schedulers.values()):
+            scheduler.CollectNow()
+
+    # returns (collections, avg ms late, max ms late, last ms late) for a collector, or None if don't know
+    def GetCollectorLateness(self,CollectorID):
+        objCollector = self.GetCollector(CollectorID)
+        if None == objCollector or not objCollector.GetProcessThreadID() in self.__Schedulers:
+            return None
+
+        return self.__Schedulers[objCollector.GetProcessThreadID()].GetLateness(objCollector.GetID())
+
+    def SetAllowBinaryEncoding(self,flag):
+        self._AllowBinaryEncoding = flag and sys.version_info >= (3, 0)
+
+    def AllowBinaryEncoding(self):
+        return self._AllowBinaryEncoding
+
+    # Oscar has told us what binary encoding version it supports
+    def SetBinaryEncodingVersion(self,version):
+        if not self._AllowBinaryEncoding:
+            return
+
+        version = min(version,BinaryProtocol.VERSION)
+        if version != self.__BinaryEncodingVersion:
+            if version > 0:
+                Log.getLogger().info("Namespace [" + self._ID + "] using binary encoding version " + str(version) + " to Oscar")
+            self.__BinaryEncoder.Reset()
+
+        self.__BinaryEncodingVersion = version
+        self.__BinaryEncodingConfirmedTime = Time.GetCurrMS()
+
+    def UseBinaryEncoding(self):
+        if 0 == self.__BinaryEncodingVersion:
+            return False
+
+        if self.__BinaryEncodingConfirmedTime + Namespace.BinaryEncodingExpireInterval < Time.GetCurrMS():
+            Log.getLogger().warning("Namespace [" + self._ID + "] Oscar has stopped confirming binary encoding, reverting to XML")
+            self.__BinaryEncodingVersion = 0
+            return False
+
+        return True
+
+    # returns binary records for the datapoint, or None if it should be sent as XML
+    def EncodeBinaryDatapoint(self,namespaceStr,ID,value,elapsedtime,normalized):
+        return self.__BinaryEncoder.EncodeDatapoint(namespaceStr,ID,value,elapsedtime,normalized)
+
+    def SetCoalesceInfo(self,interval,MTU):
+        self._CoalesceInterval = interval
+        self._CoalesceMTU = MTU
+
+    # returns (packets sent, datapoints sent, average ms waited, max ms waited) or None if not coalescing
+    def GetCoalesceStats(self):
+        if None == self.__Coalescer:
+            return None
+
+        return self.__Coalescer.GetStats()
+
+    # sends collected data (no xml header), packing it with other data if coalescing is enabled
+    def SendData(self,buffer):
+        if None != self.__Coalescer:
+            return self.__Coalescer.Add(buffer)
+
+        if isinstance(buffer,str):
+            buffer = "<?xml version=\"1.0\" encoding=\"utf-8\"?>" + buffer
+
+        return self.SendPacket(buffer)
+
     def SendPacket_Python3(self,buffer):
         try:
-            self._Socket.sendto(bytes(buffer,'utf-8'),(self.__TargetIP,self.__TargetPort))
+            if isinstance(buffer,bytes): # binary records, need a header
+                buffer = BinaryProtocol.CreatePacket(buffer,self.getNextPacketNumber())
+            else:
+                buffer = bytes(buffer,'utf-8')
+            self._Socket.sendto(buffer,(self.__TargetIP,self.__TargetPort))
         except Exception as ex:
             Log.getLogger().warning("Error sending data :" + str(ex))
             return False
@@ -308,50 +398,8 @@ class Namespace():
         finally:
             self._SentSizeLock.release()
 
-    def __CollectSingleRange(self,fnKillSignalled,processThreadID):
-        from Helpers import Configuration
-        count = 0
-        currTotal = 0
-        
-        maxTx = Configuration.GetMaxTransmitBufferBeforeRest()
-        startTime = Time.GetCurrMS()
-        collectorList = self.__GetCollectorListForThreadGroup(processThreadID)
-        
-        for collector in collectorList:
-            if fnKillSignalled(): # get out of possible long loop if we are to exit
-                return
-            if not collector.IsInGroup() and not collector.IsOnDemand():
-                SizeOfSentData = collector.alternateCollectionProc()
-                if SizeOfSentData > 0:
-                    self.IncrementSentBytes(SizeOfSentData)
-                    count+=1
-
-                currTotal += SizeOfSentData
-
-            if currTotal > maxTx:  # don't want to overload Oscar
-                Sleep.SleepMs(50)                         
-                currTotal = 0
-                
-
-        #timeTaken = Time.GetCurrMS() - startTime
-        #print(processThreadID +": " + str(timeTaken))
-        #if Namespace._LogTimePerProcessLoop and timeTaken > 0:
-        #    Log.getLogger().debug("Process Thread: " + collectorList[0].GetProcessThreadID() + " took " + str(timeTaken) + "ms to process one loop")
-
-        #if timeTaken > Namespace._LoopTimePeriodWarningThreshold and not Namespace._LogTimePerProcessLoop :
-        #    Log.getLogger().warning("Process Thread: " + collectorList[0].GetProcessThreadID() + " took " + str(timeTaken) + "ms to process one loop - you may want to investigate.")
-
-        #if "Default" != processThreadID:
-        #    print(processThreadID + " Collected " + str(count) +"/" + str(len(collectorList)))
-                                  
-        return count
-                
     def __SlicedThreadProc(self,fnKillSignalled,processThreadID):
-        while not fnKillSignalled():
-            count = self.__CollectSingleRange(fnKillSignalled,processThreadID)
-            
-            if 0 == count:
-               Sleep.SleepMs(Namespace.SleepIntervalIfNoDataCollected)  
+        self.__Schedulers[processThreadID].Run(fnKillSignalled)
     
     def __CreateInitialCollectorThreadGroupings(self):
         GroupingCount = 0
@@ -366,6 +414,11 @@ class Namespace():
 
             newGroup[processThreadID].append(objCollector) #insert the collector into the list that is in a map
         self.__ProcessThreadGroupings= newGroup
+
+        schedulers = {}
+        for processThreadID,collectorList in newGroup.items():
+            schedulers[processThreadID] = CollectorScheduler.CollectorScheduler(self,processThreadID,collectorList)
+        self.__Schedulers = schedulers
         
         return GroupingCount
 
@@ -400,13 +453,7 @@ class Namespace():
                 ThreadManager.GetThreadManager().StartThread(ID)
                 ThreadCount += 1
 
-        while not fnKillSignalled():  # now go process the 1st group in this thread
-            processed = self.__CollectSingleRange(fnKillSignalled,firstGroupID)
-            if processed == 0:
-               Sleep.SleepMs(Namespace.SleepIntervalIfNoDataCollected)
-               if collectorCount != len(self._Collectors): # dynamic collectos must have added some
-                   pass
-                   #self.__CreateInitialCollectorThreadGroupings() # regenerate
+        self.__Schedulers[firstGroupID].Run(fnKillSignalled) # now go process the 1st group in this thread
 
 
     def __sendConnectionInfoProc(self,fnKillSignalled,userData):
@@ -416,6 +463,8 @@ class Namespace():
         buffer = buffer + "<MinionVersion>" + VersionMgr.ReadVer()+ "</MinionVersion>"
         buffer += "<Namespace>" + str(self) + "</Namespace>"
         buffer += "<Port>" + str(self._Server.getPort()) + "</Port>"
+        if self._AllowBinaryEncoding:
+            buffer += "<BinaryVersion>" + str(BinaryProtocol.VERSION) + "</BinaryVersion>"
         buffer = buffer + "</Minion>"
 
         lastUpdate = 0
@@ -460,4 +509,4 @@ def InsertAfterInList(collectorList,strAfter,objToInsert):
 
 def GetNamespace(strNamespaceID):
     from Helpers import Configuration
-    return Configuration.GetNamespace(strNamespaceID)
\ No newline at end of file
+    return Configuration.GetNGetNamespace(strNamespaceID)
\ No newline at end of file
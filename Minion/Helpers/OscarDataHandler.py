@@ -43,6 +43,9 @@ class OscarDataHandler(object):
         if packetType == "Refresh" :  # is a data packet in a chained Oscar, just send it on down the road
             self.HandleRefreshPacket(node,rawData,fromAddress,objNamespace)
 
+        elif packetType == "Capabilities" :
+            self.HandleCapabilitiesPacket(node,rawData,fromAddress,objNamespace)
+
         else:
             Log.getLogger().error("Unknown Oscar Packet: " + rawData)
 
@@ -63,6 +66,22 @@ class OscarDataHandler(object):
         
         objNamespace.Refresh(uniqueID)
 
+    def HandleCapabilitiesPacket(self,node,rawData,fromAddress,objNamespace):
+        #<?xml version=\"1.0\" encoding=\"utf-8\"?>
+        #<Oscar Type=\"Capabilities\">
+        #   <Version>1.0</Version>
+        #   <BinaryVersion>1</BinaryVersion>
+        #</Oscar>
+        try:
+            version = node.getElementsByTagName('Version')[0].firstChild.nodeValue 
+            binaryVersion = int(node.getElementsByTagName('BinaryVersion')[0].firstChild.nodeValue)
+
+        except Exception as Ex:
+            Log.getLogger().error("Malformed Oscar Capabilities Packet: " + rawData)
+            return
+
+        objNamespace.SetBinaryEncodingVersion(binaryVersion)
+
 
 def GetDataHandler():
     if OscarDataHandler._instance == None:
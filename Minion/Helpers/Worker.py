@@ -20,7 +20,14 @@
 
 from Helpers import Log
 from Helpers import DynamicPython
+from Util import Time
 import subprocess
+import threading
+import atexit
+try:
+    import queue
+except ImportError:
+    import Queue as queue # Python 2
 
 #Helper class that will run a given script, does this in the caller's thread, a new one is not spawned
 class Worker:
@@ -79,6 +86,26 @@ class Worker:
     
         return  strRet # all good, should be a vaue of some kind
 
+    # Run a script that stays alive, rather than starting a new process each time
+    # <Executable Persistent="True" Timeout="500">mycollector.sh</Executable>
+    #
+    # <Executable Persistent="True">python</Executable>
+    # <Param Launch="True">mycollector.py</Param>
+    # <Param>eth0</Param>
+    @staticmethod
+    def RunPersistentScript(ScriptName,LaunchArgs,Parameters,Timeout):
+        ScriptName = DynamicPython.DynamicLoader.convertPath(ScriptName)
+        if 0 == len(LaunchArgs) and ScriptName.lower().startswith("python") and len(Parameters) > 0:
+            LaunchArgs = [Parameters[0]] # same as RunScript, 1st param to python is the script
+            Parameters = Parameters[1:]
+
+        strRet = PersistentProcess.Get(ScriptName,LaunchArgs).Request(Parameters,Timeout)
+
+        if True == ("Error" in strRet):
+           raise Exception(strRet) 
+
+        return strRet
+
     #try to call a python fn
     @staticmethod
     def __TryToCallImportedPython(pFn,Parameters,ExecutableIsScript):
@@ -136,3 +163,134 @@ class Worker:
 
         return  RetVal
 
+
+# An external collector that is started once and then stays running.  It is started
+# with the <Param Launch="True"> params as its arguments, then Minion writes one line
+# per collection to its stdin, with the other <Param>s separated by tabs, and the
+# script writes back a single line with the value:
+#
+#   Minion -> script:  eth0<TAB>rx_bytes
+#   script -> Minion:  123456
+#
+# An empty line is sent if there are no <Param>s.  If the script dies, or doesn't
+# answer within the timeout, it is killed and started again on the next request.
+# Collectors with the same command line share the one process.
+class PersistentProcess(object):
+    __Processes = {}
+    __ProcessesLock = threading.Lock()
+    RestartBackoff = 1000 # ms, don't keep trying to start a script that keeps dying
+    DefaultTimeout = 1000 # ms
+
+    @staticmethod
+    def Get(ScriptName,LaunchArgs=[]):
+        command = tuple([ScriptName] + [str(arg).rstrip() for arg in LaunchArgs])
+        PersistentProcess.__ProcessesLock.acquire()
+        try:
+            if not command in PersistentProcess.__Processes:
+                PersistentProcess.__Processes[command] = PersistentProcess(command)
+
+            return PersistentProcess.__Processes[command]
+        finally:
+            PersistentProcess.__ProcessesLock.release()
+
+    @staticmethod
+    def StopAll():
+        PersistentProcess.__ProcessesLock.acquire()
+        try:
+            for objProcess in PersistentProcess.__Processes.values():
+                objProcess.Stop()
+        finally:
+            PersistentProcess.__ProcessesLock.release()
+
+    def __init__(self,Command):
+        self._Command = list(Command)
+        self._ScriptName = " ".join(Command) # for logging
+        self.__Lock = threading.Lock() # one request at a time, replies come back in order
+        self.__Process = None
+        self.__Replies = None
+        self.__LastStartTime = 0
+        self.__RestartCount = 0
+
+    def __Start(self):
+        if self.__LastStartTime + PersistentProcess.RestartBackoff > Time.GetCurrMS():
+            return False
+
+        self.__LastStartTime = Time.GetCurrMS()
+        try:
+            self.__Process = subprocess.Popen(self._Command,stdin=subprocess.PIPE,stdout=subprocess.PIPE,bufsize=0)
+
+        except Exception as Ex:
+            Log.getLogger().error("Unable to start persistent collector " + self._ScriptName + ": " + str(Ex))
+            self.__Process = None
+            return False
+
+        if self.__RestartCount > 0:
+            Log.getLogger().warning("Restarted persistent collector " + self._ScriptName + " (" + str(self.__RestartCount) + " restarts)")
+        self.__RestartCount += 1
+
+        self.__Replies = queue.Queue()
+        readerThread = threading.Thread(target=self.__ReaderProc,args=(self.__Process,self.__Replies))
+        readerThread.daemon = True # blocks on readline, so can't be told to exit like the others
+        readerThread.start()
+        return True
+
+    # reads stdout in the background so a request can time out
+    def __ReaderProc(self,objProcess,replyQueue):
+        try:
+            for line in iter(objProcess.stdout.readline,b''):
+                replyQueue.put(line.decode('utf-8').rstrip())
+        except Exception:
+            pass
+
+        replyQueue.put(None) # process went away
+
+    def Stop(self):
+        if None == self.__Process:
+            return
+
+        try:
+            self.__Process.kill()
+            self.__Process.wait()
+        except Exception:
+            pass
+
+        self.__Process = None
+
+    def Request(self,Parameters,Timeout):
+        self.__Lock.acquire()
+        try:
+            if None == self.__Process or None != self.__Process.poll():
+                if None != self.__Process:
+                    Log.getLogger().error("Persistent collector " + self._ScriptName + " exited with code " + str(self.__Process.returncode))
+                    self.__Process = None
+
+                if not self.__Start():
+                    return ""
+
+            request = "\t".join([str(param).rstrip().replace("\n"," ").replace("\t"," ") for param in Parameters]) + "\n"
+            try:
+                self.__Process.stdin.write(request.encode('utf-8'))
+                self.__Process.stdin.flush()
+                strRet = self.__Replies.get(True,float(Timeout)/1000.0)
+
+            except queue.Empty:
+                Log.getLogger().error("Persistent collector " + self._ScriptName + " did not respond within " + str(Timeout) + "ms, restarting it")
+                self.Stop() # can't trust the next reply to be for the next request
+                return ""
+
+            except Exception as Ex:
+                Log.getLogger().error("Persistent collector " + self._ScriptName + ": " + str(Ex))
+                self.Stop()
+                return ""
+
+            if None == strRet:
+                Log.getLogger().error("Persistent collector " + self._ScriptName + " closed its output")
+                self.Stop()
+                return ""
+
+            return strRet
+
+        finally:
+            self.__Lock.release()
+
+atexit.register(PersistentProcess.StopAll)
@@ -38,6 +38,15 @@ class MarvinData(object):
         self.ID = ID
         self.Live = isLive
 
+    # ArrivalTime is relative to this, ingest processes use the main Oscar's so their data lines up
+    @staticmethod
+    def GetStartTime():
+        return MarvinData.__FirstTime
+
+    @staticmethod
+    def SetStartTime(startTime):
+        MarvinData.__FirstTime = startTime
+
 
     def ToXML(self,destIsFile=False): 
         startCDATA="<![CDATA["
@@ -0,0 +1,353 @@
+##############################################################################
+#  Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+##############################################################################
+#    File Abstract:
+#    Writes playback data out as CSV files, going through the data once and
+#    only keeping per ID running totals (interval file), or spilling each ID's
+#    column to a temp file (raw file) rather than building it all in memory.
+#    Uses NumPy for the interval averages if it is around.  Exporting only
+#    some IDs from a .bifc file only reads the chunks that have them.
+##############################################################################
+import array
+import datetime
+import fnmatch
+import os
+import shutil
+import tempfile
+from Data import MarvinGroupData
+from Helpers import RecordFile
+
+try:
+    import numpy
+except ImportError:
+    numpy = None # pure python it is
+
+PendingPerID = 65536      # samples held for an ID before they get folded into its interval totals
+RawSpillBufferSize = 4096 # cells held for an ID before being written to its temp file
+RawRowsInMemory = 1000000 # cells held when putting the raw file back together
+
+# include/exclude lists are of wildcard patterns (like cpu*), matched against the ID or Namespace:ID
+class IDFilter(object):
+    def __init__(self,include=None,exclude=None):
+        self._Include = [pattern.lower() for pattern in include] if include else None
+        self._Exclude = [pattern.lower() for pattern in exclude] if exclude else None
+        self.__Decisions = {}
+
+    def IsFiltering(self):
+        return None != self._Include or None != self._Exclude
+
+    def __Matches(self,patterns,ID,fullName):
+        for pattern in patterns:
+            if fnmatch.fnmatchcase(ID,pattern) or fnmatch.fnmatchcase(fullName,pattern):
+                return True
+        return False
+
+    def Allowed(self,Namespace,ID):
+        key = (Namespace,ID)
+        try:
+            return self.__Decisions[key]
+        except KeyError:
+            pass
+
+        lowerID = ID.lower()
+        fullName = Namespace.lower() + ":" + lowerID
+        allowed = True
+        if None != self._Include and not self.__Matches(self._Include,lowerID,fullName):
+            allowed = False
+        elif None != self._Exclude and self.__Matches(self._Exclude,lowerID,fullName):
+            allowed = False
+
+        self.__Decisions[key] = allowed
+        return allowed
+
+# (entry,datapoint) for every datapoint, may skip ones objFilter doesn't allow
+def _Datapoints(entries,objFilter):
+    if isinstance(entries,RecordFile.IndexedRecording) and objFilter.IsFiltering(): # let the index pick the chunks
+        for item in entries.GetDatapointsForIDs(objFilter.Allowed):
+            yield item
+        return
+
+    for entry in entries:
+        if isinstance(entry,MarvinGroupData.MarvinDataGroup):
+            for datapoint in entry._DataList:
+                yield (entry,datapoint)
+        else:
+            yield (entry,entry)
+
+def _IsNumeric(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+###########################################
+# Running interval totals for a single Namespace:ID
+# An interval is closed by (and includes) the 1st sample at or past its end, so
+# a sample goes in the interval the sample before it was in.
+class _IntervalColumn(object):
+    def __init__(self,Namespace,ID,firstTime,firstValue,interval):
+        self.Namespace = Namespace
+        self.ID = ID
+        self.FirstTime = firstTime
+        self.LastTime = firstTime
+        self.__PrevTime = firstTime
+        self.Count = 0
+        self.Numeric = _IsNumeric(firstValue) # decided by 1st value, like it always has been
+        self._Interval = interval
+        self.__PendingTimes = array.array('q') # time of the sample before each pending one
+        self.__PendingValues = array.array('d')
+        self.__Sums = []    # per bucket
+        self.__Counts = []  # per bucket
+        self.__TextValues = {} # bucket -> last value, for non-numeric data
+
+    def __Bucket(self,prevTime):
+        return max((prevTime - self.FirstTime) // self._Interval,0)
+
+    # returns number of samples pending
+    def Add(self,arrivalTime,value):
+        self.Count += 1
+        if arrivalTime > self.LastTime:
+            self.LastTime = arrivalTime
+
+        prevTime = self.__PrevTime
+        self.__PrevTime = arrivalTime
+
+        if not self.Numeric:
+            self.__TextValues[self.__Bucket(prevTime)] = str(value)
+            return 0
+
+        try:
+            fValue = float(value)
+        except ValueError:
+            return len(self.__PendingTimes) # skip non-numeric in numeric data, as always has been
+
+        self.__PendingTimes.append(prevTime)
+        self.__PendingValues.append(fValue)
+        return len(self.__PendingTimes)
+
+    def __Grow(self,bucketCount):
+        if bucketCount > len(self.__Sums):
+            extra = bucketCount - len(self.__Sums)
+            self.__Sums.extend([0.0] * extra)
+            self.__Counts.extend([0] * extra)
+
+    # fold pending samples into the per bucket totals
+    def Fold(self):
+        if 0 == len(self.__PendingTimes):
+            return
+
+        if None != numpy:
+            times = numpy.frombuffer(self.__PendingTimes,dtype=numpy.int64)
+            values = numpy.frombuffer(self.__PendingValues,dtype=numpy.float64)
+            buckets = numpy.maximum((times - self.FirstTime) // self._Interval,0)
+            sums = numpy.bincount(buckets,weights=values)
+            counts = numpy.bincount(buckets)
+            self.__Grow(len(counts))
+            for bucket in numpy.flatnonzero(counts).tolist():
+                self.__Sums[bucket] += float(sums[bucket])
+                self.__Counts[bucket] += int(counts[bucket])
+
+        else:
+            sumList = self.__Sums
+            countList = self.__Counts
+            for prevTime,fValue in zip(self.__PendingTimes,self.__PendingValues):
+                bucket = self.__Bucket(prevTime)
+                if bucket >= len(countList):
+                    self.__Grow(bucket + 1)
+                sumList[bucket] += fValue
+                countList[bucket] += 1
+
+        self.__PendingTimes = array.array('q')
+        self.__PendingValues = array.array('d')
+
+    # values for each complete interval that had data in it
+    def GetIntervalValues(self):
+        self.Fold()
+        completeBuckets = (self.LastTime - self.FirstTime) // self._Interval
+
+        if not self.Numeric:
+            return [self.__TextValues[bucket] for bucket in sorted(self.__TextValues) if bucket < completeBuckets]
+
+        return [self.__Sums[bucket]/self.__Counts[bucket] for bucket in range(0,min(completeBuckets,len(self.__Counts))) if self.__Counts[bucket] > 0]
+
+    def GetRow(self,intervalSecs):
+        timespan = self.LastTime - self.FirstTime
+        parts = [self.Namespace,self.ID,str(intervalSecs),str(self.Count),str(int(timespan/1000)),str(int(timespan/self.Count))]
+
+        values = self.GetIntervalValues()
+        if len(values) > 0:
+            parts.append(str(len(values)))
+            if self.Numeric:
+                parts.append("{0:.2f}".format(sum(values)/len(values)))
+                parts.extend(["{0:.2f}".format(value) for value in values])
+            else:
+                parts.append("NA") #no Average for text
+                parts.extend(values)
+
+        return ",".join(parts)
+
+# One row per Namespace:ID, with the average value over each interval
+def WriteIntervalCSV(filename,entries,interval,include=None,exclude=None):
+    objFilter = IDFilter(include,exclude)
+    columns = {}
+    pendingTotal = 0
+    timeInterval = interval * 1000 #secs to ms
+
+    for _,datapoint in _Datapoints(entries,objFilter):
+        if not objFilter.Allowed(datapoint.Namespace,datapoint.ID):
+            continue
+
+        key = datapoint.Namespace + datapoint.ID
+        arrivalTime = int(datapoint.ArrivalTime)
+        try:
+            column = columns[key]
+        except KeyError:
+            column = _IntervalColumn(datapoint.Namespace,datapoint.ID,arrivalTime,datapoint.Value,timeInterval)
+            columns[key] = column
+
+        if column.Add(arrivalTime,datapoint.Value) >= PendingPerID:
+            column.Fold()
+
+    with open(filename,'w+t') as fp:
+        fp.write("Namespace,Name,TimeInterval(secs),# of Datapoints, Total Time(secs), Avg Time (ms),# of samples,Average Value,Values...\n")
+        for key in sorted(columns): #Sort so it looks better in the file
+            fp.write(columns[key].GetRow(interval) + "\n")
+            del columns[key] # don't need it any more
+
+###########################################
+# Raw file has 3 columns per ID (Value,Time,blank) and a row per sample.
+# Each ID's cells are spilled to its own temp file, then stitched back together a block of rows at a time.
+class _RawColumn(object):
+    def __init__(self,Namespace,ID,spillFile):
+        self.Namespace = Namespace
+        self.ID = ID
+        self.Count = 0
+        self.Total = 0.0
+        self.NonNumeric = False
+        self._SpillFile = spillFile
+        self.__Buffer = []
+        self.__ReadOffset = 0
+
+    def Add(self,arrivalTime,value):
+        value = str(value).replace(",",";").replace("\n"," ")
+        self.__Buffer.append(value + "," + str(arrivalTime) + "\n")
+        self.Count += 1
+        if not self.NonNumeric:
+            try:
+                self.Total += float(value)
+            except ValueError:
+                self.NonNumeric = True
+
+        if len(self.__Buffer) >= RawSpillBufferSize:
+            self.Spill()
+
+    def Spill(self):
+        if len(self.__Buffer) > 0:
+            with open(self._SpillFile,'at',encoding='utf-8') as fp:
+                fp.write("".join(self.__Buffer))
+            self.__Buffer = []
+
+    # returns list of up to rowCount (value,time) tuples, continuing from last time
+    def ReadCells(self,rowCount):
+        cells = []
+        if self.__ReadOffset < 0 or 0 == self.Count:
+            return cells
+
+        with open(self._SpillFile,'rb') as fp:
+            fp.seek(self.__ReadOffset)
+            for _ in range(0,rowCount):
+                line = fp.readline()
+                if not line:
+                    self.__ReadOffset = -1 # all done
+                    break
+                value,arrivalTime = line.decode('utf-8').rstrip("\n").rsplit(",",1)
+                cells.append((value,int(arrivalTime)))
+            else:
+                self.__ReadOffset = fp.tell()
+
+        return cells
+
+def WriteRawCSV(filename,entries,include=None,exclude=None):
+    objFilter = IDFilter(include,exclude)
+    spillDir = tempfile.mkdtemp(prefix="OscarCSV")
+    firstPktTime = None
+    if isinstance(entries,RecordFile.IndexedRecording): # filtered datapoints may not include the 1st one
+        firstPktTime = entries.GetFirstTime()
+
+    try:
+        namespaces = {}
+        columnCount = 0
+        for entry,datapoint in _Datapoints(entries,objFilter):
+            if None == firstPktTime or entry.ArrivalTime < firstPktTime:
+                firstPktTime = entry.ArrivalTime
+
+            if not objFilter.Allowed(datapoint.Namespace,datapoint.ID):
+                continue
+
+            nsColumns = namespaces.setdefault(datapoint.Namespace,{})
+            try:
+                column = nsColumns[datapoint.ID]
+            except KeyError:
+                column = _RawColumn(datapoint.Namespace,datapoint.ID,os.path.join(spillDir,str(columnCount)))
+                nsColumns[datapoint.ID] = column
+                columnCount += 1
+
+            column.Add(int(datapoint.ArrivalTime),datapoint.Value)
+
+        columns = []
+        for namespace in sorted(namespaces):
+            for ID in sorted(namespaces[namespace]):
+                column = namespaces[namespace][ID]
+                column.Spill()
+                columns.append(column)
+
+        maxDp = max([column.Count for column in columns]) if len(columns) > 0 else 0
+        if None == firstPktTime:
+            firstPktTime = 0
+
+        with open(filename,'w+t') as fp:
+            fp.write("BIFF CSV File.  Created {0}.  Time(ms) is the # of ms data value received after the 1st value (so a relative time).\n".format(datetime.datetime.now().strftime("%I:%M%p on %B %d, %Y")))
+            fp.write("Namespace,," + "".join([column.Namespace + ",,," for column in columns]) + "\n")
+            fp.write("ID,," + "".join([column.ID + ",,," for column in columns]) + "\n")
+            fp.write(",," + "Average,#Samples,,"*len(columns) + "\n")
+
+            avgParts = []
+            for column in columns:
+                if column.NonNumeric:
+                    avgParts.append("NA,")
+                else:
+                    avgParts.append("{0},".format(column.Total/column.Count))
+                avgParts.append(str(column.Count) + ",,")
+            fp.write(",," + "".join(avgParts) + "\n")
+            fp.write(",," + "Values,Time(ms),,"*len(columns) + "\n")
+
+            blockRows = max(100,RawRowsInMemory // max(1,len(columns)))
+            for blockStart in range(0,maxDp,blockRows):
+                rowCount = min(blockRows,maxDp - blockStart)
+                rows = [[",,"] for _ in range(0,rowCount)]
+                for column in columns:
+                    cells = column.ReadCells(rowCount)
+                    for rowNum,(value,arrivalTime) in enumerate(cells):
+                        rows[rowNum].append(value + "," + str(arrivalTime - firstPktTime) + ",,")
+                    for rowNum in range(len(cells),rowCount):
+                        rows[rowNum].append(",,,")
+
+                fp.write("".join(["".join(row) + "\n" for row in rows]))
+
+            fp.write(",,\n")
+
+    finally:
+        shutil.rmtree(spillDir,ignore_errors=True)
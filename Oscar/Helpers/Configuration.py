@@ -30,6 +30,8 @@ from Data import ConnectionPoint
 from Data.ConnectionPoint import ConnectionType
 from Helpers import Target
 from Helpers import TargetManager
+from Helpers import RecordFile
+from Helpers import RuleMatcher
 from Data import MarvinData
 from Data import MarvinGroupData
 import re
@@ -42,6 +44,8 @@ def get():
 
 class Configuration():
     _ConfigurationInstance = None
+    RuleCacheSize = 10000 # resolved Shunt and BITW lookups kept, each
+    _BITW_NamespaceTag = re.compile("<Namespace>(.*?)</Namespace>")
     @staticmethod
     def GetConfiguration():
         if None == Configuration._ConfigurationInstance:
@@ -76,26 +80,46 @@ class Configuration():
         self.__RecordFileName = None
         self.__AutoRunTime = None
         self.__PlaybackSpeed=1
+        self.__PlaybackAsFastAsPossible=False
+        self.__PlaybackStartOffset=0 # secs into the data to start playback at
         self.__UseGUI=True
         self.__ExitAfterAutoPlay=False
-        #### Governer - throttles transmit as to not overload system -- experimental -- #####
-        self.__UseGoverner = False
-        self.__GovernerThreshhold = 2048 
-        self.__GovernerThreshhold *= 1024 # turn it into KB
-        self.__GovernerBackoffPeriod = 10
-        self.__GovernerMaxPacketsBeforeRest = 500
-        ####  Governer ####
+        # (PacketsPerSec,BytesPerSec,BurstPackets,BurstBytes), rate of 0 is unlimited
+        self.__GlobalRateLimit = (0,0,0,0) # everything sent downstream, all targets together
+        self.__TargetRateLimit = (0,0,0,0) # each target
         self.__DynamicConnectMarvinMap = {} 
         self.__ShuntMap = {}       # includes wildcards, is a map of namespaces, each entry is a map of IDs that contain dataTuples
-        self.__ShuntMapResolved = {} # only specific NS + ID resolved, key is ns+id, contains dataTuple
-        self.__NotShuntedMap = {} # If in here, look no further
+        self.__ShuntRules = RuleMatcher.PatternSet([]) # namespace rules, each value is a PatternSet of ID rules
+        self.__ShuntCache = RuleMatcher.LRUCache(Configuration.RuleCacheSize) # (ns,id) --> dataTuple or None
         self.__ShuntingFiles = {}
         self.__Shunting = None
-        self.__ShuntWorkerThreadInterval = 250
+        self.__ShuntWorkerThreadInterval = 250 # ms between writes of shunt files that changed
         self.__BITW_NamespaceMap = {}
-        self.__BITW_NotMatchedMap={}
+        self.__BITW_Rules = RuleMatcher.PatternSet([])
+        self.__BITW_Cache = RuleMatcher.LRUCache(Configuration.RuleCacheSize) # namespace --> (outputNS,appendMode) or None
         self.__BITW_Active = False
         self.__ReceiveBufferSize=32768 #size of buffer to read data into
+        self.__IncomingWorkerCount = 4 # threads that process received packets
+        self.__IncomingQueueMax = 50000 # received packets waiting to be processed before dropping
+        self.__IncomingQueueMaxPerSource = 5000 # received packets from one sender waiting, more than that are dropped
+        self.__IncomingSourceQuantum = 4096 # bytes taken from each sender's queue in turn
+        self.__RecvBatchSize = 64 # most packets read from a UDP socket each time it is woken up
+        self.__SocketRecvBufferSize = 4194304 # SO_RCVBUF for UDP listeners, so bursts aren't lost in the OS, 0 = OS default
+        self.__CoalesceDownstream = False # pack data going to Marvins/Oscars into <OscarGroup> packets
+        self.__CoalesceMTU = 1500
+        self.__SendEngine = False # one thread sends to all targets, rather than a thread per target
+        self.__SendEngineSockets = 4
+        self.__IngestProcesses = 1 # > 1 splits receiving and processing of Minion data across processes sharing the port
+        self.__IngestShardIndex = None # set when this is one of those processes
+        self.__PassThrough = True # relay Minion data without re-building it, when Bump in the Wire doesn't change it
+        self.__StreamRecording = False # write recordings to disk as they happen, rather than keeping in memory
+        self.__StreamRecordingBufferSize = 50000 # datapoints waiting to be written before dropping
+        self.__StreamRecordingMaxFileBytes = 0 # rotate to new file after this size, 0 = never
+        self.__StreamRecordingMaxFileSeconds = 0 # rotate to new file after this long, 0 = never
+        self.__RecordFileCompression = RecordFile.Compression.ZLIB # for .bifc files
+        self.__TargetMaxQueued = 10000 # packets waiting to go to a target before the DropPolicy kicks in
+        self.__TargetDropPolicy = Target.DropPolicy.DropOldest
+        self.__TargetQueueOverrides = {} # IP:Port -> (MaxQueued,DropPolicy) from <TargetConnection>
 
     def GetMinimizeGui(self):
         return self.__MinimizedGUI
@@ -115,14 +139,95 @@ class Configuration():
     def GetRecvBufferSize(self):
         return self.__ReceiveBufferSize
 
+    def GetIncomingWorkerCount(self):
+        return self.__IncomingWorkerCount
+
+    def GetIncomingQueueMax(self):
+        return self.__IncomingQueueMax
+
+    def GetIncomingQueueMaxPerSource(self):
+        return self.__IncomingQueueMaxPerSource
+
+    def GetIncomingSourceQuantum(self):
+        return self.__IncomingSourceQuantum
+
+    def GetRecvBatchSize(self):
+        return self.__RecvBatchSize
+
+    def GetSocketRecvBufferSize(self):
+        return self.__SocketRecvBufferSize
+
+    def GetCoalesceDownstream(self):
+        return self.__CoalesceDownstream
+
+    def GetCoalesceMTU(self):
+        return self.__CoalesceMTU
+
+    def GetSendEngine(self):
+        return self.__SendEngine
+
+    def GetSendEngineSockets(self):
+        return self.__SendEngineSockets
+
+    def GetIngestProcesses(self):
+        return self.__IngestProcesses
+
+    # this process is one of the ingest processes, rather than the main Oscar
+    def SetIngestShard(self,shardIndex,shardCount):
+        self.__IngestShardIndex = shardIndex
+        self.__IngestProcesses = shardCount
+
+    def GetIngestShard(self):
+        return self.__IngestShardIndex
+
+    def IsIngestShard(self):
+        return None != self.__IngestShardIndex
+
+    def GetPassThrough(self):
+        return self.__PassThrough
+
+    def GetStreamRecording(self):
+        return self.__StreamRecording
+
+    def GetRecordFileCompression(self):
+        return self.__RecordFileCompression
+
+    # returns (BufferSize,MaxFileBytes,MaxFileSeconds)
+    def GetStreamRecordingSettings(self):
+        return (self.__StreamRecordingBufferSize,self.__StreamRecordingMaxFileBytes,self.__StreamRecordingMaxFileSeconds)
+
+    # returns (MaxQueued,DropPolicy) for a target
+    def GetTargetQueueSettings(self,IP,Port):
+        Key = str(IP) + ":" + str(Port)
+        if Key in self.__TargetQueueOverrides:
+            return self.__TargetQueueOverrides[Key]
+
+        return (self.__TargetMaxQueued,self.__TargetDropPolicy)
+
     def GetShuntMap(self):
         return self.__ShuntMap
 
-    def GetResolvedShuntMap(self):
-        return self.__ShuntMapResolved
+    # returns the dataTuple of the shunt for this Namespace and ID, None if not shunted
+    def ResolveShunt(self,Namespace,ID):
+        key = (Namespace.lower(),ID.lower())
+        found,dataTuple = self.__ShuntCache.Get(key)
+        if found:
+            return dataTuple
 
-    def GetNotShuntedMap(self):
-        return self.__NotShuntedMap
+        dataTuple = None
+        for idRules in self.__ShuntRules.Matches(key[0]): # 1st namespace rule with a matching ID wins
+            dataTuple = idRules.Match(key[1])
+            if None != dataTuple:
+                break
+
+        self.__ShuntCache.Put(key,dataTuple)
+        return dataTuple
+
+    def GetShuntCache(self):
+        return self.__ShuntCache
+
+    def GetBITW_Cache(self):
+        return self.__BITW_Cache
 
     def GetShunting(self):
         if None == self.__Shunting:
@@ -130,17 +235,21 @@ class Configuration():
 
         return self.__Shunting
 
-    def GetUseGoverner(self):
-        return self.__UseGoverner
+    def GetGlobalRateLimit(self):
+        return self.__ShareOfRateLimit(self.__GlobalRateLimit)
 
-    def GetGovernerThreshhold(self):
-        return self.__GovernerThreshhold
+    def GetTargetRateLimit(self):
+        return self.__ShareOfRateLimit(self.__TargetRateLimit)
 
-    def GetGovernerBackoffPeriod(self):
-        return self.__GovernerBackoffPeriod
+    # each ingest process sends on its own, so gets an equal part of the limits
+    def __ShareOfRateLimit(self,settings):
+        if not self.IsIngestShard():
+            return settings
 
-    def GetGovernerMaxPacketsBeforeRest(self):
-        return self.__GovernerMaxPacketsBeforeRest
+        return tuple([value / float(self.__IngestProcesses) for value in settings])
+
+    def IsRateLimited(self):
+        return self.__GlobalRateLimit[0] > 0 or self.__GlobalRateLimit[1] > 0 or self.__TargetRateLimit[0] > 0 or self.__TargetRateLimit[1] > 0
 
 
     def SetExitAfterAutoPlay(self,value):
@@ -160,6 +269,18 @@ class Configuration():
     def GetPlaybackSpeed(self):
         return self.__PlaybackSpeed
 
+    def SetPlaybackAsFastAsPossible(self,value):
+        self.__PlaybackAsFastAsPossible = value
+
+    def GetPlaybackAsFastAsPossible(self):
+        return self.__PlaybackAsFastAsPossible
+
+    def SetPlaybackStartOffset(self,value):
+        self.__PlaybackStartOffset = value
+
+    def GetPlaybackStartOffset(self):
+        return self.__PlaybackStartOffset
+
     def SetRecordFilename(self,strName):
         self.__RecordFileName = strName
 
@@ -348,7 +469,8 @@ class Configuration():
                 autoIP = Alias.Alias(oscarAttributes["IP"].nodeValue)
                 autoPort = Alias.Alias(oscarAttributes["Port"].nodeValue)
                 autoKey = Alias.Alias(oscarAttributes["Key"].nodeValue)
-                self.SendBullHorn(autoIP,autoPort,autoKey)
+                if not self.IsIngestShard(): # main Oscar already did it
+                    self.SendBullHorn(autoIP,autoPort,autoKey)
 
             except Exception as Ex:
                 Log.getLogger().error("Invalid Auto Connect Configuration.")
@@ -357,6 +479,30 @@ class Configuration():
         if False == self.__ReadAutoConnectInfo(domDoc):
             return False
 
+        if False == self.__ReadIncomingProcessingInfo(domDoc):
+            return False
+
+        if False == self.__ReadCoalesceInfo(domDoc): # before targets are created
+            return False
+
+        if False == self.__ReadSendEngineInfo(domDoc): # before targets are created
+            return False
+
+        if False == self.__ReadIngestProcessesInfo(domDoc):
+            return False
+
+        if False == self.__ReadRateLimitInfo(domDoc): # before targets are created
+            return False
+
+        if False == self.__ReadPassThroughInfo(domDoc):
+            return False
+
+        if False == self.__ReadStreamRecordingInfo(domDoc):
+            return False
+
+        if False == self.__ReadTargetQueueInfo(domDoc):
+            return False
+
         self.__OutgoingDownstreamConnections = self.__ReadDownstreamTargets(domDoc)
 
         if None == self.GetOutgoingDownstreamConnections(): # go read targets, if none, then Houston we have an problemo
@@ -525,6 +671,9 @@ class Configuration():
 
                 connType = ConnectionType.Unknown
 
+                if False == self.__ReadTargetQueueOverride(attributes,IP,Port):
+                    return False
+
                 objTarget = Target.Target(IP,Port,connType,True)# could be Marvin or another Oscar
                 
                 #Key = socket.gethostbyname(IP) + ":" +str(Port)
@@ -534,6 +683,264 @@ class Configuration():
                     TargetManager.GetTargetManager().AddDownstreamTarget(objTarget,Key)
 
     ## Go and read the targets!
+    # <IncomingProcessing Workers="4" MaxQueued="50000" MaxQueuedPerSource="5000" SourceQuantum="4096" RecvBatch="64" SocketBuffer="4194304"/>
+    def __ReadIncomingProcessingInfo(self,domDoc):
+        nodeList = domDoc.getElementsByTagName("IncomingProcessing")
+        if None == nodeList or len(nodeList) == 0:
+            return True
+
+        attributes = nodeList[0].attributes
+        try:
+            if "Workers" in attributes:
+                self.__IncomingWorkerCount = int(Alias.Alias(attributes["Workers"].nodeValue))
+
+            if "MaxQueued" in attributes:
+                self.__IncomingQueueMax = int(Alias.Alias(attributes["MaxQueued"].nodeValue))
+
+            if "MaxQueuedPerSource" in attributes:
+                self.__IncomingQueueMaxPerSource = int(Alias.Alias(attributes["MaxQueuedPerSource"].nodeValue))
+
+            if "SourceQuantum" in attributes:
+                self.__IncomingSourceQuantum = int(Alias.Alias(attributes["SourceQuantum"].nodeValue))
+
+            if "RecvBatch" in attributes:
+                self.__RecvBatchSize = int(Alias.Alias(attributes["RecvBatch"].nodeValue))
+
+            if "SocketBuffer" in attributes:
+                self.__SocketRecvBufferSize = int(Alias.Alias(attributes["SocketBuffer"].nodeValue))
+
+        except Exception as Ex:
+            Log.getLogger().error(str(Ex))
+            Log.getLogger().error("Invalid <IncomingProcessing> settings")
+            return False
+
+        if self.__IncomingWorkerCount < 1 or self.__IncomingQueueMax < 1:
+            Log.getLogger().error("<IncomingProcessing> Workers and MaxQueued must be greater than 0")
+            return False
+
+        if self.__IncomingQueueMaxPerSource < 1 or self.__IncomingSourceQuantum < 1:
+            Log.getLogger().error("<IncomingProcessing> MaxQueuedPerSource and SourceQuantum must be greater than 0")
+            return False
+
+        if self.__RecvBatchSize < 1 or self.__SocketRecvBufferSize < 0:
+            Log.getLogger().error("<IncomingProcessing> RecvBatch must be greater than 0 and SocketBuffer can't be negative")
+            return False
+
+        Log.getLogger().info("Processing incoming data with " + str(self.__IncomingWorkerCount) + " workers, max queued: " + str(self.__IncomingQueueMax) + ", per source: " + str(self.__IncomingQueueMaxPerSource) + ", receive batch: " + str(self.__RecvBatchSize))
+        return True
+
+    # reads MaxQueued and DropPolicy attributes from <TargetQueue> or <TargetConnection>, returns None if invalid
+    def __ReadQueueAttributes(self,attributes,MaxQueued,Policy):
+        try:
+            if "MaxQueued" in attributes:
+                MaxQueued = int(Alias.Alias(attributes["MaxQueued"].nodeValue))
+
+            if "DropPolicy" in attributes:
+                strPolicy = Alias.Alias(attributes["DropPolicy"].nodeValue)
+                Policy = Target.DropPolicy.FromString(strPolicy)
+                if None == Policy:
+                    Log.getLogger().error("Invalid DropPolicy: " + strPolicy + " - must be DropOldest, DropNewest or KeepLatest")
+                    return None
+
+        except Exception as Ex:
+            Log.getLogger().error(str(Ex))
+            return None
+
+        if MaxQueued < 1:
+            Log.getLogger().error("MaxQueued must be greater than 0")
+            return None
+
+        return (MaxQueued,Policy)
+
+    # <TargetQueue MaxQueued="10000" DropPolicy="DropOldest"/> - default for all targets
+    def __ReadTargetQueueInfo(self,domDoc):
+        nodeList = domDoc.getElementsByTagName("TargetQueue")
+        if None == nodeList or len(nodeList) == 0:
+            return True
+
+        settings = self.__ReadQueueAttributes(nodeList[0].attributes,self.__TargetMaxQueued,self.__TargetDropPolicy)
+        if None == settings:
+            Log.getLogger().error("Invalid <TargetQueue> settings")
+            return False
+
+        self.__TargetMaxQueued,self.__TargetDropPolicy = settings
+        return True
+
+    # <TargetConnection IP="..." PORT="..." MaxQueued="500" DropPolicy="KeepLatest"/>
+    def __ReadTargetQueueOverride(self,attributes,IP,Port):
+        if not "MaxQueued" in attributes and not "DropPolicy" in attributes:
+            return True
+
+        settings = self.__ReadQueueAttributes(attributes,self.__TargetMaxQueued,self.__TargetDropPolicy)
+        if None == settings:
+            Log.getLogger().error("Invalid queue settings for Target Connection " + IP + ":" + str(Port))
+            return False
+
+        self.__TargetQueueOverrides[IP + ":" + str(Port)] = settings
+        return True
+
+    # <CoalesceDownstream MTU="1500">True</CoalesceDownstream>
+    def __ReadCoalesceInfo(self,domDoc):
+        nodeList = domDoc.getElementsByTagName("CoalesceDownstream")
+        if None == nodeList or len(nodeList) == 0:
+            return True
+
+        try:
+            strVal = Alias.Alias(nodeList[0].firstChild.nodeValue)
+            self.__CoalesceDownstream = strVal.upper() == "TRUE"
+            if "MTU" in nodeList[0].attributes:
+                self.__CoalesceMTU = int(Alias.Alias(nodeList[0].attributes["MTU"].nodeValue))
+
+        except Exception as Ex:
+            Log.getLogger().error(str(Ex))
+            Log.getLogger().error("Invalid <CoalesceDownstream> setting")
+            return False
+
+        if self.__CoalesceMTU < 576:
+            Log.getLogger().error("<CoalesceDownstream> MTU must be at least 576")
+            return False
+
+        if self.__CoalesceDownstream:
+            Log.getLogger().info("Coalescing downstream data into packets up to MTU of " + str(self.__CoalesceMTU))
+        return True
+
+    # reads PacketsPerSec, BytesPerSec, BurstPackets and BurstBytes attributes, returns None if invalid
+    def __ReadRateAttributes(self,attributes):
+        from Helpers import RateLimiter
+        settings = []
+        try:
+            for name in ["PacketsPerSec","BytesPerSec","BurstPackets","BurstBytes"]:
+                value = 0
+                if name in attributes:
+                    value = float(Alias.Alias(attributes[name].nodeValue))
+                if value < 0:
+                    Log.getLogger().error(name + " can't be negative")
+                    return None
+                settings.append(value)
+
+        except Exception as Ex:
+            Log.getLogger().error(str(Ex))
+            return None
+
+        return RateLimiter.DefaultBurst(tuple(settings))
+
+    # <RateLimit PacketsPerSec="20000" BytesPerSec="0" BurstPackets="2000" BurstBytes="0"/> - all targets together
+    # <TargetRateLimit PacketsPerSec="5000" BytesPerSec="0"/> - each target
+    # a rate of 0 (or left out) is unlimited, burst defaults to 1/10th of a second's worth
+    def __ReadRateLimitInfo(self,domDoc):
+        for tagName in ["RateLimit","TargetRateLimit"]:
+            nodeList = domDoc.getElementsByTagName(tagName)
+            if None == nodeList or len(nodeList) == 0:
+                continue
+
+            settings = self.__ReadRateAttributes(nodeList[0].attributes)
+            if None == settings:
+                Log.getLogger().error("Invalid <" + tagName + "> settings")
+                return False
+
+            if "RateLimit" == tagName:
+                self.__GlobalRateLimit = settings
+            else:
+                self.__TargetRateLimit = settings
+
+            Log.getLogger().info("<" + tagName + "> packets/s: " + str(settings[0]) + " bytes/s: " + str(settings[1]))
+
+        return True
+
+    # <SendEngine Sockets="4">True</SendEngine>
+    def __ReadSendEngineInfo(self,domDoc):
+        nodeList = domDoc.getElementsByTagName("SendEngine")
+        if None == nodeList or len(nodeList) == 0:
+            return True
+
+        try:
+            strVal = Alias.Alias(nodeList[0].firstChild.nodeValue)
+            self.__SendEngine = strVal.upper() == "TRUE"
+            if "Sockets" in nodeList[0].attributes:
+                self.__SendEngineSockets = int(Alias.Alias(nodeList[0].attributes["Sockets"].nodeValue))
+
+        except Exception as Ex:
+            Log.getLogger().error(str(Ex))
+            Log.getLogger().error("Invalid <SendEngine> setting")
+            return False
+
+        if self.__SendEngineSockets < 1:
+            Log.getLogger().error("<SendEngine> Sockets must be at least 1")
+            return False
+
+        return True
+
+    # <IngestProcesses>4</IngestProcesses>
+    def __ReadIngestProcessesInfo(self,domDoc):
+        nodeList = domDoc.getElementsByTagName("IngestProcesses")
+        if None == nodeList or len(nodeList) == 0 or self.IsIngestShard():
+            return True
+
+        try:
+            self.__IngestProcesses = int(Alias.Alias(nodeList[0].firstChild.nodeValue))
+
+        except Exception as Ex:
+            Log.getLogger().error(str(Ex))
+            Log.getLogger().error("Invalid <IngestProcesses> setting")
+            return False
+
+        if self.__IngestProcesses < 1:
+            Log.getLogger().error("<IngestProcesses> must be at least 1")
+            return False
+
+        return True
+
+    def __ReadPassThroughInfo(self,domDoc):
+        nodeList = domDoc.getElementsByTagName("PassThrough")
+        if None == nodeList or len(nodeList) == 0:
+            return True
+
+        try:
+            strVal = Alias.Alias(nodeList[0].firstChild.nodeValue)
+            self.__PassThrough = strVal.upper() == "TRUE"
+
+        except Exception as Ex:
+            Log.getLogger().error(str(Ex))
+            Log.getLogger().error("Invalid <PassThrough> setting")
+            return False
+
+        if not self.__PassThrough:
+            Log.getLogger().info("Minion data pass-through disabled")
+        return True
+
+    # <StreamRecording BufferSize="50000" MaxFileSizeMB="100" MaxFileMinutes="60" Compression="zlib">True</StreamRecording>
+    # Compression (zlib or lzma) is for .bifc files, whether streamed or saved
+    def __ReadStreamRecordingInfo(self,domDoc):
+        nodeList = domDoc.getElementsByTagName("StreamRecording")
+        if None == nodeList or len(nodeList) == 0:
+            return True
+
+        try:
+            attributes = nodeList[0].attributes
+            strVal = Alias.Alias(nodeList[0].firstChild.nodeValue)
+            self.__StreamRecording = strVal.upper() == "TRUE"
+            if "BufferSize" in attributes:
+                self.__StreamRecordingBufferSize = int(Alias.Alias(attributes["BufferSize"].nodeValue))
+            if "MaxFileSizeMB" in attributes:
+                self.__StreamRecordingMaxFileBytes = int(Alias.Alias(attributes["MaxFileSizeMB"].nodeValue)) * 1024 * 1024
+            if "MaxFileMinutes" in attributes:
+                self.__StreamRecordingMaxFileSeconds = int(Alias.Alias(attributes["MaxFileMinutes"].nodeValue)) * 60
+            if "Compression" in attributes: # for .bifc files
+                self.__RecordFileCompression = RecordFile.Compression.FromString(Alias.Alias(attributes["Compression"].nodeValue))
+
+        except Exception as Ex:
+            Log.getLogger().error(str(Ex))
+            Log.getLogger().error("Invalid <StreamRecording> setting")
+            return False
+
+        if None == self.__RecordFileCompression or self.__StreamRecordingBufferSize < 1 or self.__StreamRecordingMaxFileBytes < 0 or self.__StreamRecordingMaxFileSeconds < 0:
+            Log.getLogger().error("Invalid <StreamRecording> setting")
+            return False
+
+        if self.__StreamRecording:
+            Log.getLogger().info("Recordings will be streamed to disk")
+        return True
+
     def __ReadDownstreamTargets(self,domDoc):
         retList = []
         nodeList = domDoc.getElementsByTagName("TargetConnection")
@@ -560,6 +967,9 @@ class Configuration():
 
                 connType = ConnectionType.Unknown
 
+                if False == self.__ReadTargetQueueOverride(attributes,IP,Port):
+                    return False
+
                 objTarget = Target.Target(IP,Port,connType,True)# could be Marvin or another Oscar
 
                
@@ -667,7 +1077,34 @@ class Configuration():
                     Log.getLogger().error(str(Ex))
                     return False
 
+        self.__BITW_Rules = RuleMatcher.PatternSet(list(self.__BITW_NamespaceMap.items()))
+        self.__BITW_Cache.Clear()
+        return True
+
+    # <ShuntFlushInterval>250</ShuntFlushInterval> is how often (ms) changed shunt files get written
+    def __ReadShuntFlushInterval(self,domDoc):
+        nodeList = domDoc.getElementsByTagName("ShuntFlushInterval")
+        if None == nodeList or len(nodeList) == 0:
+            return True
+
+        try:
+            self.__ShuntWorkerThreadInterval = int(Alias.Alias(nodeList[0].firstChild.nodeValue))
+
+        except Exception as Ex:
+            Log.getLogger().error(str(Ex))
+            Log.getLogger().error("Invalid <ShuntFlushInterval> setting")
+            return False
+
+        if self.__ShuntWorkerThreadInterval < 1:
+            Log.getLogger().error("<ShuntFlushInterval> must be at least 1ms")
+            return False
+
+        return True
+
     def __ReadShuntInfo(self,domDoc):
+        if False == self.__ReadShuntFlushInterval(domDoc):
+            return False
+
         nodeList = domDoc.getElementsByTagName("Shunt")
         if None != nodeList and len(nodeList) > 0:
             for node in nodeList:
@@ -739,7 +1176,9 @@ class Configuration():
                     IdMap[IDKey] = dataTuple
                     self.__ShuntMap[NamespaceKey] = IdMap
 
-                self.__ShuntMapResolved[NamespaceKey+IDKey] = dataTuple 
+
+                if self.IsIngestShard(): # main Oscar owns the file, shunted data is forwarded to it
+                    continue
 
                 ## Initialize the file ##
                 try:
@@ -751,6 +1190,9 @@ class Configuration():
 
                 Log.getLogger().info("Creating Shunt [" + Namespace + ":" + ID +"] --> " + ShuntFile)
 
+        # compile them all now, rather than when the data shows up
+        self.__ShuntRules = RuleMatcher.PatternSet([(nsKey,RuleMatcher.PatternSet([(idKey,dataTuple) for idKey,dataTuple in idMap.items()])) for nsKey,idMap in self.__ShuntMap.items()])
+        self.__ShuntCache.Clear()
         return True
 
     def GetMarvinAutoConnectKeyFromHash(self,keyHash):
@@ -773,52 +1215,12 @@ class Configuration():
                         Alias.AliasMgr.AddAlias(attrName,Alias.Alias(attrValue))
 
 
-    def getNamespacesFromBuffer(self,buffer):
-        from Helpers import Configuration
-        config = Configuration.get()
-
-        start = '<Namespace>'
-        end = '</Namespace>'
-        reg = "(?<=%s).*?(?=%s)" % (start,end)
-        try:
-            r = re.compile(reg)
-            NamespaceList = r.findall(buffer)
-
-            if None == NamespaceList:
-                Log.getLogger().error("Error Something bad in trying to find namespaces HandleBITW " + buffer)
-                return None
-
-            list=[]
-
-            map = config.GetBITW_NamespaceMap()
-            checkedMap={}
-            for namespace in NamespaceList:
-                if not namespace in checkedMap: 
-                    checkedMap[namespace] = namespace # could be a group, and only need to check once, but could be case differences, so don't use upper
-                    strUp = namespace.upper() 
-                    if strUp in map:
-                        list.append((namespace,map[strUp]))
-
-        except Exception as ex:
-            print(str(ex))
-
-        return list
-
-
+    # changes every namespace in the buffer in one pass
     def HandleBITWBuffer(self,sendBuffer):
         if "<Oscar Type=\"ConnectionInformation\">" in sendBuffer:
             return sendBuffer # only care about Data
 
-        start = '<Namespace>'
-        end = '</Namespace>'
-
-        list = self.getNamespacesFromBuffer(sendBuffer)
-
-        for namespace,newNamespaceTuple in list:
-            newNamespace = self.GenerateBITW_String(namespace,newNamespaceTuple)
-            sendBuffer = sendBuffer.replace(start+namespace+end,start+newNamespace+end)
-
-        return sendBuffer
+        return Configuration._BITW_NamespaceTag.sub(lambda matched: "<Namespace>" + self.HandleBITWNamespace(matched.group(1)) + "</Namespace>",sendBuffer)
 
     def GenerateBITW_String(self,namespaceToCheck,tuple):
         if True == tuple[1]: # is append mode
@@ -828,20 +1230,13 @@ class Configuration():
     def HandleBITWNamespace(self, namespaceToCheck):
         if self.__BITW_Active:
             strUpper = namespaceToCheck.upper()
-            if strUpper in self.__BITW_NotMatchedMap:
-                return namespaceToCheck
-
-            if strUpper in self.__BITW_NamespaceMap:
-                return self.GenerateBITW_String(namespaceToCheck,self.__BITW_NamespaceMap[strUpper])
-
-            else: # Try regEx check
-                for key in self.__BITW_NamespaceMap.keys():
-                    regEx = re.compile(key)
-                    if regEx.match(strUpper) : #found a regEx match
-                        self.__BITW_NamespaceMap[strUpper] = self.__BITW_NamespaceMap[key] # put in resolved hash for speed
-                        return self.GenerateBITW_String(namespaceToCheck,self.__BITW_NamespaceMap[strUpper])
+            found,bitwTuple = self.__BITW_Cache.Get(strUpper)
+            if not found:
+                bitwTuple = self.__BITW_Rules.Match(strUpper)
+                self.__BITW_Cache.Put(strUpper,bitwTuple)
 
-            self.__BITW_NotMatchedMap[strUpper] = strUpper # map of notmatched, to speed up future data
+            if None != bitwTuple:
+                return self.GenerateBITW_String(namespaceToCheck,bitwTuple)
 
         return namespaceToCheck
 
@@ -31,12 +31,19 @@ from Helpers import OscarDataHandler
 from Helpers import MinionDataHandler
 from Helpers import MarvinDataHandler
 from Helpers import ThreadManager
+from Helpers import BinaryProtocol
+from Helpers import FastParser
+from Helpers import FairQueue
 from Util import Sleep
+from Util import Time
 import threading
+import collections
 import sys
 
 class DataHandler(object):
     _instance = None
+    MaxWorkerBatch = 64 # most packets a worker takes from a sender's queue at once
+    BinaryDecoderExpireInterval = 65000 # ms, a Minion goes back to XML if not heard from Oscar in this long
     def __init__(self):
         if DataHandler._instance == None: # singleton pattern
             DataHandler._instance = self
@@ -47,75 +54,174 @@ class DataHandler(object):
         self._OscarDataHandler = OscarDataHandler.GetDataHandler()
         self._MinionDataHandler = MinionDataHandler.GetDataHandler()
         self._MarvinDataHandler = MarvinDataHandler.MarvinDataHandler()
-        self.__MinionRecvQueueLock = Lock()
-        self.__MinionRecvQueue = []
-        self.__WorkerThreadCount = 0
-        self.__WorkerThreadCountLock = Lock()
-
-    def _GetWorkerThreadCount(self):
-        self.__WorkerThreadCountLock.acquire()
-        retVal = self.__WorkerThreadCount
-        self.__WorkerThreadCountLock.release()
-        return retVal
+        self.__MinionRecvQueue = None # FairQueue of (rawData,fromAddr), one sub-queue per sender, created with the workers
+        self.__ControlQueue = collections.deque() # (rawData,fromAddr) for control packets, so they don't wait behind data
+        self.__ControlQueueSignal = threading.Semaphore(0)
+        self.__MaxQueued = 0
+        self.__WorkersStarted = False
+        self.__WorkersStartedLock = Lock()
+        self.__BinaryDecoders = collections.OrderedDict() # sender --> [decoder,last used], least recently used 1st
+        self.__BinaryDecodersLock = Lock()
+        self.__ControlForwarder = None # in an ingest process, everything but Minion/Oscar data goes to the main Oscar
 
-    def _IncrementWorkerThreadCount(self):
-        self.__WorkerThreadCountLock.acquire()
-        self.__WorkerThreadCount += 1
-        retVal = self.__WorkerThreadCount
-        self.__WorkerThreadCountLock.release()
+    def SetControlForwarder(self,fnForward):
+        self.__ControlForwarder = fnForward
 
-        return retVal
+    # fixed number of workers, started once config has been read
+    def __StartWorkers(self):
+        from Helpers import Configuration
+        self.__WorkersStartedLock.acquire()
+        try:
+            if self.__WorkersStarted:
+                return
 
-    def _DecrementWorkerThreadCount(self):
-        self.__WorkerThreadCountLock.acquire()
-        self.__WorkerThreadCount -= 1
-        retVal = self.__WorkerThreadCount
-        self.__WorkerThreadCountLock.release()
+            workerCount = Configuration.get().GetIncomingWorkerCount()
+            self.__MaxQueued = Configuration.get().GetIncomingQueueMax()
+            self.__MinionRecvQueue = FairQueue.FairQueue(self.__MaxQueued,Configuration.get().GetIncomingQueueMaxPerSource(),Configuration.get().GetIncomingSourceQuantum())
+            Statistics.GetStatistics().SetIncomingWorkerCount(workerCount)
 
-        return retVal
+            for workerIndex in range(0,workerCount):
+                threadName = "DataHandlerWorker:" + str(workerIndex)
+                ThreadManager.GetThreadManager().CreateThread(threadName,self.__WorkerProc,workerIndex)
+                ThreadManager.GetThreadManager().StartThread(threadName)
+
+            threadName = "DataHandlerControlWorker"
+            ThreadManager.GetThreadManager().CreateThread(threadName,self.__ControlWorkerProc)
+            ThreadManager.GetThreadManager().StartThread(threadName)
+
+            self.__WorkersStarted = True
+        finally:
+            self.__WorkersStartedLock.release()
+
+    def GetQueueDepth(self):
+        if None == self.__MinionRecvQueue:
+            return 0
+        return len(self.__MinionRecvQueue)
 
+    # item is a list of (rawData,fromAddr), anything over a sender's share is dropped
+    # returns False if any of it was dropped
     def AddToSynchQueue(self,item):
-        self.__MinionRecvQueueLock.acquire()
-        self.__MinionRecvQueue.append(item)
-        retLen = len(self.__MinionRecvQueue)
-        self.__MinionRecvQueueLock.release()
-        return retLen
-
-    def GetItemFromSynchQueue(self):
-        self.__MinionRecvQueueLock.acquire()
+        dropped = self.__MinionRecvQueue.Add(item)
+        stats = Statistics.GetStatistics()
+        for fromAddr,numberDropped in dropped.items():
+            stats.OnSourcePacketsDropped(str(fromAddr[0]) + ":" + str(fromAddr[1]),numberDropped)
+
+        stats.OnIncomingQueueDepth(len(self.__MinionRecvQueue))
+        return len(dropped) == 0
+
+    # waits up to timeout seconds for something to process, returns a list of (rawData,fromAddr) from one sender
+    def GetItemFromSynchQueue(self,timeout):
+        return self.__MinionRecvQueue.Take(timeout,DataHandler.MaxWorkerBatch)
+
+    # control packets are few, small and time sensitive (Marvin heartbeats), so they get their own queue and worker
+    def AddToControlQueue(self,item):
+        if len(self.__ControlQueue) >= self.__MaxQueued:
+            Statistics.GetStatistics().OnIncomingPacketDropped()
+            return False
+
+        self.__ControlQueue.append(item)
+        self.__ControlQueueSignal.release()
+        return True
+
+    def GetControlQueueDepth(self):
+        return len(self.__ControlQueue)
+
+    def HandleLiveData(self,rawData,fromAddr):
+        self.HandleLiveDataBatch([(rawData,fromAddr)])
+
+    # everything a socket had waiting, data queued as one item rather than one per packet
+    def HandleLiveDataBatch(self,batch):
+        if not self.__WorkersStarted:
+            self.__StartWorkers()
+
+        dataBatch = []
+        for item in batch:
+            if FastParser.IsDataPacket(item[0]):
+                dataBatch.append(item)
+            else:
+                self.AddToControlQueue(item)
+
+        if len(dataBatch) > 0:
+            self.AddToSynchQueue(dataBatch)
+
+    def __ControlWorkerProc(self,fnKillSignalled,userData):
+        stats = Statistics.GetStatistics()
+        while not fnKillSignalled():
+            if not self.__ControlQueueSignal.acquire(True,0.25): # wake up once in a while to check if signalled to exit
+                continue
+
+            try:
+                rawData,FromAddr = self.__ControlQueue.popleft()
+            except IndexError:
+                continue
+
+            self.__HandleLiveData(rawData,FromAddr)
+            stats.OnControlPacketProcessed()
+
+    def __WorkerProc(self,fnKillSignalled,workerIndex):
+        stats = Statistics.GetStatistics()
+        while not fnKillSignalled():
+            dataBatch = self.GetItemFromSynchQueue(0.25) # wake up once in a while to check if signalled to exit
+
+            if None != dataBatch:
+                for rawData,FromAddr in dataBatch:
+                    self.__HandleLiveData(rawData,FromAddr) # go process teh data
+                stats.OnPacketProcessedByWorker(workerIndex,len(dataBatch))
+
+    def __GetBinaryDecoder(self,fromAddr):
+        self.__BinaryDecodersLock.acquire()
         try:
-            retVal = self.__MinionRecvQueue.pop(0)
-        except:
-            retVal = None
-        self.__MinionRecvQueueLock.release()
+            currMS = Time.GetCurrMS()
+            entry = self.__BinaryDecoders.get(fromAddr)
+            if None == entry:
+                entry = [BinaryProtocol.Decoder(),currMS]
+                self.__BinaryDecoders[fromAddr] = entry
+            else:
+                entry[1] = currMS
+                self.__BinaryDecoders.move_to_end(fromAddr)
+            retVal = entry[0]
+
+            # Minions that restart come from a new port, so toss decoders not used in a while
+            while len(self.__BinaryDecoders) > 1:
+                oldestAddr,oldest = next(iter(self.__BinaryDecoders.items()))
+                if oldest[1] + DataHandler.BinaryDecoderExpireInterval > currMS:
+                    break
+                del self.__BinaryDecoders[oldestAddr]
+        finally:
+            self.__BinaryDecodersLock.release()
         return retVal
 
+    def __HandleBinaryData(self,rawData,fromAddr):
+        try:
+            datapoints,unknownCount = self.__GetBinaryDecoder(fromAddr).Decode(rawData)
+        except ValueError as ex:
+            Statistics.GetStatistics().OnMalformedPacketReceived("Malformed binary Minion packet from " + str(fromAddr) + ": " + str(ex))
+            return
 
-    def HandleLiveData(self,rawData,fromAddr):
-        length = self.AddToSynchQueue((rawData,fromAddr))
-        threadCount = self._GetWorkerThreadCount()
-        if  threadCount < 1 or  length / threadCount > 25: # if > 25 items per thread, spawn another
-            newThread = threading.Thread(target=self.__SimpleWorker)
-            newThread.start()
-            self._IncrementWorkerThreadCount()
-            #Log.getLogger().debug("Adding worker thread #" + str(self._GetWorkerThreadCount()) + " to process Minion data. " + str(length) + " datapoints queued up")
-
-    def __SimpleWorker(self):
-        while not ThreadManager.GetThreadManager().AllStopSignalled():
-            dataBlock = self.GetItemFromSynchQueue() # get data to process
-
-            if None != dataBlock:
-                rawData,FromAddr = dataBlock
-                self.__HandleLiveData(rawData,FromAddr) # go process teh data
-            else: # no data to process, maybe reduce woker count
-                if self._GetWorkerThreadCount() > 2:
-                    self._DecrementWorkerThreadCount()
-                    #Log.getLogger().debug("Reducing worker threads")
-                    return
-                else:
-                    Sleep.SleepMs(10) 
+        if unknownCount > 0: # dictionary entry lost or Oscar restarted, Minion will re-send it shortly
+            Statistics.GetStatistics().OnMalformedPacketReceived("Received " + str(unknownCount) + " binary datapoint(s) with unknown Namespace/ID from " + str(fromAddr))
+
+        if len(datapoints) > 0:
+            self._MinionDataHandler.HandleIncomingBinaryPacket(datapoints,rawData,fromAddr)
 
     def __HandleLiveData(self,rawData,fromAddr):
+        if BinaryProtocol.IsBinaryPacket(rawData):
+            self.__HandleBinaryData(rawData,fromAddr)
+            return
+
+        parsed = FastParser.ParseDataPacket(rawData) # data packets don't need a DOM
+        if None != parsed:
+            rootName,datapoints = parsed
+            if "Minion" == rootName or "MinionGroup" == rootName:
+                self._MinionDataHandler.HandleIncomingDatapoints(datapoints,rawData,fromAddr,"MinionGroup" == rootName)
+            else:
+                self._OscarDataHandler.HandleIncomingDatapoints(datapoints,rawData,fromAddr,"OscarGroup" == rootName)
+            return
+
+        if None != self.__ControlForwarder:
+            self.__ControlForwarder(rawData,fromAddr)
+            return
+
         try:
             dom = xml.dom.minidom.parseString(rawData)
             node = dom._get_firstChild()
@@ -0,0 +1,105 @@
+##############################################################################
+#  Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+##############################################################################
+#    File Abstract:
+#    Queue of received packets that is fair to each sender.  Every source
+#    (IP:Port) gets its own sub-queue, with a cap, and workers take from them
+#    using deficit round robin, so a Minion sending flat out can't starve the
+#    others.  What goes over the cap is dropped and counted per source.
+##############################################################################
+import collections
+import threading
+
+class _SourceQueue(object):
+    def __init__(self):
+        self.Packets = collections.deque() # (rawData,fromAddr)
+        self.Deficit = 0                   # bytes it may still take this turn
+        self.HasTurn = False               # has been given its quantum, and not yet moved to the back
+
+class FairQueue(object):
+    def __init__(self,maxQueued,maxPerSource,quantum):
+        self._MaxQueued = maxQueued        # all sources together
+        self._MaxPerSource = maxPerSource
+        self._Quantum = quantum            # bytes a source gets each time around
+        self.__Lock = threading.Lock()
+        self.__Signal = threading.Condition(self.__Lock)
+        self.__Sources = {}                # source --> _SourceQueue, only while it has something queued
+        self.__RoundRobin = collections.deque() # sources with something queued, in turn order
+        self.__Count = 0
+
+    def __len__(self):
+        return self.__Count
+
+    # batch is a list of (rawData,fromAddr), returns {source:dropped} for what didn't fit
+    def Add(self,batch):
+        dropped = {}
+        added = 0
+        with self.__Lock:
+            for item in batch:
+                source = item[1]
+                objQueue = self.__Sources.get(source)
+                if None == objQueue:
+                    objQueue = _SourceQueue()
+
+                if len(objQueue.Packets) >= self._MaxPerSource or self.__Count >= self._MaxQueued:
+                    dropped[source] = dropped.get(source,0) + 1
+                    continue
+
+                if 0 == len(objQueue.Packets):
+                    self.__Sources[source] = objQueue
+                    self.__RoundRobin.append(source)
+
+                objQueue.Packets.append(item)
+                self.__Count += 1
+                added += 1
+
+            if added > 0:
+                self.__Signal.notify(added)
+
+        return dropped
+
+    # waits up to timeout seconds, returns a list of up to maxPackets from one source, or None
+    def Take(self,timeout,maxPackets):
+        with self.__Lock:
+            if 0 == self.__Count and not self.__Signal.wait(timeout):
+                return None
+
+            while self.__Count > 0:
+                source = self.__RoundRobin[0]
+                objQueue = self.__Sources[source]
+                if not objQueue.HasTurn:
+                    objQueue.Deficit += self._Quantum
+                    objQueue.HasTurn = True
+
+                batch = []
+                while len(objQueue.Packets) > 0 and len(batch) < maxPackets:
+                    size = len(objQueue.Packets[0][0])
+                    if size > objQueue.Deficit:
+                        break
+                    objQueue.Deficit -= size
+                    batch.append(objQueue.Packets.popleft())
+
+                self.__Count -= len(batch)
+                if 0 == len(objQueue.Packets): # nothing left, so it doesn't get to save up
+                    self.__RoundRobin.popleft()
+                    del self.__Sources[source]
+                elif len(batch) < maxPackets: # used up what it was given, next source's turn
+                    objQueue.HasTurn = False
+                    self.__RoundRobin.rotate(-1)
+
+                if len(batch) > 0:
+                    return batch
+
+            return None
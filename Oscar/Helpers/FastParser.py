@@ -0,0 +1,146 @@
+##############################################################################
+#  Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+##############################################################################
+#    File Abstract:
+#    Fast path for decoding data packets.  Uses precompiled regular expressions
+#    rather than building a DOM, and only understands the data layouts:
+#       <Minion Type="Data">   <MinionGroup>
+#       <Oscar Type="Data">    <OscarGroup>
+#    Anything else (control packets, or data missing a field, or something
+#    it doesn't quite understand) returns None and should be handled by the
+#    regular DOM based code.
+#    Also can patch a Minion data packet into Oscar form for pass-through.
+##############################################################################
+import re
+
+_Header = re.compile(r'\s*(?:<\?xml[^>]*\?>)?\s*')
+_Item = re.compile(r'<(Minion|Oscar) Type="Data">(.*?)</\1>\s*',re.S)
+_Field = re.compile(r'<(\w+)(?:\s[^>]*)?>([^<]*|<!\[CDATA\[.*?\]\]>)</\1>\s*',re.S)
+_AllFields = re.compile(r'(?:<(\w+)(?:\s[^>]*)?>(?:[^<]*|<!\[CDATA\[.*?\]\]>)</\1>\s*)*',re.S)
+_Entities = {"&lt;":"<","&gt;":">","&amp;":"&","&quot;":"\"","&apos;":"'"}
+_EntityPattern = re.compile(r'&(?:lt|gt|amp|quot|apos);')
+_MinionOnlyFields = re.compile(r'<(PacketNumber|Normalized|ElapsedTime)>[^<]*</\1>\s*')
+_MinionTags = re.compile(r'<(/?)Minion(Group)?( Type="Data")?>')
+_DataPrefix = re.compile(r'\s*(?:<\?xml[^>]*\?>)?\s*<(?:(?:Minion|Oscar) Type="Data"|MinionGroup|OscarGroup)>')
+
+XML_HEADER = "<?xml version=\"1.0\" encoding=\"utf-8\"?>"
+
+GROUPS = {"<MinionGroup>":("MinionGroup","</MinionGroup>"),"<OscarGroup>":("OscarGroup","</OscarGroup>")}
+
+def _ToText(strRaw):
+    if strRaw.startswith("<![CDATA["):
+        return strRaw[9:-3]
+
+    if "&" in strRaw:
+        if "&#" in strRaw:
+            return None # character references, let the DOM deal with it
+        return _EntityPattern.sub(lambda match: _Entities[match.group(0)],strRaw)
+
+    return strRaw
+
+# returns (Version,Namespace,ID,Value,ElapsedTime) or None
+def _ParseItem(itemType,strBody):
+    if None == _AllFields.fullmatch(strBody): # something other than simple fields in there
+        return None
+
+    fields = dict(_Field.findall(strBody))
+
+    try:
+        if "Minion" == itemType:
+            elapsedTime = fields["ElapsedTime"]
+        else:
+            elapsedTime = 0
+
+        namespace = _ToText(fields["Namespace"])
+        ID = _ToText(fields["ID"])
+        value = _ToText(fields["Value"])
+        version = fields["Version"]
+
+    except KeyError:
+        return None  # let the DOM code report exactly what is missing
+
+    if not namespace or not ID or not value: # None or empty
+        return None
+
+    return (version,namespace,ID,value,elapsedTime)
+
+# quick look at the start of a packet, True for data (including binary) and False
+# for control packets (watchdogs, tasks, connection information and such)
+def IsDataPacket(rawData):
+    if not isinstance(rawData,str):
+        return True # binary Minion data
+
+    return None != _DataPrefix.match(rawData)
+
+# returns None if not a data packet, otherwise a tuple of
+#   (root node name, [(Version,Namespace,ID,Value,ElapsedTime),...])
+def ParseDataPacket(rawData):
+    if not isinstance(rawData,str):
+        return None
+
+    pos = _Header.match(rawData).end()
+    endPos = len(rawData.rstrip())
+
+    rootName = None
+    for startTag,groupInfo in GROUPS.items():
+        if rawData.startswith(startTag,pos):
+            rootName,endTag = groupInfo
+            if not rawData.endswith(endTag,0,endPos):
+                return None
+            pos += len(startTag)
+            endPos -= len(endTag)
+            break
+
+    datapoints = []
+    while pos < endPos:
+        match = _Item.match(rawData,pos)
+        if None == match or match.end() > endPos:
+            return None
+
+        itemType = match.group(1)
+        if None == rootName:
+            rootName = itemType
+        elif not rootName.startswith(itemType): # Minion in an OscarGroup or whatever
+            return None
+
+        dataTuple = _ParseItem(itemType,match.group(2))
+        if None == dataTuple:
+            return None
+
+        datapoints.append(dataTuple)
+        pos = match.end()
+
+        if rootName == itemType and pos < endPos: # not a group, should only be one
+            return None
+
+    if 0 == len(datapoints):
+        return None
+
+    return (rootName,datapoints)
+
+# Turns a Minion data packet (already accepted by ParseDataPacket) into the
+# Oscar packet a Marvin expects, by patching the buffer rather than re-building
+# it.  Values stay as they came in, so no unescaping/escaping needed.
+def MinionToOscar(rawData,isGroup):
+    buffer = _MinionOnlyFields.sub("",rawData)
+    buffer = _MinionTags.sub(r'<\1Oscar\2\3>',buffer)
+
+    if not isGroup:
+        buffer = buffer.replace("<Value>","<Value LiveData=\"True\">",1)
+
+    if not buffer.lstrip().startswith("<?xml"):
+        buffer = XML_HEADER + buffer
+
+    return buffer
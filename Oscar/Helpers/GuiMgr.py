@@ -49,6 +49,9 @@ def OnDataPacketSentDownstream(objData,sentFrom=None):
 
     GuiMgr.get().OnDataPacketSentDownstream(objData,sentFrom)
 
+def IsLiveViewShown():
+    return GuiMgr.get().IsLiveViewShown()
+
 def OnStartLiveData():
     GuiMgr.get().OnStartLiveData()
 
@@ -124,6 +127,7 @@ class GuiMgr(object):
         self.Live_Active=True           #The live window is Visable
         self.Live_Receiving=True       
         self.Live_Recording=False
+        self.Live_Shown=True            # something displays the live data, no GUI means nothing does
 
         self.Playback_Active=False      # The Playback window is Visable
         self.Playback_Playing=False
@@ -164,6 +168,7 @@ class GuiMgr(object):
         self.pGui.OnQuit()
 
     def _SetupGuiNone(self):
+        self.Live_Shown = False
         from Helpers import GuiNone
         self.pGui = GuiNone.GuiNone()
 
@@ -185,11 +190,23 @@ class GuiMgr(object):
     def GetDatalist(self):
         return self.dataList
 
+    # hands over everything updated since last time, for an ingest process to pass to the main Oscar
+    def TakeDatalist(self):
+        dataList = self.dataList
+        self.dataList = {}
+        return dataList
+
     def ClearDataView(self):
         newDl = {}
         self.dataList=newDl
         self.pGui.OnClearData()
 
+    def IsLiveViewShown(self):
+        return self.Live_Shown
+
+    def SetLiveViewShown(self,flag):
+        self.Live_Shown = flag
+
     def OnDataPacketSentDownstream(self,objData,sentFrom):
         key = objData.Namespace.upper()+":"+objData.ID.upper()
         self.dataList[key] = (objData,sentFrom)
@@ -247,18 +247,24 @@ class TargetView():
     def __init__(self,parent):
         self.root =  parent#ttk.Frame(parent,borderwidth=5,relief="sunken")
         self.tree = ttk.Treeview(self.root)
-        self.tree['columns'] = ('IP','Port','Type','Packets','Bytes')
+        self.tree['columns'] = ('IP','Port','Type','Packets','Bytes','Queued','Dropped','Waited')
         self.tree.heading('IP',text='IP')
         self.tree.heading('Port',text='Port')
         self.tree.heading('Type',text='Type')
         self.tree.heading('Packets',text='Packets')
         self.tree.heading('Bytes',text='Bytes')
+        self.tree.heading('Queued',text='Queued')
+        self.tree.heading('Dropped',text='Dropped')
+        self.tree.heading('Waited',text='Waited ms') # on the rate limiter
 
         self.tree.column('IP',width=100)
         self.tree.column('Port',width=50,anchor='e')
         self.tree.column('Type',width=70,anchor='e')
         self.tree.column('Packets',width=70,anchor='e')
         self.tree.column('Bytes',width=90,anchor='e')
+        self.tree.column('Queued',width=60,anchor='e')
+        self.tree.column('Dropped',width=70,anchor='e')
+        self.tree.column('Waited',width=70,anchor='e')
 
         self.tree['show'] = 'headings'  # gets rid of 1st empty column
         #self.root.grid(sticky=(N,S))
@@ -288,10 +294,16 @@ class TargetView():
             target = TargetManager.GetTargetManager().GetDownstreamTarget(key)
             strPackets=str(target.m_PacketsSent)
             strBytes = str(target.m_BytestSent)
+            strQueued = str(target.GetQueueDepth())
+            strDropped = str(target.m_PacketsDropped)
+            strWaited = str(int(target.m_RateLimitWaitTime))
             strType = target.getTypeStr()
             try:
                 self.tree.set(key,'Packets',strPackets)
                 self.tree.set(key,'Bytes',strBytes)
+                self.tree.set(key,'Queued',strQueued)
+                self.tree.set(key,'Dropped',strDropped)
+                self.tree.set(key,'Waited',strWaited)
                 self.tree.set(key,'Type',strType)
                 if True == target.m_hasTimedOut:
                     self.tree.set(key,'IP',"*"+target.getIP())
@@ -300,7 +312,7 @@ class TargetView():
                     self.tree.set(key,'IP',target.getIP())
             except Exception as Ex:
                 try:
-                    self.tree.insert('','end',key,values=(target.getIP(),str(target.getPort()),strType,strPackets,strBytes))
+                    self.tree.insert('','end',key,values=(target.getIP(),str(target.getPort()),strType,strPackets,strBytes,strQueued,strDropped,strWaited))
                 except Exception as Ex:
                     Log.getLogger().error(str(Ex))
 
@@ -457,6 +469,7 @@ class PlaybackControls():
         self.lblStartLoop = Label(self.root,width=3,justify=CENTER)
         self.lblEndLoop = Label(self.root,width=3,justify=CENTER)
         self.lblPlaybackTime = Label(self.root,width=10,justify=CENTER)
+        self.lblWarmup = Label(self.root,width=12,justify=CENTER) # progress of preparing loaded data
 
         self.slider = Scale(self.root,from_=0, to=100, orient=HORIZONTAL,length=300,command=self.sliderUpdate)
         self.slider.bind("<ButtonRelease-1>",self.sliderHandler)
@@ -488,6 +501,7 @@ class PlaybackControls():
         self.btnStartLoop.grid(row=loopBtnRow,column=0,columnspan=2)
         self.btnStopLoop.grid(row=loopBtnRow,column=2,columnspan=2)
         self.lblPlaybackTime.grid(row=labelRow,column=0,sticky=(N),columnspan=3) 
+        self.lblWarmup.grid(row=loopRow,column=4,columnspan=2)
 
         disable(self.btnStopPlayback)
         disable(self.btnPausePlayback)
@@ -601,6 +615,15 @@ class PlaybackControls():
         strVal = currTime  + "/" + endTime + " secs"
         self.lblPlaybackTime.config(text=strVal) 
 
+    def updateWarmupProgress(self):
+        done,total = Playback.get().GetWarmupProgress()
+        if done >= total:
+            strVal = ""
+        else:
+            strVal = "Preparing " + str(int(done * 100 / total)) + "%"
+
+        self.lblWarmup.config(text=strVal)
+
     def updateGui(self):
         playbackMgr = Playback.get()
         guiMgr = GuiMgr.get()
@@ -610,6 +633,7 @@ class PlaybackControls():
         self.updatePlaybackSpeed()
         self.updateLoopValue()
         self.updatePlaybackTime()
+        self.updateWarmupProgress()
 
         if guiMgr.Playback_Active and False == self.Visible:
             self.root.grid()
@@ -729,6 +753,26 @@ class StatisticsView():
         self.lblTotalMinionTasks = self.CreateStatLabel(otherFrame,6,3)
         self.CreateLabel(otherFrame,"Total Shunted Packets",7,1)
         self.lblTotalShuntedPackets = self.CreateStatLabel(otherFrame,7,3)
+        self.CreateLabel(otherFrame,"Incoming Packets Dropped",8,1)
+        self.lblTotalIncomingDropped = self.CreateStatLabel(otherFrame,8,3)
+        self.CreateLabel(otherFrame,"Incoming Queue High Water Mark",9,1)
+        self.lblIncomingHighWaterMark = self.CreateStatLabel(otherFrame,9,3)
+        self.CreateLabel(otherFrame,"Packets Processed per Worker",10,1)
+        self.lblWorkerPacketsProcessed = self.CreateStatLabel(otherFrame,10,3)
+        self.CreateLabel(otherFrame,"Packets Dropped by OS (socket buffer full)",11,1)
+        self.lblKernelRecvDrops = self.CreateStatLabel(otherFrame,11,3)
+        self.CreateLabel(otherFrame,"Receive Batches (largest)",12,1)
+        self.lblRecvBatches = self.CreateStatLabel(otherFrame,12,3)
+        self.CreateLabel(otherFrame,"Control Packets (priority)",13,1)
+        self.lblControlPacketsProcessed = self.CreateStatLabel(otherFrame,13,3)
+        self.CreateLabel(otherFrame,"Source with most Dropped",14,1)
+        self.lblWorstSource = self.CreateStatLabel(otherFrame,14,3)
+        self.CreateLabel(otherFrame,"Rate Limit Waits (ms waited)",15,1)
+        self.lblRateLimitWaits = self.CreateStatLabel(otherFrame,15,3)
+        self.CreateLabel(otherFrame,"Shunt Rule Cache (hits/misses)",16,1)
+        self.lblShuntCache = self.CreateStatLabel(otherFrame,16,3)
+        self.CreateLabel(otherFrame,"BITW Rule Cache (hits/misses)",17,1)
+        self.lblBITWCache = self.CreateStatLabel(otherFrame,17,3)
 
 
     def CreateLabel(self,root,strText,rowVal,columnVal):
@@ -762,6 +806,19 @@ class StatisticsView():
             self.lblTotalOscarTasks.configure(text=str(sm._TotalOscarTasksReceived))
             self.lblTotalMinionTasks.configure(text=str(sm._TotalMinionTasksReceived))
             self.lblTotalShuntedPackets.configure(text=str(sm._TotalShuntedPackets))
+            self.lblTotalIncomingDropped.configure(text=str(sm._TotalIncomingPacketsDropped))
+            self.lblIncomingHighWaterMark.configure(text=str(sm._IncomingQueueHighWaterMark))
+            self.lblWorkerPacketsProcessed.configure(text="/".join([str(count) for count in sm._WorkerPacketsProcessed]))
+            kernelDrops = sm.GetKernelRecvDrops()
+            self.lblKernelRecvDrops.configure(text="n/a" if None == kernelDrops else str(kernelDrops))
+            self.lblRecvBatches.configure(text=str(sm._RecvBatches) + " (" + str(sm._LargestRecvBatch) + ")")
+            self.lblControlPacketsProcessed.configure(text=str(sm._ControlPacketsProcessed))
+            worstSource = sm.GetWorstSource()
+            self.lblWorstSource.configure(text="none" if None == worstSource else worstSource[0] + " (" + str(worstSource[1]) + ")")
+            self.lblRateLimitWaits.configure(text=str(sm._RateLimitWaits) + " (" + str(int(sm._RateLimitWaitTime)) + ")")
+            shuntCache,bitwCache = sm.GetRuleCacheStats()
+            self.lblShuntCache.configure(text=str(shuntCache[0]) + "/" + str(shuntCache[1]))
+            self.lblBITWCache.configure(text=str(bitwCache[0]) + "/" + str(bitwCache[1]))
 
 class MenuSystem():
     def __init__(self,parent):
@@ -798,7 +855,7 @@ class MenuSystem():
 
     def HandleOpen(self):
         options = {}
-        options['filetypes'] = [('Oscar Data files', '.biff')]
+        options['filetypes'] = [('Oscar Data files', '.biff'),('Oscar Indexed files','.bifc'),('Marvin Format','.bifm')]
         options['parent'] = self.root
        
         filename = tkinter.filedialog.askopenfilename(**options)
@@ -815,7 +872,7 @@ class MenuSystem():
 
     def HandleSave(self):
         options = {}
-        options['filetypes'] = [('Oscar Data files', '.biff'),('Marvin Format','.bifm')]
+        options['filetypes'] = [('Oscar Data files', '.biff'),('Oscar Indexed files','.bifc'),('Marvin Format','.bifm')]
         options['initialfile'] = 'OscarSaveFile.biff'
         options['defaultextension'] = '.biff'
         options['parent'] = self.root
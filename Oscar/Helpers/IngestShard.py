@@ -0,0 +1,324 @@
+##############################################################################
+#  Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+##############################################################################
+#    File Abstract:
+#    Splits receiving and processing of Minion data across several processes,
+#    all listening on the upstream port using SO_REUSEPORT, so it isn't held
+#    to a single core by the GIL.  Each ingest process parses and sends to the
+#    targets itself.  The main Oscar keeps the GUI, recording, shunt files and
+#    everything to do with Marvins, tells the ingest processes which targets
+#    there are, and adds up their statistics.
+##############################################################################
+import collections
+import multiprocessing
+import os
+import queue
+import socket
+from Helpers import Log
+from Helpers import ThreadManager
+from Helpers import Configuration
+from Helpers import Statistics
+from Helpers import TargetManager
+from Helpers import Target
+from Helpers import DataHandler
+from Helpers import GuiMgr
+from Helpers import Recorder
+from Helpers import Server
+from Data import MarvinData
+from Data.ConnectionPoint import ConnectionType
+from Util import Time
+
+SyncInterval = 250   # ms between the main Oscar sending targets and settings to the ingest processes
+FlushInterval = 100  # ms between ingest processes sending what the main Oscar needs
+StatsInterval = 1000 # ms between ingest processes sending statistics
+
+_IngestProcesses = None
+
+# starts receiving Minion data, either in this process or split across several
+def StartIngest(upstreamServer):
+    global _IngestProcesses
+    count = Configuration.get().GetIngestProcesses()
+    if count > 1 and CanShareIngest(upstreamServer):
+        _IngestProcesses = IngestProcesses(upstreamServer,count)
+        return _IngestProcesses.Start()
+
+    return upstreamServer.Start()
+
+# True if ingest processes are doing the receiving, rather than the upstream server in this process
+def IsShared():
+    return None != _IngestProcesses
+
+def CanShareIngest(upstreamServer):
+    config = Configuration.get()
+    if not hasattr(socket,"SO_REUSEPORT"):
+        Log.getLogger().warning("<IngestProcesses> needs SO_REUSEPORT, which this OS does not have, using a single process")
+        return False
+
+    if 0 == upstreamServer.getPort():
+        Log.getLogger().warning("<IngestProcesses> needs a fixed upstream port, using a single process")
+        return False
+
+    if None != config.GetProxyConnection() or None != config.GetProxyServerConnection():
+        Log.getLogger().warning("<IngestProcesses> can't be used with a proxy connection, using a single process")
+        return False
+
+    return True
+
+#############
+# Lives in the main Oscar, starts the ingest processes and handles what they send back
+#############
+class IngestProcesses(object):
+    def __init__(self,upstreamServer,count):
+        self.__UpstreamServer = upstreamServer # not started, but still what the GUI uses to stop/start live data
+        self.__Count = count
+        self.__Context = multiprocessing.get_context("spawn") # threads are already running, so fork isn't safe
+        self.__FromShards = self.__Context.Queue()
+        self.__Shards = []       # (process,queue to it)
+        self.__TargetStats = {}  # (shardIndex,TargetID) --> (packets,bytes,dropped) last reported
+        self.__ThreadName = "IngestProcesses"
+
+    def Start(self):
+        config = Configuration.get()
+        logBase,logExt = os.path.splitext(config.GetLogFilename())
+        for shardIndex in range(self.__Count):
+            settings = (config.GetConfigFilename(),logBase + "_Ingest" + str(shardIndex) + logExt,Log.getLogger().level,MarvinData.MarvinData.GetStartTime())
+            toShard = self.__Context.Queue()
+            process = self.__Context.Process(target=ShardMain,args=(shardIndex,self.__Count,settings,self.__FromShards,toShard),name="OscarIngest" + str(shardIndex))
+            process.daemon = True
+            process.start()
+            self.__Shards.append((process,toShard))
+
+        Log.getLogger().info("Receiving Minion data on " + str(self.__UpstreamServer) + " using " + str(self.__Count) + " processes")
+
+        ThreadManager.GetThreadManager().CreateThread(self.__ThreadName,self.__WorkerProc)
+        ThreadManager.GetThreadManager().StartThread(self.__ThreadName)
+        return True
+
+    def __GetTargetList(self):
+        targetList = []
+        for TargetID,objTarget in list(TargetManager.GetTargetManager().GetDownstreamTargets().items()):
+            if isinstance(objTarget,Target.Target):
+                targetList.append((TargetID,objTarget.getIP(),objTarget.getPort(),objTarget.Type,objTarget.m_hasTimedOut))
+
+        return targetList
+
+    def __SyncShards(self):
+        message = ("Sync",self.__GetTargetList(),self.__UpstreamServer.IsDroppingPackets(),Recorder.get().IsRecording(),GuiMgr.IsLiveViewShown())
+        for _,toShard in self.__Shards:
+            toShard.put(message)
+
+    def __MergeTargetStats(self,shardIndex,targetStats):
+        objTargetManager = TargetManager.GetTargetManager()
+        for TargetID,counts in targetStats.items():
+            previous = self.__TargetStats.get((shardIndex,TargetID),(0,0,0))
+            self.__TargetStats[(shardIndex,TargetID)] = counts
+            if counts[0] < previous[0]: # target was removed and re-created
+                previous = (0,0,0)
+
+            objTarget = objTargetManager.GetDownstreamTarget(TargetID)
+            if None == objTarget:
+                continue
+
+            objTarget.m_PacketsSent += counts[0] - previous[0]
+            objTarget.m_BytestSent += counts[1] - previous[1]
+            objTarget.m_PacketsDropped += counts[2] - previous[2]
+
+    def __HandleMessage(self,message):
+        msgType,shardIndex,contents = message
+        if "Control" == msgType: # Minion ConnectionInformation and such
+            DataHandler.GetDataHandler().HandleLiveDataBatch(contents)
+
+        elif "Shunt" == msgType:
+            config = Configuration.get()
+            objTargetManager = TargetManager.GetTargetManager()
+            for namespace,ID,Value in contents:
+                dataTuple = config.ResolveShunt(namespace,ID)
+                if None != dataTuple:
+                    objTargetManager.Shunt(namespace,ID,dataTuple,Value)
+
+        elif "Live" == msgType:
+            for objData,sentFrom in contents:
+                GuiMgr.OnDataPacketSentDownstream(objData,sentFrom)
+
+        elif "Record" == msgType:
+            objRecorder = Recorder.get()
+            for objData in contents:
+                objRecorder.AddData(objData)
+
+        elif "Stats" == msgType:
+            snapshot,targetStats = contents
+            Statistics.GetStatistics().MergeSnapshot(shardIndex,snapshot)
+            self.__MergeTargetStats(shardIndex,targetStats)
+
+        elif "Exit" == msgType:
+            Log.getLogger().error("Ingest process " + str(shardIndex) + " has exited, see its log file")
+
+    def __StopShards(self):
+        for _,toShard in self.__Shards:
+            toShard.put(("Quit",))
+
+        for process,_ in self.__Shards:
+            process.join(2)
+            if process.is_alive():
+                process.terminate()
+
+    def __WorkerProc(self,fnKillSignalled,userData):
+        nextSync = 0
+        try:
+            while not fnKillSignalled(): # run until signalled to end - call passed function to check for the signal
+                if Time.GetCurrMS() >= nextSync:
+                    self.__SyncShards()
+                    nextSync = Time.GetCurrMS() + SyncInterval
+
+                try:
+                    message = self.__FromShards.get(True,0.05)
+                except queue.Empty:
+                    continue
+
+                self.__HandleMessage(message)
+
+        except Exception as Ex:
+            Log.getLogger().error("Unknown error handling ingest processes: " + str(Ex))
+
+        self.__StopShards()
+
+# entry point for an ingest process
+def ShardMain(shardIndex,shardCount,settings,toParent,fromParent):
+    configFilename,logFilename,logLevel,startTime = settings
+    config = Configuration.get()
+    config.SetConfigFilename(configFilename)
+    config.SetLogFilename(logFilename)
+    config.SetIngestShard(shardIndex,shardCount)
+    if logLevel > 0:
+        Log.setLevel(logLevel)
+
+    MarvinData.MarvinData.SetStartTime(startTime) # so recorded times line up with the main Oscar
+
+    if config.ReadConfigFile():
+        IngestShard(shardIndex,toParent,fromParent).Run()
+    else:
+        Log.getLogger().error("Ingest process " + str(shardIndex) + " unable to read " + configFilename)
+
+    toParent.put(("Exit",shardIndex,None))
+    ThreadManager.GetThreadManager().StopAllThreads()
+
+#############
+# Lives in an ingest process, receives and sends Minion data, passes the rest to the main Oscar
+#############
+class IngestShard(object):
+    def __init__(self,shardIndex,toParent,fromParent):
+        self.__Index = shardIndex
+        self.__ToParent = toParent
+        self.__FromParent = fromParent
+        self.__Control = collections.deque()  # (rawData,fromAddr), append/popleft are thread safe
+        self.__Shunted = collections.deque()  # (namespace,ID,Value)
+        self.__Recorded = collections.deque() # MarvinData objects, only while the main Oscar is recording
+        self.__Recording = False
+        self.__Server = None
+
+    def __OnControlPacket(self,rawData,fromAddr):
+        self.__Control.append((rawData,fromAddr))
+
+    def __OnShunt(self,namespace,ID,Value):
+        self.__Shunted.append((namespace,ID,Value))
+
+    def __OnRecordData(self,objData):
+        self.__Recorded.append(objData)
+
+    # targets are kept the same as the main Oscar's, which is what gets the heartbeats
+    def __Sync(self,targetList,dropPackets,recording,liveViewShown):
+        self.__Server.DropPackets(dropPackets)
+        GuiMgr.get().SetLiveViewShown(liveViewShown) # no point sending live data if the main Oscar doesn't show it
+        if recording != self.__Recording:
+            self.__Recording = recording
+            Recorder.get().SetForwarder(self.__OnRecordData if recording else None)
+
+        objTargetManager = TargetManager.GetTargetManager()
+        wanted = set()
+        for TargetID,IP,Port,connType,hasTimedOut in targetList:
+            wanted.add(TargetID)
+            objTarget = objTargetManager.GetDownstreamTarget(TargetID)
+            if None == objTarget:
+                objTarget = Target.Target(IP,Port,connType,True)
+                objTargetManager.AddDownstreamTarget(objTarget,TargetID)
+
+            objTarget.MirrorWatchdogState(hasTimedOut)
+
+        for TargetID,objTarget in list(objTargetManager.GetDownstreamTargets().items()):
+            if not TargetID in wanted:
+                objTarget.StopProcessing()
+                objTargetManager.RemoveDynamicDownstreamTarget(TargetID)
+
+    def __TakeAll(self,entries):
+        taken = []
+        try:
+            while True:
+                taken.append(entries.popleft())
+        except IndexError:
+            pass
+        return taken
+
+    def __Flush(self):
+        for msgType,entries in [("Control",self.__Control),("Shunt",self.__Shunted),("Record",self.__Recorded)]:
+            taken = self.__TakeAll(entries)
+            if len(taken) > 0:
+                self.__ToParent.put((msgType,self.__Index,taken))
+
+        liveData = GuiMgr.get().TakeDatalist() # only the latest value of each, not every one
+        if len(liveData) > 0:
+            self.__ToParent.put(("Live",self.__Index,list(liveData.values())))
+
+    def __SendStats(self):
+        targetStats = {}
+        for TargetID,objTarget in list(TargetManager.GetTargetManager().GetDownstreamTargets().items()):
+            targetStats[TargetID] = (objTarget.m_PacketsSent,objTarget.m_BytestSent,objTarget.m_PacketsDropped)
+
+        self.__ToParent.put(("Stats",self.__Index,(Statistics.GetStatistics().GetSnapshot(),targetStats)))
+
+    def Run(self):
+        config = Configuration.get()
+        self.__Server = Server.ServerUDP(config.GetUpstreamConnection(),ConnectionType.UpstreamServer)
+        self.__Server.SetReusePort(True)
+        self.__Server.DropPackets(True) # until the main Oscar says otherwise
+        if not self.__Server.Start():
+            return
+
+        DataHandler.GetDataHandler().SetControlForwarder(self.__OnControlPacket)
+        TargetManager.GetTargetManager().SetShuntForwarder(self.__OnShunt)
+
+        parent = getattr(multiprocessing,"parent_process",lambda: None)() # python 3.8 and later
+        nextFlush = Time.GetCurrMS() + FlushInterval
+        nextStats = Time.GetCurrMS() + StatsInterval
+        while None == parent or parent.is_alive(): # don't hang around if the main Oscar went away
+            try:
+                message = self.__FromParent.get(True,FlushInterval / 1000.0)
+            except queue.Empty:
+                message = None
+
+            if None != message:
+                if "Quit" == message[0]:
+                    break
+                self.__Sync(*message[1:])
+
+            if Time.GetCurrMS() >= nextFlush:
+                self.__Flush()
+                nextFlush = Time.GetCurrMS() + FlushInterval
+
+            if Time.GetCurrMS() >= nextStats:
+                self.__SendStats()
+                nextStats = Time.GetCurrMS() + StatsInterval
+
+        self.__Server.Stop()
+        self.__Flush()
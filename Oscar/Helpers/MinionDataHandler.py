@@ -30,6 +30,8 @@ from Helpers import Target
 from Helpers import GuiMgr
 from Helpers import Recorder
 from Helpers import Configuration
+from Helpers import BinaryProtocol
+from Helpers import FastParser
 import sys
 
 class MinionDataHandler(object):
@@ -42,6 +44,19 @@ class MinionDataHandler(object):
     def __initialize(self):
         pass
 
+    # can the buffer be relayed as-is (well, patched to be an Oscar packet)
+    def __CanPassThrough(self,datapoints,rawData):
+        objConfig = Configuration.get()
+        if not isinstance(rawData,str) or not objConfig.GetPassThrough():
+            return False
+
+        for datapoint in datapoints:
+            namespace = datapoint[1]
+            if objConfig.HandleBITWNamespace(namespace) != namespace: # Bump in the Wire changes it, uses the BITW cache
+                return False
+
+        return True
+
     # entry point for all packets coming from a minion
     def HandleIncomingPacket(self,node,rawData,fromAddress):
         if node.nodeName == "MinionGroup":
@@ -115,6 +130,55 @@ class MinionDataHandler(object):
             GuiMgr.OnDataPacketSentDownstream(objData,"Minion")
             Recorder.get().AddData(objData)
 
+    # Handles an already decoded binary packet from a minion, one or more datapoints
+    def HandleIncomingBinaryPacket(self,datapoints,rawData,fromAddress):
+        decoded = [("1",namespace,ID,value,eTime) for namespace,ID,value,eTime,_ in datapoints]
+        self.HandleIncomingDatapoints(decoded,rawData,fromAddress,len(decoded) > 1)
+
+    # Handles data from a minion that was decoded without a DOM (see FastParser)
+    # datapoints is a list of (Version,Namespace,ID,Value,ElapsedTime)
+    def HandleIncomingDatapoints(self,datapoints,rawData,fromAddress,isGroup):
+        Statistics.GetStatistics().OnPacketReceivedFromUpstream(rawData)
+        objTargetManager = TargetManager.GetTargetManager()
+
+        if self.__CanPassThrough(datapoints,rawData):
+            sendBuffer = FastParser.MinionToOscar(rawData,isGroup)
+        else:
+            sendBuffer = None
+
+        # only need data objects to build the xml, or if something is going to keep them
+        keepData = GuiMgr.IsLiveViewShown() or Recorder.get().WantsData()
+
+        if not isGroup:
+            _,namespace,ID,value,eTime = datapoints[0]
+            if None == sendBuffer or keepData:
+                objData = MarvinData.MarvinData(namespace,ID,value,eTime,1.0)
+                if None == sendBuffer:
+                    sendBuffer = objData.ToXML()
+
+            objTargetManager.BroadcastDownstream(sendBuffer,False,None)
+            objTargetManager.ShuntData(namespace,ID,value)
+            if keepData:
+                GuiMgr.OnDataPacketSentDownstream(objData,"Minion")
+                Recorder.get().AddData(objData)
+            return
+
+        if None == sendBuffer or keepData:
+            objGroupPacket = MarvinGroupData.MarvinDataGroup("","","",0,"1.0",True)
+            for _,namespace,ID,value,eTime in datapoints:
+                objGroupPacket.AddPacket(MarvinData.MarvinData(namespace,ID,value,eTime,1.0))
+
+            if None == sendBuffer:
+                sendBuffer = objGroupPacket.ToXML()
+
+        objTargetManager.BroadcastDownstream(sendBuffer,False,None)
+        for _,namespace,ID,value,_ in datapoints: # already have the values, so no need to re-parse the group for shunting
+            objTargetManager.ShuntData(namespace,ID,value)
+
+        if keepData:
+            GuiMgr.OnDataPacketSentDownstream(objGroupPacket,"Minion")
+            Recorder.get().AddData(objGroupPacket)
+
     # Handles incoming data packet from minion
     def HandleIncomingGroupPacket(self,rawData,node,fromAddress):
         # <?xml version="1.0" encoding="utf-8"?>
@@ -160,6 +224,7 @@ class MinionDataHandler(object):
         #    <MinionVersion>17.02.12 Build 3</MinionVersion>"
         #    <Namespace>NamespaceFoo</Namespace>
         #    <Port>12345</Port>
+        #    <BinaryVersion>1</BinaryVersion>  -- optional, Minion can send binary data
         #</Minion>
 
         try:
@@ -196,6 +261,26 @@ class MinionDataHandler(object):
 
         elif CP.Type != ConnectionPoint.ConnectionType.Minion:
             Statistics.GetStatistics().OnMalformedPacketReceived("Unexpected Connection Type: " + str(CP.Type))
+            return
+
+        try:
+            binaryVersion = int(node.getElementsByTagName('BinaryVersion')[0].firstChild.nodeValue)
+        except Exception as Ex:
+            binaryVersion = 0 # older Minion, XML only
+
+        if binaryVersion > 0:
+            self.SendCapabilities(TargetID,min(binaryVersion,BinaryProtocol.VERSION))
+
+    # lets a Minion know it can send binary data to this Oscar, is sent in response to every ConnectionInformation
+    # packet so the Minion will fall back to XML if this Oscar is replaced by an older one
+    def SendCapabilities(self,TargetID,binaryVersion):
+        buffer = "<?xml version=\"1.0\" encoding=\"utf-8\"?>"
+        buffer = buffer + "<Oscar Type=\"Capabilities\">"
+        buffer = buffer + "<Version>1.0</Version>"
+        buffer = buffer + "<BinaryVersion>" + str(binaryVersion) + "</BinaryVersion>"
+        buffer = buffer + "</Oscar>"
+
+        TargetManager.GetTargetManager().SendToUpstreamTarget(buffer,TargetID)
 
 
 def GetDataHandler():
@@ -110,6 +110,33 @@ class OscarDataHandler(object):
             Recorder.get().AddData(objData)
 
 
+    # Handles data from a chained Oscar that was decoded without a DOM (see FastParser)
+    # datapoints is a list of (Version,Namespace,ID,Value,ElapsedTime)
+    def HandleIncomingDatapoints(self,datapoints,rawData,fromAddress,isGroup):
+        from Helpers import Configuration
+        objTargetManager = TargetManager.GetTargetManager()
+
+        if Configuration.get().GetBITW_Active():
+            rawData = Configuration.get().HandleBITWBuffer(rawData) # handle Bump in the wire
+
+        if 0 != objTargetManager.BroadcastDownstream(rawData,False,None): # send to all - towards a Marvin
+            Statistics.GetStatistics().OnPacketChainedDownstream(rawData)
+
+        for _,namespace,ID,value,_ in datapoints:
+            objTargetManager.ShuntData(namespace,ID,value)
+
+        if not isGroup:
+            version,namespace,ID,value,_ = datapoints[0]
+            objData = MarvinData.MarvinData(namespace,ID,value,0,version,True)
+
+        else:
+            objData = MarvinGroupData.MarvinDataGroup("","","",0,"1.0",True)
+            for version,namespace,ID,value,_ in datapoints:
+                objData.AddPacket(MarvinData.MarvinData(namespace,ID,value,0,version,True))
+
+        GuiMgr.OnDataPacketSentDownstream(objData,"Chained")
+        Recorder.get().AddData(objData)
+
     def HandleIncomingGroupPacket(self,rawData,node,fromAddress):
         from Helpers import Configuration
         
@@ -31,8 +31,14 @@ from Helpers import ThreadManager
 from Helpers import TargetManager
 from Helpers import Entry
 from Helpers import Configuration
+from Helpers import RecordStream
+from Helpers import RecordFile
+from Helpers import CSVExport
+import bisect
 import collections
 import datetime
+import threading
+import time
 
 class RepeatMode():
     NONE=0
@@ -57,6 +63,9 @@ def get():
 
 class Playback(object):
     _instance = None
+    MaxSleepTime = 100   # ms
+    MaxBatchSize = 1000  # entries sent before checking for stop/exit when going as fast as possible
+    WarmupBatchSize = 500 # entries prepared before letting everyone else have a go
 
     def __init__(self):
         if None != Playback._instance:
@@ -74,12 +83,28 @@ class Playback(object):
         self.StartTime=None
         self.threadName = "PlaybackObject" + ":" + str(self)
         self.IndexExternallySet=False
+        self.AsFastAsPossible=False  # ignore times, just blast it out
+        self.__AnchorClock = time.monotonic()
+        self.__AnchorSpeed = None
+        self.__AnchorAsFast = False
+        self.__RatePackets = 0
+        self.__RateDataTime = 0
+        self.NamespaceCount = 0
+        self.ID_Count = 0
+
+        self.__WarmupLock = threading.Lock()
+        self.__WarmupData = None     # list being prepared in the background
+        self.__WarmupGeneration = 0  # bumped each time data changes, so warmup knows to start over
+        self.__Encoded = []          # xml for each entry, as far as warmup has got
+        self.__TimeIndex = []        # running max of arrival time for each entry, for bisecting
 
         self.startIndex=0
         self.endIndex = None
 
         ThreadManager.GetThreadManager().CreateThread(self.threadName,self.__workerProc)
         ThreadManager.GetThreadManager().StartThread(self.threadName)
+        ThreadManager.GetThreadManager().CreateThread(self.threadName + ":Warmup",self.__warmupProc)
+        ThreadManager.GetThreadManager().StartThread(self.threadName + ":Warmup")
 
     @staticmethod
     def _get():
@@ -88,13 +113,17 @@ class Playback(object):
         return Playback._instance
 
     def Clear(self):
+        self.__StartWarmup(None)
         if None != self.PlaybackData:
             self.PlaybackData.clear()
 
     def SetData(self,dataList):
         if False==self.Stopped:
             Log.getLogger().error("Setting Playback data, but playback has not been stopped")
-            return
+            return False
+
+        if isinstance(self.PlaybackData,RecordFile.IndexedRecording) and not self.PlaybackData is dataList:
+            self.PlaybackData.clear() # let go of the file
 
         self.PlaybackData = dataList
         self.LoopMode=RepeatMode.NONE
@@ -104,24 +133,112 @@ class Playback(object):
         self.startIndex=0
         self.endIndex=len(dataList)
 
-        NamespaceMap={}
-        self.NamespaceCount = 0
-        self.ID_Count = 0
-        # go get some stats on the loaded data
-        for entry in dataList:
-            if not entry.Namespace in NamespaceMap:
-                NamespaceMap[entry.Namespace]={}
-                self.NamespaceCount += 1
-
-            if hasattr(entry,'_DataList'):
-                for subEntry in entry._DataList:
-                    if not subEntry.ID in NamespaceMap[entry.Namespace]:
-                        NamespaceMap[entry.Namespace][subEntry.ID]=subEntry.ID
-                        self.ID_Count +=1
-
-            elif not entry.ID in NamespaceMap[entry.Namespace]:
-                NamespaceMap[entry.Namespace][entry.ID]=entry.ID
-                self.ID_Count += 1
+        if isinstance(dataList,RecordFile.IndexedRecording): # has an index, don't go through the whole file
+            self.__StartWarmup(None)
+            self.NamespaceCount = dataList.GetNamespaceCount()
+            self.ID_Count = dataList.GetIDCount()
+            return True
+
+        self.__StartWarmup(dataList) # stats, xml and time index get done in the background
+        return True
+
+    def __StartWarmup(self,dataList):
+        with self.__WarmupLock:
+            self.__WarmupGeneration += 1
+            self.__WarmupData = dataList
+            self.__Encoded = []
+            self.__TimeIndex = []
+            self.NamespaceCount = 0
+            self.ID_Count = 0
+
+    # returns (entries prepared, total entries)
+    def GetWarmupProgress(self):
+        if isinstance(self.PlaybackData,RecordFile.IndexedRecording):
+            return (len(self.PlaybackData),len(self.PlaybackData)) # nothing to do
+
+        return (len(self.__Encoded),len(self.PlaybackData))
+
+    # index of 1st entry at or after the given arrival time, len of data if there isn't one
+    def FindIndexOfTime(self,arrivalTime):
+        dataList = self.PlaybackData
+        if isinstance(dataList,RecordFile.IndexedRecording):
+            return dataList.FindIndexOfTime(arrivalTime)
+
+        timeIndex = self.__TimeIndex
+        if not self.__WarmupData is dataList:
+            timeIndex = [] # index is for some other data
+
+        index = bisect.bisect_left(timeIndex,arrivalTime)
+        if index < len(timeIndex) or len(timeIndex) >= len(dataList):
+            return index
+
+        for index in range(len(timeIndex),len(dataList)): # warmup hasn't got this far yet
+            if int(dataList[index].ArrivalTime) >= arrivalTime:
+                return index
+
+        return len(dataList)
+
+    # makes playback start offsetMS into the data, returns False if that is past the end
+    def SeekToTime(self,offsetMS):
+        if len(self.PlaybackData) < 1:
+            return False
+
+        index = self.FindIndexOfTime(int(self.PlaybackData[0].ArrivalTime) + offsetMS)
+        if index >= len(self.PlaybackData):
+            Log.getLogger().warning("Tried to start playback " + str(offsetMS/1000.0) + " secs in, but data is only " + str(self.GetPlayTime()/1000.0) + " secs long")
+            return False
+
+        self.SetCurrentNumber(index)
+        return True
+
+    # goes through newly loaded data, encoding it and gathering stats, so playback doesn't have to
+    def __warmupProc(self,fnKillSignalled,userData):
+        generation = None
+        while not fnKillSignalled():
+            with self.__WarmupLock:
+                if generation != self.__WarmupGeneration: # new data, start over
+                    generation = self.__WarmupGeneration
+                    dataList = self.__WarmupData
+                    encoded = self.__Encoded
+                    timeIndex = self.__TimeIndex
+                    namespaceMap = {}
+                    maxTime = None
+                    idCount = 0
+                    startTime = Time.GetCurrMS()
+
+            if None == dataList or len(encoded) >= len(dataList):
+                Sleep.SleepMs(100)
+                continue
+
+            startIndex = len(encoded)
+            for entry in dataList[startIndex:startIndex + Playback.WarmupBatchSize]:
+                if hasattr(entry,'_DataList'):
+                    datapoints = entry._DataList
+                else:
+                    datapoints = [entry]
+
+                for datapoint in datapoints:
+                    idMap = namespaceMap.setdefault(datapoint.Namespace,{})
+                    if not datapoint.ID in idMap:
+                        idMap[datapoint.ID] = True
+                        idCount += 1
+
+                arrivalTime = int(entry.ArrivalTime)
+                if None == maxTime or arrivalTime > maxTime:
+                    maxTime = arrivalTime
+
+                timeIndex.append(maxTime)
+                encoded.append(entry.ToXML())
+
+            with self.__WarmupLock:
+                if generation == self.__WarmupGeneration:
+                    self.NamespaceCount = len(namespaceMap)
+                    self.ID_Count = idCount
+
+            if len(encoded) >= len(dataList):
+                Log.getLogger().info("Playback data prepared in " + str(Time.GetCurrMS() - startTime) + "ms")
+            else:
+                Sleep.SleepMs(1) # keep the GUI and playback responsive
 
     def GetDataCount(self):
         return len(self.PlaybackData)
@@ -171,6 +288,9 @@ class Playback(object):
         else:
             Log.getLogger().warn("Tried to set playback speed to invalid value: " + str(newVal))
 
+    def SetAsFastAsPossible(self,flag):
+        self.AsFastAsPossible = flag
+
     def SetLoopMode(self, newMode,startIndex=0,endIndex=None):
         self.LoopMode = newMode
         self.startIndex=startIndex
@@ -220,89 +340,155 @@ class Playback(object):
         if False == self.Paused:
             self.Paused = True
 
-    def __workerProc(self,fnKillSignalled,userData):
+    # re-starts the schedule from the current entry, with the current speed
+    def __Anchor(self):
+        self.StartTime = int(self.PlaybackData[self.CurrentIndex].ArrivalTime)
+        self.__AnchorClock = time.monotonic()
+        self.__AnchorSpeed = self.PlaybackSpeed
+        self.__AnchorAsFast = self.AsFastAsPossible
+        self.__RatePackets = 0
+        self.__RateDataTime = 0
+
+    # returns (requested speed, achieved speed, packets per second) since playback (re)started
+    # requested speed is None if going as fast as possible
+    def GetReplayRate(self):
+        elapsed = time.monotonic() - self.__AnchorClock
+        if elapsed <= 0 or None == self.StartTime:
+            return (self.__RequestedRate(),0.0,0.0)
+
+        return (self.__RequestedRate(),float(self.__RateDataTime)/(elapsed * 1000.0),float(self.__RatePackets)/elapsed)
+
+    def __RequestedRate(self):
+        if self.AsFastAsPossible:
+            return None
+        return self.PlaybackSpeed
+
+    def __LogReplayRate(self):
+        requested,achieved,packetRate = self.GetReplayRate()
+        if None == requested:
+            requested = "as fast as possible"
+        Log.getLogger().info("Playback speed requested: {0} achieved: {1:.2f} ({2:.0f} packets/sec)".format(requested,achieved,packetRate))
+
+    def __SendEntry(self,index,objData):
         from Helpers import GuiMgr
 
+        encoded = self.__Encoded
+        if index < len(encoded) and self.__WarmupData is self.PlaybackData:
+            xmlData = encoded[index] # warmup got here already
+        else:
+            xmlData = objData.ToXML()
+
+        objTargetManager = TargetManager.GetTargetManager()
+        objTargetManager.BroadcastDownstream(xmlData,False,None)
+
+        if Configuration.get().GetShunting(): # have the values right here, no need to parse the xml
+            if hasattr(objData,'_DataList'):
+                for datapoint in objData._DataList:
+                    objTargetManager.ShuntData(datapoint.Namespace,datapoint.ID,datapoint.Value)
+            else:
+                objTargetManager.ShuntData(objData.Namespace,objData.ID,objData.Value)
+
+        GuiMgr.OnDataPacketSentDownstream(objData,"Playback")
+
+    # at the end of the data (or loop), returns True if playback continues
+    def __OnEndReached(self):
+        from Helpers import GuiMgr
+
+        self.__LogReplayRate()
+        self.StartTime = None
+
+        if self.LoopMode == RepeatMode.NONE:
+            GuiMgr.OnStopPlayback()
+            if Configuration.get().GetExitAfterAutoPlay():
+                Log.getLogger().info("Playback finished, exiting application per arguments")
+                GuiMgr.Quit()
+            return False
+
+        elif self.LoopMode == RepeatMode.REPEAT:
+            self.CurrentIndex = 0
+            self.LoopCount += 1
+
+        elif self.LoopMode == RepeatMode.LOOP:
+            self.CurrentIndex = self.startIndex
+            self.LoopCount += 1
+
+        return True
+
+    # Schedule is against a monotonic clock from when playback (re)started, so
+    # time doesn't drift, and everything that is due gets sent in one go.
+    def __workerProc(self,fnKillSignalled,userData):
         self.CurrentIndex = self.startIndex
         self.StartTime = None
        
         while not fnKillSignalled(): # run until signalled to end - call passed function to check for the signal
             if self.Paused or self.Stopped:
+                self.StartTime = None # pick up from wherever we are when started again
                 Sleep.SleepMs(100)
                 continue
 
-            if None == self.StartTime:
-                self.StartTime = int(self.PlaybackData[self.CurrentIndex].ArrivalTime) - 10 # can't remember why I subract 10ms...
+            if None == self.StartTime or self.__AnchorSpeed != self.PlaybackSpeed or self.__AnchorAsFast != self.AsFastAsPossible:
+                self.__Anchor()
 
-            objData = self.PlaybackData[self.CurrentIndex]
-            if False and self.PlaybackSpeed > 10:
-                pass
+            if self.AsFastAsPossible:
+                dueTime = None
             else:
-                sleepVal = (int(objData.ArrivalTime)-self.StartTime)/self.PlaybackSpeed
-                Sleep.SleepMs(sleepVal)
-
-            try: # when looping, this data will be here after the 1st loop
-                xmlData = self.PlaybackData[self.CurrentIndex].xmlData
-                node = self.PlaybackData[self.CurrentIndex].firstNode
-            except:
-                xmlData = objData.ToXML() # be more efficient if I create a list of already created xmldata
-                self.PlaybackData[self.CurrentIndex].xmlData = xmlData # LOVe how you can just add stuff to an object in Python!
-                if Configuration.get().GetShunting():
-                    import xml
-                    try:
-                        dom = xml.dom.minidom.parseString(xmlData)
-                        node = dom._get_firstChild()
-                    except Exception as ex:
-                       Log.getLogger().error("Error Something bad in Trying to re-encode saved data" )
+                dueTime = self.StartTime + (time.monotonic() - self.__AnchorClock) * 1000.0 * self.PlaybackSpeed # where we should be in the data
+                nextTime = int(self.PlaybackData[self.CurrentIndex].ArrivalTime)
+                if nextTime > dueTime:
+                    waitTime = (nextTime - dueTime)/self.PlaybackSpeed
+                    Sleep.SleepMs(min(waitTime,Playback.MaxSleepTime)) # don't sleep too long, so can react to stop/pause/speed change
+                    continue
 
-                else:
-                   node = None
+            sentCount = 0
+            while not self.Paused and not self.Stopped:
+                objData = self.PlaybackData[self.CurrentIndex]
+                self.__SendEntry(self.CurrentIndex,objData)
+                self.__RatePackets += 1
+                self.__RateDataTime = int(objData.ArrivalTime) - self.StartTime
+                sentCount += 1
 
-                self.PlaybackData[self.CurrentIndex].firstNode = node
+                self.CurrentIndex+=1
 
-            TargetManager.GetTargetManager().BroadcastDownstream(xmlData,False,node)
-            GuiMgr.OnDataPacketSentDownstream(objData,"Playback")
+                if None == self.endIndex:
+                    self.endIndex = len(self.PlaybackData)-1
 
-            try:
-                self.StartTime = int(self.PlaybackData[self.CurrentIndex].ArrivalTime)
-            except Exception:
-                self.StartTime = None # just in case get an out of bounds error
-
-            self.CurrentIndex+=1
-
-            if None == self.endIndex:
-                self.endIndex = len(self.PlaybackData)-1
+                if self.CurrentIndex >= self.endIndex:
+                    self.__OnEndReached()
+                    break
 
-            if self.CurrentIndex >= self.endIndex:
-#                preProcessingDone = True
-                if self.LoopMode == RepeatMode.NONE:
-                    GuiMgr.OnStopPlayback()
-                    if Configuration.get().GetExitAfterAutoPlay():
-                        Log.getLogger().info("Playback finished, exiting application per arguments")
-                        GuiMgr.Quit()
+                if None == dueTime: # as fast as possible, but still check for exit once in a while
+                    if sentCount >= Playback.MaxBatchSize:
+                        break
 
-                elif self.LoopMode == RepeatMode.REPEAT:
-                    self.CurrentIndex = 0
-                    self.LoopCount += 1
-
-                elif self.LoopMode == RepeatMode.LOOP:
-                    self.CurrentIndex = self.startIndex
-                    self.LoopCount += 1
-
-                self.StartTime = None
+                elif int(self.PlaybackData[self.CurrentIndex].ArrivalTime) > dueTime:
+                    break
 
     def WriteToFile(self,filename):
         # if recorded then played, then a 'cached' version will be around, we dont' want this
-        for entry in self.PlaybackData:
-            if hasattr(entry,'xmlData'):
-                del entry.xmlData
+        if isinstance(self.PlaybackData,list):
+            for entry in self.PlaybackData:
+                if hasattr(entry,'xmlData'):
+                    del entry.xmlData
+                if hasattr(entry,'firstNode'):
+                    del entry.firstNode
             
         if '.bifm' in filename.lower(): #new MARVIN format
             self.WriteToMarvinFile(filename)
 
+        elif '.bifc' in filename.lower(): # chunked, compressed and indexed
+            RecordFile.WriteRecording(filename,self.PlaybackData,Configuration.get().GetRecordFileCompression())
+
         else: #Oscar Format
+            if isinstance(self.PlaybackData,list):
+                entries = self.PlaybackData
+            else:
+                entries = [entry for entry in self.PlaybackData] # from a .bifc file, so pull it all in
+                for entry in entries:
+                    entry.__dict__.pop('xmlData',None)
+                    entry.__dict__.pop('firstNode',None)
+
             with open(filename,'w+b') as fp:
-                pickle.dump(self.PlaybackData, fp, pickle.DEFAULT_PROTOCOL)
+                pickle.dump(entries, fp, pickle.DEFAULT_PROTOCOL)
 
         from Helpers import Recorder
 
@@ -349,6 +535,24 @@ class Playback(object):
                 self.WriteMarvinString(fp,Value)    # Value
 
 
+    def ReadMarvinFile(self,filename):
+        entries = []
+        with open(filename,'rb') as fp:
+            fp.read(5) # 'BIFM' and version
+            count = struct.unpack('!L',fp.read(4))[0]
+            for _ in range(0,count):
+                arrivalTime = struct.unpack('!L',fp.read(4))[0]
+                ID = self.ReadMarvinString(fp)
+                Namespace = self.ReadMarvinString(fp)
+                Value = self.ReadMarvinString(fp)
+                entries.append(MarvinData.MarvinData(Namespace,ID,Value,arrivalTime,"1.0",False))
+
+        return entries
+
+    def ReadMarvinString(self,fp):
+        strLen = struct.unpack('!I',fp.read(4))[0]
+        return fp.read(strLen).decode('ascii')
+
     def ReadFromFile(self,filename):
         from Helpers import GuiMgr
         
@@ -356,9 +560,39 @@ class Playback(object):
         if not os.path.isfile(filename):
             Log.getLogger().error("Asked to read from non-existant file: " + filename)
             return False
+
+        with open(filename,'rb') as fp:
+            marker = fp.read(4)
+
+        try:
+            if RecordFile.FILE_MARKER == marker: # indexed file, leave it on disk
+                objRecording = RecordFile.IndexedRecording(filename)
+                if len(objRecording) < 1:
+                    Log.getLogger().error(filename+" does not appear to have any data in it. ")
+                    objRecording.clear()
+                    return False
+
+                if not self.SetData(objRecording):
+                    objRecording.clear()
+                    return False
+                return True
+
+            if b"BIFM" == marker:
+                entries = self.ReadMarvinFile(filename)
+                if len(entries) < 1:
+                    Log.getLogger().error(filename+" does not appear to have any data in it. ")
+                    return False
+
+                self.SetData(entries)
+                return True
+
+        except Exception as ex:
+            Log.getLogger().error(filename+": " + str(ex))
+            return False
+
         with open(filename,'rb') as fp:
             try:
-                entries = pickle.load(fp)
+                entries = RecordStream.ReadStreamedFile(fp) # is just 1 chunk if not streamed
                 
             except Exception as ex:
                 Log.getLogger().error(filename+": " + str(ex))
@@ -416,243 +650,13 @@ class Playback(object):
 
         return newList
 
-    def __IsNumeric(self,value):
-        try:
-            val = float(value)
-            return True
-        except ValueError:
-            return False
-
-    def AddToMapList(self,map,node):
-        key = node.Namespace + node.ID
-        if len(key) > 1:
-            try:
-                list = map[key]
-                list.append(node)
-            except Exception: #didn't exist yet
-                list = []
-                list.append(node)
-                map[key] = list
-            return
-
-        elif isinstance(node,MarvinGroupData.MarvinDataGroup):
-            for datapoint in node._DataList:
-                self.AddToMapList(map,datapoint)
-        else:
-            Log.getLogger().error("Unknown item when trying to save to CSV: " + str(node))
-
-
-    def WriteCSVFile(self,filename,interval):
+    # interval is in seconds, 0 means write every datapoint
+    # include/exclude are optional lists of ID wildcard patterns
+    def WriteCSVFile(self,filename,interval,include=None,exclude=None):
         if interval == 0:
-            return self.WriteRawCSVFile(filename)
-
-        dict = {}
-        timeInterval = interval * 1000 #secs to ms
-
-        entries = self.PlaybackData
-
-        with open(filename,'w+t') as fp:
-            fp.write("Namespace,Name,TimeInterval(secs),# of Datapoints, Total Time(secs), Avg Time (ms),# of samples,Average Value,Values...\n")
-
-
-            for Node in entries: # create a dictionary of each namespace+entity, then a list of values for each
-                self.AddToMapList(dict,Node)
-
-            #Sort the dictionary so it looks better in the file
-            sortedDictionary = collections.OrderedDict(sorted(dict.items()))
-            
-            for key in sortedDictionary:
-                list = sortedDictionary[key]
-                
-                count = 0
-                tValue=0
-                startTime=0
-                newList = []
-                #newList.append(list[0]) # use 1st entry
-                startTime = list[0].ArrivalTime
-                timespan = list[-1].ArrivalTime - startTime #  
-                
-                fp.write(list[0].Namespace + "," + list[0].ID + ","+ str(interval) + ",")
-                fp.write(str(len(list)) + "," + str(int(timespan/1000)) + "," + str(int(timespan/len(list))))
-
-                timespan = 0
-
-                for Node in list:
-                    timespan += Node.ArrivalTime - startTime
-
-                    if True == self.__IsNumeric(Node.Value) :
-                        tValue += float(Node.Value)
-                        count += 1.0
-
-                        if timespan >= timeInterval : 
-                            avgValue = tValue / count
-                            NewNode = Entry.Entry(Node.ID,avgValue,Node.Namespace,'0')
-
-                    else : # is string data of some kind
-                        if timespan >= timeInterval : 
-                            NewNode = Entry.Entry(Node.ID,Node.Value,Node.Namespace,'0')
-                            newList.append(NewNode)
-
-                    if timespan  >= timeInterval : 
-                        newList.append(NewNode)
-                        #interval and data arrival don't match, so by doing this we average out better
-                        startTime = Node.ArrivalTime - (timespan-timeInterval)
-
-                        count = 0
-                        tValue = 0
-                        timespan = 0
-
-                    else:
-                      startTime = Node.ArrivalTime
-
-                if len(newList):
-                    fp.write("," + str(len(newList))) # Write the count
-                
-                    if newList != None and self.__IsNumeric(newList[0].Value):
-                        tVal = 0
-                        for Node in newList:
-                            tVal += float(Node.Value)
-
-                        if tVal !=0:
-                            avgVal = tVal/len(newList)
-                        else:
-                            avgVal = 0
-
-                        fp.write(","+ "{0:.2f}".format(avgVal)) # write the average
-
-                        for Node in newList:
-                            fp.write("," + "{0:.2f}".format(float(Node.Value))) #write the data
-                
-                    else:
-                        fp.write(",NA") #no Average for text
-                        for Node in newList:
-                            fp.write("," + Node.Value) #write the data - it is a string
-
-                else:
-                    pass  # sometimes get here, though I don't know why
-
-                fp.write("\n")            
-
-        
-    def AddRawEntryToDict(self,targetDict,entry):
-        if isinstance(entry,MarvinGroupData.MarvinDataGroup):
-            for datapoint in entry._DataList:
-                self.AddRawEntryToDict(targetDict,datapoint)
-            return
-
-        if not entry.Namespace in targetDict:
-            targetDict[entry.Namespace] = {} 
-
-        entriesDict = targetDict[entry.Namespace]
-        if not entry.ID in entriesDict:
-            entriesDict[entry.ID]= []
-            entry.timeDelta=0
-            entriesDict[entry.ID].append(entry)
-
-        else:
-            t1 = entry.ArrivalTime
-            t2 = entriesDict[entry.ID][-1].ArrivalTime
-            entry.timeDelta = t1-t2
-            entriesDict[entry.ID].append(entry)
-
-    def WriteRawCSVFile(self,filename):
-            namespaceDict = {}
-
-            entries = self.PlaybackData
-            firstPktTime = Time.GetCurrMS()
-
-            for entry in entries:
-                self.AddRawEntryToDict(namespaceDict,entry)
-                if entry.ArrivalTime < firstPktTime:
-                    firstPktTime = entry.ArrivalTime
-
-            sortedNamespaceDictionary = collections.OrderedDict(sorted(namespaceDict.items()))
-
-            writeData=[]
-            writeData.append( "BIFF CSV File.  Created {0}.  Time(ms) is the # of ms data value received after the 1st value (so a relative time).".format(datetime.datetime.now().strftime("%I:%M%p on %B %d, %Y")))
-            writeData.append( "Namespace,,")
-            ROW_NS=1
-            writeData.append("ID,,")
-            ROW_ID=2
-            writeData.append(",,") #Samples,Average Header Line
-            ROW_AVG_HDR = 3
-            writeData.append(",,") #Samples,Average Line
-            ROW_AVG = 4
-            writeData.append(",,") #Values, Time Header Line
-            ROW_DATA_HDR=5
-            startRow = len(writeData) 
-            line = ""
-            maxDp = 0
-
-            #go through each NS, making 1st two rows, keep track of longest ID set, and append that many lines
-
-            for namespace in sortedNamespaceDictionary:
-                nsDict = sortedNamespaceDictionary[namespace]
-                for id in nsDict:
-                    if len(nsDict[id]) > maxDp:
-                        maxDp = len(nsDict[id])
-
-            for i in range(0,maxDp+1):
-                writeData.append(",,")
-
-            rows = len(writeData)
-
-
-            for namespace in sortedNamespaceDictionary:
-                nsDict = sortedNamespaceDictionary[namespace]
-                sortedIDDictionary = collections.OrderedDict(sorted(nsDict.items()))
-
-                for ID in sortedIDDictionary:
-                    DataSet = sortedIDDictionary[ID]
-                    writeData[ROW_NS] += namespace + ",,,"
-                    writeData[ROW_ID] += ID + ",,,"
-                    writeData[ROW_AVG_HDR] += "Average,#Samples,,"
-                    writeData[ROW_DATA_HDR] += "Values,Time(ms),,"
-                    row = startRow
-                    
-                    tValue=0.0
-                    nonNumeric=False
-
-                    for entry in DataSet:
-                        rowData = writeData[row]
-                        if "," in entry.Value:
-                            writeData[row] += str(entry.Value.replace(",",";") +",")
-                        else:
-                            writeData[row] += str(entry.Value) +"," 
-                          
-                        writeData[row] += str(entry.ArrivalTime - firstPktTime) +",,"
-
-                        row += 1
-                        if not nonNumeric:
-                            try:
-                                tValue += float(entry.Value)
-                            except Exception:
-                                nonNumeric = True
-
-
-                    if nonNumeric:
-                        writeData[ROW_AVG] += "NA,"
-                    else:
-                        writeData[ROW_AVG] += "{0},".format(tValue/len(DataSet))
-
-                    writeData[ROW_AVG] += str(len(DataSet)) +",,"
-
-
-                    if len(DataSet) < maxDp:
-                        for row in range(startRow+len(DataSet),startRow + maxDp):
-                            writeData[row] += ",,,"
-
-            
-            with open(filename,'w+t') as fp:
-                for line in writeData:
-                    fp.write(line + "\n")
-                
-            
-
-
-
-
-
-
+            return self.WriteRawCSVFile(filename,include,exclude)
 
+        CSVExport.WriteIntervalCSV(filename,self.PlaybackData,interval,include,exclude)
 
+    def WriteRawCSVFile(self,filename,include=None,exclude=None):
+        CSVExport.WriteRawCSV(filename,self.PlaybackData,include,exclude)
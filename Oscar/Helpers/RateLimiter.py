@@ -0,0 +1,112 @@
+##############################################################################
+#  Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+##############################################################################
+#    File Abstract:
+#    Token bucket rate limiting of what is sent downstream, per target and for
+#    all targets together, in packets/s and bytes/s.  Sending waits just long
+#    enough for the tokens it needs, so the rate stays smooth rather than
+#    bursting and then sleeping.
+##############################################################################
+import threading
+import time
+
+class TokenBucket(object):
+    def __init__(self,rate,burst):
+        self._Rate = float(rate)   # tokens per second
+        self._Burst = float(burst) # most that can build up
+        self.__Tokens = self._Burst
+        self.__LastRefill = time.monotonic()
+
+    def __Refill(self,now):
+        self.__Tokens = min(self._Burst,self.__Tokens + (now - self.__LastRefill) * self._Rate)
+        self.__LastRefill = now
+
+    # seconds until cost tokens are there, 0 if they are now
+    def GetWait(self,cost,now):
+        self.__Refill(now)
+        cost = min(cost,self._Burst) # something bigger than the burst goes once the bucket is full
+        if self.__Tokens >= cost:
+            return 0
+        return (cost - self.__Tokens) / self._Rate
+
+    def Take(self,cost):
+        self.__Tokens -= cost # can go below 0 for something bigger than the burst, it then has to fill back up
+
+# packets/s and bytes/s buckets, a rate of 0 is unlimited
+# settings are (PacketsPerSec,BytesPerSec,BurstPackets,BurstBytes)
+class RateLimiter(object):
+    def __init__(self,settings):
+        packetsPerSec,bytesPerSec,burstPackets,burstBytes = settings
+        self.__PacketBucket = None
+        self.__ByteBucket = None
+        if packetsPerSec > 0:
+            self.__PacketBucket = TokenBucket(packetsPerSec,burstPackets)
+        if bytesPerSec > 0:
+            self.__ByteBucket = TokenBucket(bytesPerSec,burstBytes)
+
+    def IsLimited(self):
+        return None != self.__PacketBucket or None != self.__ByteBucket
+
+    def GetWait(self,size,now):
+        wait = 0
+        if None != self.__PacketBucket:
+            wait = self.__PacketBucket.GetWait(1,now)
+        if None != self.__ByteBucket:
+            wait = max(wait,self.__ByteBucket.GetWait(size,now))
+        return wait
+
+    def Take(self,size):
+        if None != self.__PacketBucket:
+            self.__PacketBucket.Take(1)
+        if None != self.__ByteBucket:
+            self.__ByteBucket.Take(size)
+
+# fills in burst sizes that weren't given, 1/10th of a second's worth
+def DefaultBurst(settings):
+    packetsPerSec,bytesPerSec,burstPackets,burstBytes = settings
+    if burstPackets < 1:
+        burstPackets = max(packetsPerSec / 10.0,1)
+    if burstBytes < 1:
+        burstBytes = max(bytesPerSec / 10.0,1500)
+    return (packetsPerSec,bytesPerSec,burstPackets,burstBytes)
+
+_GlobalLimiter = None
+_GlobalLock = threading.Lock() # global bucket is used by every target's sender
+
+def GetGlobalLimiter():
+    global _GlobalLimiter
+    if None == _GlobalLimiter:
+        from Helpers import Configuration
+        _GlobalLimiter = RateLimiter(Configuration.get().GetGlobalRateLimit())
+    return _GlobalLimiter
+
+# returns seconds to wait before a packet of size bytes can be sent, if 0 it can go now
+# and the tokens for it have been taken.  targetLimiter can be None
+def Acquire(targetLimiter,size):
+    globalLimiter = GetGlobalLimiter()
+    with _GlobalLock:
+        now = time.monotonic()
+        wait = globalLimiter.GetWait(size,now)
+        if None != targetLimiter:
+            wait = max(wait,targetLimiter.GetWait(size,now))
+
+        if wait > 0:
+            return wait
+
+        globalLimiter.Take(size)
+        if None != targetLimiter:
+            targetLimiter.Take(size)
+
+    return 0
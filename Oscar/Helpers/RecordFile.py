@@ -0,0 +1,492 @@
+##############################################################################
+#  Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+##############################################################################
+#    File Abstract:
+#    Chunked, compressed recording file (.bifc).  Unlike the pickled .biff
+#    files, it doesn't need to be loaded all at once to be played back.
+#
+#    File layout:
+#       'BIFC' Version Compression
+#       Chunk * n  : 'CHNK' CompressedLen EntryCount FirstTime LastTime Payload
+#       Footer     : 'BIFX' CompressedLen Index  FooterOffset 'BIFX'
+#
+#    Entries in the file are in the order they were recorded.  Each chunk
+#    payload is columnar (times, namespace/ID numbers, values) and carries the
+#    namespaces and IDs first used in that chunk, so that a file whose footer
+#    never got written (crash) can still be indexed by scanning the chunks.
+#    The footer index has the full namespace/ID dictionary, where each chunk
+#    is and its time range, and which chunks each Namespace:ID is in.
+##############################################################################
+import array
+import bisect
+import collections
+import json
+import lzma
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from Helpers import Log
+from Data import MarvinData
+from Data import MarvinGroupData
+
+FILE_MARKER = b"BIFC"
+CHUNK_MARKER = b"CHNK"
+FOOTER_MARKER = b"BIFX"
+FORMAT_VERSION = 1
+
+_FileHeader = struct.Struct('!4sBB')
+_ChunkHeader = struct.Struct('!4sIIqq')
+_FooterHeader = struct.Struct('!4sI')
+_FooterTail = struct.Struct('!Q4s')
+_Count = struct.Struct('!I')
+
+_GroupFlag = 0x01
+_LiveFlag = 0x02
+
+class Compression():
+    ZLIB=0
+    LZMA=1
+
+    @staticmethod
+    def FromString(strCompression):
+        strCompression = strCompression.upper()
+        if "ZLIB" == strCompression:
+            return Compression.ZLIB
+        if "LZMA" == strCompression:
+            return Compression.LZMA
+        return None
+
+def _Compress(compression,buffer):
+    if Compression.LZMA == compression:
+        return lzma.compress(buffer)
+    return zlib.compress(buffer,6)
+
+def _Decompress(compression,buffer):
+    if Compression.LZMA == compression:
+        return lzma.decompress(buffer)
+    return zlib.decompress(buffer)
+
+# arrays are stored little endian, whatever the machine is
+def _PackArray(typeCode,values):
+    arr = array.array(typeCode,values)
+    if 'little' != sys.byteorder:
+        arr.byteswap()
+    return _Count.pack(len(arr)) + arr.tobytes()
+
+def _UnpackArray(typeCode,buffer,pos):
+    count = _Count.unpack_from(buffer,pos)[0]
+    pos += _Count.size
+    arr = array.array(typeCode)
+    endPos = pos + count * arr.itemsize
+    arr.frombytes(buffer[pos:endPos])
+    if 'little' != sys.byteorder:
+        arr.byteswap()
+    return (arr,endPos)
+
+def _PackStrings(strList):
+    encoded = [strItem.encode('utf-8') for strItem in strList]
+    return _PackArray('I',[len(item) for item in encoded]) + b''.join(encoded)
+
+def _UnpackStrings(buffer,pos):
+    lengths,pos = _UnpackArray('I',buffer,pos)
+    strList = []
+    for length in lengths:
+        strList.append(buffer[pos:pos+length].decode('utf-8'))
+        pos += length
+    return (strList,pos)
+
+def IsRecordFile(filename):
+    try:
+        with open(filename,'rb') as fp:
+            return FILE_MARKER == fp.read(len(FILE_MARKER))
+    except Exception:
+        return False
+
+###########################################
+# Writes .bifc files, entries must be given in the order they are to be played
+class RecordFileWriter(object):
+    ChunkSize = 4096 # datapoints per chunk
+
+    def __init__(self,filename,compression=Compression.ZLIB):
+        self._Filename = filename
+        self._Compression = compression
+        self.__File = None
+        self.__Pending = []
+        self.__PendingDatapoints = 0
+        self.__Namespaces = {} # Namespace -> number
+        self.__IDs = {}        # ID -> number
+        self.__NewNamespaces = []
+        self.__NewIDs = []
+        self.__Chunks = []    # [offset,entryCount,firstTime,lastTime,firstEntry]
+        self.__IDChunks = {}  # "nsNum:idNum" -> [chunk numbers]
+        self.__EntryCount = 0
+        self.__BytesWritten = 0
+
+    def GetBytesWritten(self):
+        return self.__BytesWritten
+
+    def GetEntryCount(self):
+        return self.__EntryCount + len(self.__Pending)
+
+    def Open(self):
+        self.__File = open(self._Filename,'wb')
+        self.__Write(_FileHeader.pack(FILE_MARKER,FORMAT_VERSION,self._Compression))
+
+    def __Write(self,buffer):
+        self.__File.write(buffer)
+        self.__BytesWritten += len(buffer)
+
+    def __Intern(self,strVal,numMap,newList):
+        try:
+            return numMap[strVal]
+        except KeyError:
+            num = len(numMap)
+            numMap[strVal] = num
+            newList.append(strVal)
+            return num
+
+    def Add(self,objData):
+        self.__Pending.append(objData)
+        if isinstance(objData,MarvinGroupData.MarvinDataGroup):
+            self.__PendingDatapoints += len(objData._DataList)
+        else:
+            self.__PendingDatapoints += 1
+
+        if self.__PendingDatapoints >= RecordFileWriter.ChunkSize:
+            self.Flush()
+
+    # writes out whatever is pending as a chunk
+    def Flush(self,syncToDisk=False):
+        if 0 == len(self.__Pending):
+            return
+
+        entryTimes = []
+        entryFlags = []
+        entryCounts = []
+        times = []
+        nsNums = []
+        idNums = []
+        values = []
+        chunkNum = len(self.__Chunks)
+
+        for entry in self.__Pending:
+            if isinstance(entry,MarvinGroupData.MarvinDataGroup):
+                datapoints = entry._DataList
+                flags = _GroupFlag
+            else:
+                datapoints = [entry]
+                flags = 0
+
+            if True == entry.Live:
+                flags |= _LiveFlag
+
+            entryTimes.append(int(entry.ArrivalTime))
+            entryFlags.append(flags)
+            entryCounts.append(len(datapoints))
+
+            for datapoint in datapoints:
+                nsNum = self.__Intern(datapoint.Namespace,self.__Namespaces,self.__NewNamespaces)
+                idNum = self.__Intern(datapoint.ID,self.__IDs,self.__NewIDs)
+                times.append(int(datapoint.ArrivalTime))
+                nsNums.append(nsNum)
+                idNums.append(idNum)
+                values.append(str(datapoint.Value))
+
+                key = str(nsNum) + ":" + str(idNum)
+                chunkList = self.__IDChunks.setdefault(key,[])
+                if 0 == len(chunkList) or chunkList[-1] != chunkNum:
+                    chunkList.append(chunkNum)
+
+        payload = b''.join([_PackStrings(self.__NewNamespaces),
+                            _PackStrings(self.__NewIDs),
+                            _PackArray('q',entryTimes),
+                            _PackArray('B',entryFlags),
+                            _PackArray('I',entryCounts),
+                            _PackArray('q',times),
+                            _PackArray('I',nsNums),
+                            _PackArray('I',idNums),
+                            _PackStrings(values)])
+
+        compressed = _Compress(self._Compression,payload)
+        firstTime = min(entryTimes)
+        lastTime = max(entryTimes)
+
+        self.__Chunks.append([self.__BytesWritten,len(entryTimes),firstTime,lastTime,self.__EntryCount])
+        self.__Write(_ChunkHeader.pack(CHUNK_MARKER,len(compressed),len(entryTimes),firstTime,lastTime))
+        self.__Write(compressed)
+
+        self.__EntryCount += len(entryTimes)
+        self.__Pending = []
+        self.__PendingDatapoints = 0
+        self.__NewNamespaces = []
+        self.__NewIDs = []
+
+        if syncToDisk:
+            self.__File.flush()
+            os.fsync(self.__File.fileno())
+
+    # writes the index and closes the file
+    def Close(self):
+        if None == self.__File:
+            return
+
+        self.Flush()
+
+        index = {"Namespaces" : sorted(self.__Namespaces,key=self.__Namespaces.get),
+                 "IDs" : sorted(self.__IDs,key=self.__IDs.get),
+                 "Chunks" : self.__Chunks,
+                 "IDChunks" : self.__IDChunks,
+                 "EntryCount" : self.__EntryCount}
+
+        compressed = _Compress(self._Compression,json.dumps(index).encode('utf-8'))
+        footerOffset = self.__BytesWritten
+        self.__Write(_FooterHeader.pack(FOOTER_MARKER,len(compressed)))
+        self.__Write(compressed)
+        self.__Write(_FooterTail.pack(footerOffset,FOOTER_MARKER))
+
+        self.__File.close()
+        self.__File = None
+
+def WriteRecording(filename,entries,compression=Compression.ZLIB):
+    objWriter = RecordFileWriter(filename,compression)
+    objWriter.Open()
+    for entry in entries:
+        objWriter.Add(entry)
+    objWriter.Close()
+
+###########################################
+# A .bifc file that looks enough like a list of MarvinData objects for playback
+# File is memory mapped, and chunks are only decompressed when needed.
+class IndexedRecording(object):
+    CachedChunks = 4
+
+    def __init__(self,filename):
+        self._Filename = filename
+        self.__Lock = threading.Lock()
+        self.__Cache = collections.OrderedDict() # chunk number -> list of entries
+        self.__File = open(filename,'rb')
+        self.__Map = mmap.mmap(self.__File.fileno(),0,access=mmap.ACCESS_READ)
+
+        marker,version,self._Compression = _FileHeader.unpack_from(self.__Map,0)
+        if FILE_MARKER != marker or version > FORMAT_VERSION:
+            self.clear()
+            raise ValueError("Not a supported recording file: " + filename)
+
+        if not self.__ReadFooter():
+            Log.getLogger().warning(filename + " was not closed properly, rebuilding index.")
+            self.__RebuildIndex()
+
+        self.__ChunkStarts = [chunk[4] for chunk in self.__Chunks]
+        self.__ChunkMaxTimes = []
+        maxTime = None
+        for chunk in self.__Chunks: # running max, so can bisect even if time went backwards a bit
+            if None == maxTime or chunk[3] > maxTime:
+                maxTime = chunk[3]
+            self.__ChunkMaxTimes.append(maxTime)
+
+    def __ReadFooter(self):
+        if len(self.__Map) < _FileHeader.size + _FooterTail.size:
+            return False
+
+        footerOffset,marker = _FooterTail.unpack_from(self.__Map,len(self.__Map) - _FooterTail.size)
+        if FOOTER_MARKER != marker:
+            return False
+
+        marker,compressedLen = _FooterHeader.unpack_from(self.__Map,footerOffset)
+        start = footerOffset + _FooterHeader.size
+        index = json.loads(_Decompress(self._Compression,self.__Map[start:start+compressedLen]).decode('utf-8'))
+
+        self.__Namespaces = index["Namespaces"]
+        self.__IDs = index["IDs"]
+        self.__Chunks = index["Chunks"]
+        self.__IDChunks = index["IDChunks"]
+        self.__EntryCount = index["EntryCount"]
+        return True
+
+    # no footer, so go through each chunk that made it to disk
+    def __RebuildIndex(self):
+        self.__Namespaces = []
+        self.__IDs = []
+        self.__Chunks = []
+        self.__IDChunks = {}
+        self.__EntryCount = 0
+
+        offset = _FileHeader.size
+        while offset + _ChunkHeader.size <= len(self.__Map):
+            marker,compressedLen,entryCount,firstTime,lastTime = _ChunkHeader.unpack_from(self.__Map,offset)
+            start = offset + _ChunkHeader.size
+            if CHUNK_MARKER != marker or start + compressedLen > len(self.__Map):
+                break # cut off
+
+            try:
+                payload = _Decompress(self._Compression,self.__Map[start:start+compressedLen])
+            except Exception:
+                break
+
+            newNamespaces,pos = _UnpackStrings(payload,0)
+            newIDs,pos = _UnpackStrings(payload,pos)
+            self.__Namespaces.extend(newNamespaces)
+            self.__IDs.extend(newIDs)
+
+            _,pos = _UnpackArray('q',payload,pos) # entry times
+            _,pos = _UnpackArray('B',payload,pos) # entry flags
+            _,pos = _UnpackArray('I',payload,pos) # entry counts
+            _,pos = _UnpackArray('q',payload,pos) # datapoint times
+            nsNums,pos = _UnpackArray('I',payload,pos)
+            idNums,pos = _UnpackArray('I',payload,pos)
+
+            chunkNum = len(self.__Chunks)
+            for nsNum,idNum in zip(nsNums,idNums):
+                chunkList = self.__IDChunks.setdefault(str(nsNum) + ":" + str(idNum),[])
+                if 0 == len(chunkList) or chunkList[-1] != chunkNum:
+                    chunkList.append(chunkNum)
+
+            self.__Chunks.append([offset,entryCount,firstTime,lastTime,self.__EntryCount])
+            self.__EntryCount += entryCount
+            offset = start + compressedLen
+
+    def __DecodeChunk(self,chunkNum):
+        offset = self.__Chunks[chunkNum][0]
+        _,compressedLen,_,_,_ = _ChunkHeader.unpack_from(self.__Map,offset)
+        start = offset + _ChunkHeader.size
+        payload = _Decompress(self._Compression,self.__Map[start:start+compressedLen])
+
+        _,pos = _UnpackStrings(payload,0) # already have the dictionary
+        _,pos = _UnpackStrings(payload,pos)
+        entryTimes,pos = _UnpackArray('q',payload,pos)
+        entryFlags,pos = _UnpackArray('B',payload,pos)
+        entryCounts,pos = _UnpackArray('I',payload,pos)
+        times,pos = _UnpackArray('q',payload,pos)
+        nsNums,pos = _UnpackArray('I',payload,pos)
+        idNums,pos = _UnpackArray('I',payload,pos)
+        values,pos = _UnpackStrings(payload,pos)
+
+        namespaces = self.__Namespaces
+        IDs = self.__IDs
+        entries = []
+        dpIndex = 0
+        for entryTime,flags,count in zip(entryTimes,entryFlags,entryCounts):
+            isLive = 0 != flags & _LiveFlag
+            if flags & _GroupFlag:
+                objEntry = MarvinGroupData.MarvinDataGroup("","","",entryTime,"1.0",False)
+                for dpNum in range(dpIndex,dpIndex + count):
+                    objData = MarvinData.MarvinData(namespaces[nsNums[dpNum]],IDs[idNums[dpNum]],values[dpNum],times[dpNum],"1.0",False)
+                    objData.Live = isLive
+                    objEntry.AddPacket(objData)
+            else:
+                objEntry = MarvinData.MarvinData(namespaces[nsNums[dpIndex]],IDs[idNums[dpIndex]],values[dpIndex],times[dpIndex],"1.0",False)
+
+            objEntry.Live = isLive
+            entries.append(objEntry)
+            dpIndex += count
+
+        return entries
+
+    def __GetChunk(self,chunkNum):
+        with self.__Lock:
+            try:
+                self.__Cache.move_to_end(chunkNum)
+                return self.__Cache[chunkNum]
+            except KeyError:
+                pass
+
+            entries = self.__DecodeChunk(chunkNum)
+            self.__Cache[chunkNum] = entries
+            if len(self.__Cache) > IndexedRecording.CachedChunks:
+                self.__Cache.popitem(last=False)
+
+            return entries
+
+    def __len__(self):
+        return self.__EntryCount
+
+    def __getitem__(self,index):
+        if index < 0:
+            index += self.__EntryCount
+
+        if index < 0 or index >= self.__EntryCount:
+            raise IndexError("recording index out of range")
+
+        chunkNum = bisect.bisect_right(self.__ChunkStarts,index) - 1
+        return self.__GetChunk(chunkNum)[index - self.__ChunkStarts[chunkNum]]
+
+    def __iter__(self):
+        for chunkNum in range(0,len(self.__Chunks)):
+            for entry in self.__GetChunk(chunkNum):
+                yield entry
+
+    # done with it, unmap the file
+    def clear(self):
+        with self.__Lock:
+            self.__Cache.clear()
+            self.__Chunks = []
+            self.__ChunkStarts = []
+            self.__ChunkMaxTimes = []
+            self.__EntryCount = 0
+            if None != self.__Map:
+                self.__Map.close()
+                self.__Map = None
+            if None != self.__File:
+                self.__File.close()
+                self.__File = None
+
+    def GetNamespaceCount(self):
+        return len(self.__Namespaces)
+
+    def GetIDCount(self):
+        return len(self.__IDChunks)
+
+    # index of 1st entry at or after the given arrival time
+    def FindIndexOfTime(self,arrivalTime):
+        chunkNum = bisect.bisect_left(self.__ChunkMaxTimes,arrivalTime)
+        if chunkNum >= len(self.__Chunks):
+            return self.__EntryCount
+
+        for entryNum,entry in enumerate(self.__GetChunk(chunkNum)):
+            if int(entry.ArrivalTime) >= arrivalTime:
+                return self.__ChunkStarts[chunkNum] + entryNum
+
+        return self.__ChunkStarts[chunkNum] + self.__Chunks[chunkNum][1]
+
+    # earliest arrival time of any entry, from the index
+    def GetFirstTime(self):
+        if 0 == len(self.__Chunks):
+            return None
+        return min([chunk[2] for chunk in self.__Chunks])
+
+    # (entry,datapoint) for each datapoint fnAllowed(Namespace,ID) is True for, in recorded order.
+    # Only touches chunks that have at least one of those IDs in them
+    def GetDatapointsForIDs(self,fnAllowed):
+        from Helpers import Configuration
+        chunkSet = set()
+        for key,chunkList in self.__IDChunks.items():
+            nsNum,idNum = key.split(":")
+            Namespace = Configuration.get().HandleBITWNamespace(self.__Namespaces[int(nsNum)]) # as MarvinData will have it
+            if fnAllowed(Namespace,self.__IDs[int(idNum)]):
+                chunkSet.update(chunkList)
+
+        for chunkNum in sorted(chunkSet):
+            for entry in self.__GetChunk(chunkNum):
+                if isinstance(entry,MarvinGroupData.MarvinDataGroup):
+                    datapoints = entry._DataList
+                else:
+                    datapoints = [entry]
+
+                for datapoint in datapoints:
+                    if fnAllowed(datapoint.Namespace,datapoint.ID):
+                        yield (entry,datapoint)
@@ -0,0 +1,224 @@
+##############################################################################
+#  Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+##############################################################################
+#    File Abstract:
+#    Streams recorded data to disk as it arrives, rather than keeping it all
+#    in memory.  Each chunk is a pickled list of data objects appended to the
+#    file and flushed to disk, so a crash only loses what hadn't been written
+#    yet.  Playback reads the chunks back one after another.
+#    If the file is a .bifc, chunks are written in that format instead.
+#    Can rotate to a new file when the current one gets too big or too old.
+##############################################################################
+import collections
+import os
+import pickle
+import threading
+from Helpers import Log
+from Helpers import ThreadManager
+from Helpers import RecordFile
+from Util import Time
+
+class RecordStreamWriter(object):
+    ChunkSize = 1000    # datapoints per chunk written to disk
+    FlushInterval = 1000 # ms, write what we have at least this often
+
+    def __init__(self,filename,bufferSize,maxFileBytes,maxFileSeconds,compression=RecordFile.Compression.ZLIB):
+        self._Filename = filename
+        self._Compression = compression
+        self._Indexed = '.bifc' in filename.lower()
+        self._BufferSize = bufferSize        # max datapoints waiting to be written
+        self._MaxFileBytes = maxFileBytes     # 0 = no size rotation
+        self._MaxFileSeconds = maxFileSeconds # 0 = no time rotation
+        self.__Condition = threading.Condition()
+        self.__Pending = collections.deque()
+        self.__ThreadName = "RecordStreamWriter"
+        self.__File = None
+        self.__Writer = None # RecordFileWriter if doing a .bifc
+        self.__FileIndex = 0
+        self.__FileOpenTime = 0
+        self.__FileBytes = 0
+        self.__Files = []
+
+        self.__Count = 0
+        self.__BytesWritten = 0
+        self.__Dropped = 0
+
+    def GetCount(self):
+        return self.__Count
+
+    def GetBytesWritten(self):
+        return self.__BytesWritten
+
+    def GetDropped(self):
+        return self.__Dropped
+
+    def GetFiles(self):
+        return self.__Files
+
+    def __Rotating(self):
+        return self._MaxFileBytes > 0 or self._MaxFileSeconds > 0
+
+    def __NextFilename(self):
+        if not self.__Rotating():
+            return self._Filename
+
+        baseName,ext = os.path.splitext(self._Filename)
+        return "{0}_{1:03d}{2}".format(baseName,self.__FileIndex,ext)
+
+    def __OpenNextFile(self):
+        self.__CloseFile()
+        filename = self.__NextFilename()
+        self.__FileIndex += 1
+
+        if self._Indexed:
+            self.__Writer = RecordFile.RecordFileWriter(filename,self._Compression)
+            self.__Writer.Open()
+        else:
+            self.__File = open(filename,'wb')
+        self.__FileOpenTime = Time.GetCurrMS()
+        self.__FileBytes = 0
+        self.__Files.append(filename)
+        Log.getLogger().info("Recording to file: " + filename)
+
+    def __CloseFile(self):
+        if None != self.__Writer:
+            self.__Writer.Close() # writes the index
+            self.__Writer = None
+
+        if None != self.__File:
+            self.__File.close()
+            self.__File = None
+
+    def __NeedsRotation(self):
+        if self.__FileBytes == 0:
+            return False # nothing in it yet
+
+        if self._MaxFileBytes > 0 and self.__FileBytes >= self._MaxFileBytes:
+            return True
+
+        if self._MaxFileSeconds > 0 and Time.GetCurrMS() - self.__FileOpenTime >= self._MaxFileSeconds * 1000:
+            return True
+
+        return False
+
+    def Start(self):
+        try:
+            self.__OpenNextFile()
+        except Exception as Ex:
+            Log.getLogger().error("Unable to open recording file: " + str(Ex))
+            return False
+
+        ThreadManager.GetThreadManager().CreateThread(self.__ThreadName,self.__WorkerProc)
+        ThreadManager.GetThreadManager().StartThread(self.__ThreadName)
+        return True
+
+    # writes out anything left and closes the file
+    def Stop(self):
+        ThreadManager.GetThreadManager().RemoveThread(self.__ThreadName) # waits for it to finish
+        self.__CloseFile()
+        if self.__Dropped > 0:
+            Log.getLogger().warning("Recording dropped " + str(self.__Dropped) + " datapoints, disk could not keep up.")
+
+    # returns False if buffer is full and data was dropped
+    def Add(self,objData):
+        with self.__Condition:
+            if len(self.__Pending) >= self._BufferSize:
+                self.__Dropped += 1
+                return False
+
+            self.__Pending.append(objData)
+            if len(self.__Pending) >= RecordStreamWriter.ChunkSize:
+                self.__Condition.notify()
+
+        return True
+
+    def __TakeChunk(self):
+        with self.__Condition:
+            chunk = list(self.__Pending)
+            self.__Pending.clear()
+
+        return chunk
+
+    def __WriteChunk(self,chunk):
+        if self.__NeedsRotation():
+            self.__OpenNextFile()
+
+        if None != self.__Writer:
+            startBytes = self.__Writer.GetBytesWritten()
+            for objData in chunk:
+                self.__Writer.Add(objData)
+            self.__Writer.Flush(True) # so it survives a crash
+            written = self.__Writer.GetBytesWritten() - startBytes
+
+        else:
+            buffer = pickle.dumps(chunk,pickle.DEFAULT_PROTOCOL)
+            self.__File.write(buffer)
+            self.__File.flush()
+            os.fsync(self.__File.fileno()) # so it survives a crash
+            written = len(buffer)
+
+        self.__FileBytes += written
+        self.__BytesWritten += written
+        self.__Count += len(chunk)
+
+    def __WorkerProc(self,fnKillSignalled,userData):
+        lastWriteTime = Time.GetCurrMS()
+        while not fnKillSignalled():
+            with self.__Condition:
+                if len(self.__Pending) < RecordStreamWriter.ChunkSize:
+                    self.__Condition.wait(0.25) # wake up once in a while to check if signalled to exit
+
+                pendingCount = len(self.__Pending)
+
+            if 0 == pendingCount:
+                continue
+
+            if pendingCount < RecordStreamWriter.ChunkSize and Time.GetCurrMS() - lastWriteTime < RecordStreamWriter.FlushInterval:
+                continue
+
+            try:
+                self.__WriteChunk(self.__TakeChunk())
+            except Exception as Ex:
+                Log.getLogger().error("Error writing recording file: " + str(Ex))
+
+            lastWriteTime = Time.GetCurrMS()
+
+        chunk = self.__TakeChunk() # anything left over
+        if len(chunk) > 0:
+            try:
+                self.__WriteChunk(chunk)
+            except Exception as Ex:
+                Log.getLogger().error("Error writing recording file: " + str(Ex))
+
+# reads all the chunks back in, returns list of entries
+# a chunk that was cut off (crash while writing) ends things, but what was before it is kept
+def ReadStreamedFile(fp):
+    entries = []
+    while True:
+        try:
+            chunk = pickle.load(fp)
+
+        except EOFError:
+            break
+
+        except Exception as Ex:
+            if 0 == len(entries):
+                raise # not a file we wrote, let caller deal with it
+            Log.getLogger().warning("Recording file truncated, using the " + str(len(entries)) + " entries before it: " + str(Ex))
+            break
+
+        entries.extend(chunk)
+
+    return entries
@@ -19,6 +19,7 @@
 ##############################################################################
 from Helpers import  Log
 from Helpers import Playback
+from Helpers import RecordStream
 import sys
 
 from Helpers import Log
@@ -44,6 +45,8 @@ class Recorder(object):
         self._StopTime = Time.GetCurrMS()
         self._Stopped=True
         self._Saved = True
+        self._Stream = None # RecordStreamWriter when streaming to disk instead of memory
+        self._Forwarder = None # in an ingest process, recorded data goes to the main Oscar
 
 
     @staticmethod
@@ -62,10 +65,24 @@ class Recorder(object):
     def GetData(self):
         return self._RecordedData
 
+    def IsRecording(self):
+        return not self._Stopped
+
+    # will AddData keep what it is given
+    def WantsData(self):
+        return None != self._Forwarder or not self._Stopped
+
+    def IsStreaming(self):
+        return None != self._Stream
+
     def GetRecordedCount(self):
+        if None != self._Stream:
+            return self._Stream.GetCount()
         return len(self._RecordedData)
 
     def GetBytesRecorded(self):
+        if None != self._Stream:
+            return self._Stream.GetBytesWritten()
         return self._Bytes
 
     def GetRecordingTime(self):
@@ -74,10 +91,21 @@ class Recorder(object):
 
         return int((Time.GetCurrMS() - self._StartTime)/1000)
 
+    def SetForwarder(self,fnForward):
+        self._Forwarder = fnForward
+
     def AddData(self,objData):
+        if None != self._Forwarder:
+            self._Forwarder(objData)
+            return
+
         if True == self._Stopped:
             return
 
+        if None != self._Stream:
+            self._Stream.Add(objData)
+            return
+
         if 0 == len(self._RecordedData): # only start timing when get 1st packet
             self._StartTime = Time.GetCurrMS()
 
@@ -87,12 +115,41 @@ class Recorder(object):
 
     def Start(self):
         self._StartTime = Time.GetCurrMS()
+        self.__StartStream()
         self._Stopped=False
-        self._Saved = False
+        self._Saved = None != self._Stream # already on disk
+
+    # if configured, and have somewhere to write to, stream to disk rather than to memory
+    def __StartStream(self):
+        from Helpers import Configuration
+        config = Configuration.get()
+        filename = config.GetRecordFilename()
+
+        if not config.GetStreamRecording():
+            return
+
+        if None == filename:
+            Log.getLogger().warning("Streamed recording requires a file to record to (--record), recording to memory.")
+            return
+
+        if '.bifm' in filename.lower():
+            Log.getLogger().warning("Streamed recording not supported for Marvin (.bifm) files, recording to memory.")
+            return
+
+        bufferSize,maxFileBytes,maxFileSeconds = config.GetStreamRecordingSettings()
+        objStream = RecordStream.RecordStreamWriter(filename,bufferSize,maxFileBytes,maxFileSeconds,config.GetRecordFileCompression())
+        if objStream.Start():
+            self._Stream = objStream
 
     def Stop(self,flush):
         self._StopTime = Time.GetCurrMS()
         self._Stopped=True
+        if None != self._Stream:
+            self._Stream.Stop()
+            self._Stream = None
+            self._Saved = True
+            return # data is on disk, not going to load it all back into memory for playback
+
         if True == flush:
             self._Flush()
 
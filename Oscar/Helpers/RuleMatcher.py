@@ -0,0 +1,128 @@
+##############################################################################
+#  Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+##############################################################################
+#    File Abstract:
+#    Matching of Shunt and BITW rules.  The regEx's for a set of rules are
+#    compiled once, into a single alternation, and what a given Namespace/ID
+#    resolved to is kept in a bounded LRU cache.
+##############################################################################
+import collections
+import re
+import threading
+
+# an ordered list of (regEx,value) rules, first one to match wins
+class PatternSet(object):
+    def __init__(self,ruleList):
+        self.__Exact = {}     # straight string compare, checked 1st
+        self.__Values = []
+        self.__Patterns = []  # each rule compiled by itself, for what comes after the 1st match
+        for pattern,value in ruleList:
+            if not pattern in self.__Exact:
+                self.__Exact[pattern] = value
+            self.__Values.append(value)
+            self.__Patterns.append(re.compile(pattern))
+
+        self.__Combined = None
+        # wrapping each rule in a group renumbers any groups of its own, which breaks backreferences like \1
+        if len(ruleList) > 0 and all(0 == compiled.groups for compiled in self.__Patterns):
+            try:
+                self.__Combined = re.compile("|".join("(?P<_Rule{0}>{1})".format(index,pattern) for index,(pattern,_) in enumerate(ruleList)))
+            except re.error: # rules that can't be combined (such as same named groups), check one at a time
+                pass
+
+    def __len__(self):
+        return len(self.__Values)
+
+    def __FirstMatchIndex(self,text):
+        if None != self.__Combined:
+            matched = self.__Combined.match(text)
+            if None == matched:
+                return None
+            return int(matched.lastgroup[len("_Rule"):]) # outer group closes last, so it is the lastgroup
+
+        return self.__NextMatchIndex(text,0)
+
+    # value of 1st matching rule, or None
+    def Match(self,text):
+        if text in self.__Exact:
+            return self.__Exact[text]
+
+        index = self.__FirstMatchIndex(text)
+        if None == index:
+            return None
+        return self.__Values[index]
+
+    # all matching values, in rule order with an exact match first.  Only does the
+    # work for the ones after the 1st if the caller keeps going
+    def Matches(self,text):
+        exactValue = self.__Exact.get(text)
+        if None != exactValue:
+            yield exactValue
+
+        index = self.__FirstMatchIndex(text)
+        while None != index:
+            if not self.__Values[index] is exactValue: # already done it
+                yield self.__Values[index]
+
+            index = self.__NextMatchIndex(text,index + 1)
+
+    def __NextMatchIndex(self,text,startIndex):
+        for index in range(startIndex,len(self.__Patterns)):
+            if None != self.__Patterns[index].match(text):
+                return index
+        return None
+
+# bounded cache of resolved rule lookups, None is a valid (not matched) value
+class LRUCache(object):
+    _NotFound = object()
+
+    def __init__(self,maxEntries):
+        self._MaxEntries = maxEntries
+        self.__Entries = collections.OrderedDict()
+        self.__Lock = threading.Lock() # called from many worker threads
+        self.__Hits = 0
+        self.__Misses = 0
+
+    # returns (found,value)
+    def Get(self,key):
+        with self.__Lock:
+            value = self.__Entries.get(key,LRUCache._NotFound)
+            if value is LRUCache._NotFound:
+                self.__Misses += 1
+                return (False,None)
+
+            self.__Entries.move_to_end(key)
+            self.__Hits += 1
+            return (True,value)
+
+    def Put(self,key,value):
+        with self.__Lock:
+            self.__Entries[key] = value
+            self.__Entries.move_to_end(key)
+            if len(self.__Entries) > self._MaxEntries:
+                self.__Entries.popitem(last=False)
+
+    def Clear(self):
+        with self.__Lock:
+            self.__Entries.clear()
+
+    def GetHits(self):
+        return self.__Hits
+
+    def GetMisses(self):
+        return self.__Misses
+
+    def __len__(self):
+        return len(self.__Entries)
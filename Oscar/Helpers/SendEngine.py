@@ -0,0 +1,332 @@
+##############################################################################
+#  Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+##############################################################################
+#    File Abstract:
+#    Optional replacement for each Target having its own thread and socket.
+#    A single thread sends for every Target, over a small pool of non-blocking
+#    UDP sockets, using selectors (epoll where there is one) to know when it
+#    has something to do.  DNS lookups are done on a helper thread, so a slow
+#    one doesn't hold up every target.
+##############################################################################
+import queue
+import selectors
+import socket
+import threading
+import time
+from Helpers import Log
+from Helpers import ThreadManager
+from Util import Time
+from Util import Sleep
+
+def get():
+    return SendEngine.get()
+
+class SendEngine(object):
+    _instance = None
+    WakeupInterval = 250 # ms, same as a Target thread, for watchdog and DNS housekeeping
+
+    def __init__(self):
+        if None != SendEngine._instance:
+            return
+
+        SendEngine._instance = self
+
+        from Helpers import Configuration
+        self.__Targets = []
+        self.__TargetsLock = threading.Lock()
+        self.__Ready = set()        # Targets with something queued
+        self.__ReadyLock = threading.Lock() # also guards __Unsent
+        self.__Unsent = {}          # Target --> (address,sendList,notBefore) left over when sockets were full or rate limited
+        self.__Sockets = []
+        self.__Blocked = set()      # sockets waiting to be writable again
+        self.__NextSocket = 0
+        self.__Selector = selectors.DefaultSelector()
+        self.__WakeRecv,self.__WakeSend = socket.socketpair()
+        self.__WakeRecv.setblocking(False)
+        self.__WakeSend.setblocking(False)
+        self.__WakePending = False
+        self.__Selector.register(self.__WakeRecv,selectors.EVENT_READ)
+
+        for _ in range(Configuration.get().GetSendEngineSockets()):
+            sock = socket.socket(socket.AF_INET,socket.SOCK_DGRAM,socket.IPPROTO_UDP)
+            sock.setblocking(False)
+            self.__Sockets.append(sock)
+
+        self.__ResolveQueue = queue.Queue() # Targets that need a DNS lookup
+        self.__Resolving = set()            # ones already in the queue
+        self.__ResolveLock = threading.Lock()
+
+        self.__ThreadName = "SendEngine"
+        ThreadManager.GetThreadManager().CreateThread(self.__ThreadName,self.__WorkerProc)
+        ThreadManager.GetThreadManager().StartThread(self.__ThreadName)
+        ThreadManager.GetThreadManager().CreateThread(self.__ThreadName + ":DNS",self.__ResolverProc)
+        ThreadManager.GetThreadManager().StartThread(self.__ThreadName + ":DNS")
+        Log.getLogger().info("Sending to all targets from a single thread using " + str(len(self.__Sockets)) + " sockets")
+
+    @staticmethod
+    def get():
+        if None == SendEngine._instance:
+            SendEngine() # create a new object, singleton
+
+        return SendEngine._instance
+
+    def AddTarget(self,objTarget):
+        with self.__TargetsLock:
+            self.__Targets.append(objTarget)
+
+    def RemoveTarget(self,objTarget):
+        with self.__TargetsLock:
+            if objTarget in self.__Targets:
+                self.__Targets.remove(objTarget)
+
+        with self.__ReadyLock:
+            self.__Ready.discard(objTarget)
+            self.__Unsent.pop(objTarget,None)
+
+    def GetTargetCount(self):
+        return len(self.__Targets)
+
+    # a Target has something queued
+    def Wake(self,objTarget):
+        with self.__ReadyLock:
+            self.__Ready.add(objTarget)
+            if self.__WakePending:
+                return # already been poked, and hasn't woken up yet
+            self.__WakePending = True
+
+        try:
+            self.__WakeSend.send(b'\0')
+        except (BlockingIOError,InterruptedError):
+            pass # plenty of wake ups in there already
+
+    # look up the Target's address on the DNS thread
+    def ResolveAddress(self,objTarget):
+        with self.__ResolveLock:
+            if objTarget in self.__Resolving:
+                return
+            self.__Resolving.add(objTarget)
+
+        self.__ResolveQueue.put(objTarget)
+
+    def __ResolverProc(self,fnKillSignalled,userData):
+        while not fnKillSignalled():
+            try:
+                objTarget = self.__ResolveQueue.get(True,SendEngine.WakeupInterval/1000.0)
+            except queue.Empty:
+                continue
+
+            try:
+                objTarget.ResolveAddress()
+            except Exception as Ex:
+                self.__OnTargetError(objTarget,Ex)
+
+            with self.__ResolveLock:
+                self.__Resolving.discard(objTarget)
+
+            with self.__ReadyLock: # anything waiting on the address can go now
+                unsent = self.__Unsent.get(objTarget)
+                if None != unsent and None == unsent[0]:
+                    self.__Unsent[objTarget] = (unsent[0],unsent[1],0)
+
+            self.Wake(objTarget)
+
+    def __DrainWakeups(self):
+        with self.__ReadyLock:
+            self.__WakePending = False
+
+        try:
+            while self.__WakeRecv.recv(4096):
+                pass
+        except (BlockingIOError,InterruptedError):
+            pass
+
+    def __GetSocket(self):
+        for _ in range(len(self.__Sockets)):
+            sock = self.__Sockets[self.__NextSocket]
+            self.__NextSocket = (self.__NextSocket + 1) % len(self.__Sockets)
+            if not sock in self.__Blocked:
+                return sock
+
+        return None # all of them are full
+
+    def __OnSocketBlocked(self,sock):
+        self.__Blocked.add(sock)
+        self.__Selector.register(sock,selectors.EVENT_WRITE)
+
+    # keep what didn't go for later, unless the target has been removed in the meantime
+    def __Park(self,objTarget,address,sendList,notBefore):
+        with self.__TargetsLock:
+            with self.__ReadyLock:
+                if objTarget in self.__Targets:
+                    self.__Unsent[objTarget] = (address,sendList,notBefore)
+
+    # one bad target mustn't stop sending to the others
+    def __OnTargetError(self,objTarget,Ex):
+        Log.getLogger().error("Send Engine error with target " + str(objTarget) + ": " + str(Ex))
+
+    def __IsParked(self,objTarget):
+        with self.__ReadyLock:
+            return objTarget in self.__Unsent
+
+    # returns False if sockets filled up, True otherwise.  Either way what didn't go is saved for later
+    def __SendList(self,objTarget,address,sendList):
+        if None == address: # still being looked up, check back in a bit in case the wake up is missed
+            self.__Park(objTarget,address,sendList,time.monotonic() + SendEngine.WakeupInterval/1000.0)
+            return True
+
+        sentCount = 0
+        for buffer,encoded,_ in sendList:
+            sock = self.__GetSocket()
+            if None == sock:
+                self.__Park(objTarget,address,sendList[sentCount:],0)
+                return False
+
+            try:
+                if None == encoded:
+                    encoded = buffer.encode('utf-8')
+
+                if objTarget.m_RateLimited:
+                    wait = objTarget.AcquireSendTokens(len(encoded))
+                    if wait > 0: # this target waits, others carry on
+                        self.__Park(objTarget,address,sendList[sentCount:],time.monotonic() + wait)
+                        return True
+
+                sock.sendto(encoded,address)
+                objTarget.OnPacketSent(buffer)
+                sentCount += 1
+
+            except (BlockingIOError,InterruptedError):
+                self.__OnSocketBlocked(sock) # tokens for this one already taken, small price for something rare
+                self.__Park(objTarget,address,sendList[sentCount:],0)
+                return False
+
+            except Exception as _:
+                objTarget.OnSendFailed(sendList[sentCount:])
+                return True
+
+        return True
+
+    def __ServiceTargets(self):
+        now = time.monotonic()
+        with self.__ReadyLock:
+            unsentList = sorted(self.__Unsent.items(),key=lambda item: item[1][2]) # longest waiting 1st, so sharing is fair
+
+        anyDue = any(unsent[2] <= now for _,unsent in unsentList) # if one is due, try them all, they likely share the global bucket
+        for objTarget,unsent in unsentList: # what didn't fit last time goes 1st
+            address,sendList,notBefore = unsent
+            if notBefore > now and not anyDue:
+                continue # still waiting on the rate limiter
+
+            with self.__ReadyLock:
+                if not self.__Unsent.pop(objTarget,None) is unsent:
+                    continue # removed since
+
+            try:
+                if None == address:
+                    address = objTarget.GetSendAddress()
+
+                if not self.__SendList(objTarget,address,sendList):
+                    return # still full
+
+            except Exception as Ex:
+                self.__OnTargetError(objTarget,Ex)
+                continue
+
+            if not self.__IsParked(objTarget): # caught up, now see if more has been queued
+                with self.__ReadyLock:
+                    self.__Ready.add(objTarget)
+
+        with self.__TargetsLock:
+            targetSet = set(self.__Targets)
+
+        with self.__ReadyLock:
+            readyList = list(self.__Ready)
+            self.__Ready.clear()
+
+        for index,objTarget in enumerate(readyList):
+            if not objTarget in targetSet: # removed, but got woken up after
+                continue
+
+            if self.__IsParked(objTarget): # rate limited, will get picked up once it has waited, keeping things in order
+                continue
+
+            try:
+                sendList = objTarget.TakeSendList()
+                if None == sendList:
+                    continue
+
+                address,sendList = objTarget.PrepareSendList(sendList)
+                if not self.__SendList(objTarget,address,sendList):
+                    with self.__ReadyLock:
+                        self.__Ready.update(readyList[index + 1:]) # do these once there is room
+                    return
+
+            except Exception as Ex:
+                self.__OnTargetError(objTarget,Ex)
+
+    def __Housekeeping(self):
+        with self.__TargetsLock:
+            targetList = list(self.__Targets)
+
+        for objTarget in targetList:
+            try:
+                objTarget.Housekeeping()
+            except Exception as Ex:
+                self.__OnTargetError(objTarget,Ex)
+
+    # seconds to wait for something to happen, 0 if there is something to do now
+    def __GetTimeout(self,nextHousekeeping):
+        timeout = max(nextHousekeeping - Time.GetCurrMS(),0) / 1000.0
+        if len(self.__Blocked) >= len(self.__Sockets):
+            return timeout # nowhere to send until a socket is writable
+
+        with self.__ReadyLock:
+            if len(self.__Ready) > 0:
+                return 0
+
+            unsentList = list(self.__Unsent.values())
+
+        now = time.monotonic()
+        for _,_,notBefore in unsentList:
+            timeout = min(timeout,max(notBefore - now,0))
+
+        return timeout
+
+    def __WorkerProc(self,fnKillSignalled,userData):
+        nextHousekeeping = Time.GetCurrMS() + SendEngine.WakeupInterval
+        while not fnKillSignalled(): # run until signalled to end - call passed function to check for the signal
+            try:
+                timeout = self.__GetTimeout(nextHousekeeping)
+                for key,_ in self.__Selector.select(timeout):
+                    if key.fileobj is self.__WakeRecv:
+                        self.__DrainWakeups()
+                    else: # socket has room again
+                        self.__Selector.unregister(key.fileobj)
+                        self.__Blocked.discard(key.fileobj)
+
+                self.__ServiceTargets()
+
+                if Time.GetCurrMS() >= nextHousekeeping:
+                    self.__Housekeeping()
+                    nextHousekeeping = Time.GetCurrMS() + SendEngine.WakeupInterval
+
+            except Exception as Ex: # keep going, this is the only thread sending
+                Log.getLogger().error("Unknown error in Send Engine: " + str(Ex))
+                Sleep.SleepMs(10) # don't spin if it keeps happening
+
+        # all done, so close things down
+        self.__Selector.close()
+        for sock in self.__Sockets + [self.__WakeRecv,self.__WakeSend]:
+            sock.close()
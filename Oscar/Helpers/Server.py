@@ -18,6 +18,8 @@
 #
 ##############################################################################
 import socket 
+import selectors
+import collections
 import threading
 import traceback
 import time
@@ -28,6 +30,8 @@ from Helpers import Log
 from Helpers import ThreadManager
 from Helpers import TargetManager
 from Helpers import DataHandler
+from Helpers import BinaryProtocol
+from Helpers import Statistics
 from Data import ConnectionPoint
 from Data.ConnectionPoint import ConnectionType
 from threading import Lock
@@ -36,6 +40,29 @@ import os
 
 TCP_PACKET_DELIMITER_START=chr(2)
 TCP_PACKET_DELIMITER_END=chr(3)
+TCP_FRAME_START=TCP_PACKET_DELIMITER_START.encode('utf-8')
+TCP_FRAME_END=TCP_PACKET_DELIMITER_END.encode('utf-8')
+
+# packets the OS dropped for a UDP socket because its receive buffer was full
+# from /proc/net/udp, so returns None where there isn't one (such as Windows)
+def ReadKernelUDPDrops(sock):
+    try:
+        inode = str(os.fstat(sock.fileno()).st_ino)
+    except Exception:
+        return None
+
+    for procFile in ["/proc/net/udp","/proc/net/udp6"]:
+        try:
+            with open(procFile) as fp:
+                fp.readline() # header
+                for line in fp:
+                    fields = line.split()
+                    if len(fields) > 12 and fields[9] == inode:
+                        return int(fields[12])
+        except (IOError,OSError,ValueError):
+            pass
+
+    return None
 
 #################################
 # Listens for incoming data and gets it processed
@@ -50,6 +77,8 @@ class ServerUDP(ConnectionPoint.ConnectionPoint):
         self.m_socket = None
         self.m_DropPackets=False
         self.m_objLock = threading.Lock()
+        self.m_KernelDrops = None
+        self.m_ReusePort = False # share the port with other processes (see IngestShard)
         
     #start receiving and processing data
     def Start(self):
@@ -59,9 +88,11 @@ class ServerUDP(ConnectionPoint.ConnectionPoint):
         self.m_Name = "ServerUDP:"+str(self)
         self.m_socket = socket.socket(socket.AF_INET,socket.SOCK_DGRAM)
         try:
+            self.__SetSocketRecvBuffer()
+            if self.m_ReusePort:
+                self.m_socket.setsockopt(socket.SOL_SOCKET,socket.SO_REUSEPORT,1)
             self.m_socket.bind((self.getIP(),self.getPort()))
-            self.m_socket.setblocking(True)
-            self.m_socket.settimeout(0.5)
+            self.m_socket.setblocking(False) # waits in a selector, then drains everything there
         except Exception as ex:
             Log.getLogger().error("Invalid Socket IP or Port " + str(self) +" - " + str(ex))
             return False
@@ -86,46 +117,200 @@ class ServerUDP(ConnectionPoint.ConnectionPoint):
             self.m_socket.close()
             self.m_socket = None
 
+    def __SetSocketRecvBuffer(self):
+        from Helpers import Configuration
+        requested = Configuration.get().GetSocketRecvBufferSize()
+        if requested < 1:
+            return
+
+        self.m_socket.setsockopt(socket.SOL_SOCKET,socket.SO_RCVBUF,requested)
+        actual = self.m_socket.getsockopt(socket.SOL_SOCKET,socket.SO_RCVBUF)
+        if actual < requested: # Linux reports double what it uses, so this is only when it was capped
+            Log.getLogger().warning(str(self) + " asked for a " + str(requested) + " byte receive buffer, but only got " + str(actual) + " - check net.core.rmem_max")
+
+    def SetReusePort(self,flag):
+        self.m_ReusePort = flag
+
     def DropPackets(self,flag):
         self.m_objLock.acquire()
         self.m_DropPackets = flag
         self.m_objLock.release()
 
+    def IsDroppingPackets(self):
+        return self.__DropPackets()
+
     def __DropPackets(self):
         self.m_objLock.acquire()
         retVal = self.m_DropPackets
         self.m_objLock.release()
         return retVal
 
+    # reads up to batchSize packets that are already waiting, without blocking
+    def __ReadBatch(self,buffSize,batchSize):
+        batch = []
+        rxBytes = 0
+        while len(batch) < batchSize:
+            try:
+                data, fromAddress = self.m_socket.recvfrom(buffSize)
+            except (BlockingIOError,InterruptedError):
+                break # drained
+            except OSError: # such as ICMP port unreachable on Windows, try again next wake up
+                break
+
+            rxBytes += len(data)
+            if not BinaryProtocol.IsBinaryPacket(data): # binary Minion data is decoded by the DataHandler
+                try:
+                    data = data.strip().decode("utf-8")
+                except UnicodeDecodeError:
+                    Statistics.GetStatistics().OnMalformedPacketReceived("Invalid data received from " + str(fromAddress))
+                    continue
+
+            batch.append((data,fromAddress))
+
+        self.m_rxPackets += len(batch)
+        self.m_rxBytes += rxBytes
+        return batch
+
+    def __UpdateKernelDrops(self):
+        self.m_KernelDrops = ReadKernelUDPDrops(self.m_socket)
+        Statistics.GetStatistics().OnKernelRecvDrops(self.m_Name,self.m_KernelDrops)
+
     # Main worker thread for receiving data from a socket.
-    # data comes in and another thread is created to actually process it.
+    # waits for data, then reads everything waiting (up to a batch) and hands it off as one
     def workerProc(self,fnKillSignalled,userData):
         dataHandler = DataHandler.GetDataHandler()
+        stats = Statistics.GetStatistics()
         from Helpers import Configuration
         buffSize = Configuration.get().GetRecvBufferSize()
+        batchSize = Configuration.get().GetRecvBatchSize()
+        selector = selectors.DefaultSelector()
+        selector.register(self.m_socket,selectors.EVENT_READ)
+        nextDropCheck = 0
         try:
             while not fnKillSignalled(): # run until signalled to end - call passed function to check for the signal
-                try:
-                    data, fromAddress = self.m_socket.recvfrom(buffSize)
-                    data = data.strip().decode("utf-8")
-                    self.m_rxPackets +=1
-                    self.m_rxBytes += len(data)
+                if Time.GetCurrMS() >= nextDropCheck:
+                    self.__UpdateKernelDrops()
+                    nextDropCheck = Time.GetCurrMS() + 1000
+
+                if not selector.select(0.5): # wake up once in a while to check if signalled to exit
+                    continue
 
-                except:# socket.error:
-                    #time.sleep(.01) #no data, so sleep for 10ms
+                batch = self.__ReadBatch(buffSize,batchSize)
+                if len(batch) < 1 or fnKillSignalled():
                     continue
 
-                if not fnKillSignalled():
-                    if False == self.__DropPackets():
-                        dataHandler.HandleLiveData(data,fromAddress)
-                    elif "<Marvin Type=\"Bullhorn\">" in data:
-                        dataHandler.HandleLiveData(data,fromAddress) # drop all but the Marvin Bullhorn
+                stats.OnRecvBatch(len(batch))
+                if False == self.__DropPackets():
+                    dataHandler.HandleLiveDataBatch(batch)
+                else:
+                    batch = [entry for entry in batch if isinstance(entry[0],str) and "<Marvin Type=\"Bullhorn\">" in entry[0]]
+                    if len(batch) > 0:
+                        dataHandler.HandleLiveDataBatch(batch) # drop all but the Marvin Bullhorn
 
         except Exception as ex:
             Log.getLogger().debug("Thread Error: " + str(ex) + " --> " + traceback.format_exc())
 
+        selector.close()
+
+
+# Splits a TCP byte stream into the chr(2) <packet> chr(3) framed packets the proxy sends.
+# Anything outside of a frame is tossed, a 2nd start before an end starts the packet over.
+class FrameBuffer(object):
+    def __init__(self,maxFrameSize):
+        self._MaxFrameSize = maxFrameSize
+        self.__Buffer = bytearray()
+        self.__ScanFrom = 0 # already looked for an end up to here
+        self.Dropped = 0
+
+    # returns list of complete packets (bytes) found so far
+    def Add(self,data):
+        self.__Buffer.extend(data)
+        frames = []
+        offset = 0
+        while True:
+            start = self.__Buffer.find(TCP_FRAME_START,offset)
+            if start < 0:
+                offset = len(self.__Buffer) # nothing that could be a packet
+                break
+
+            end = self.__Buffer.find(TCP_FRAME_END,max(start + 1,self.__ScanFrom))
+            if end < 0:
+                offset = start # partial packet, keep it for next time
+                break
+
+            start = self.__Buffer.rfind(TCP_FRAME_START,start,end) # one that started over
+            frames.append(bytes(self.__Buffer[start + 1:end]))
+            offset = end + 1
+
+        del self.__Buffer[:offset] # once, rather than per packet
+        self.__ScanFrom = len(self.__Buffer)
+
+        if len(self.__Buffer) > self._MaxFrameSize:
+            self.Dropped += 1
+            self.__Buffer = bytearray()
+            self.__ScanFrom = 0
+            Log.getLogger().error("TCP proxy packet bigger than " + str(self._MaxFrameSize) + " bytes, dropped")
+
+        return frames
+
+# a single TCP connection, with its receive framing and send queue
+class TCPConnection(object):
+    def __init__(self,sock,address,maxQueued,maxFrameSize):
+        self.Socket = sock
+        self.Address = address
+        self.Frames = FrameBuffer(maxFrameSize)
+        self._MaxQueued = maxQueued
+        self.__SendQueue = collections.deque() # framed packets, bytes
+        self.__Sending = None                  # memoryview of what is left of the packet being sent
+        self.Dropped = 0
+        self.WantWrite = False                 # what the selector is watching for
+
+    def QueueDepth(self):
+        return len(self.__SendQueue)
+
+    def HasDataToSend(self):
+        return None != self.__Sending or len(self.__SendQueue) > 0
+
+    # returns False if the queue is full and it was dropped
+    def Queue(self,framedPacket):
+        if len(self.__SendQueue) >= self._MaxQueued:
+            self.Dropped += 1
+            return False
+
+        self.__SendQueue.append(framedPacket)
+        return True
+
+    # sends as much as the socket will take, whole packets always go out in order
+    # returns bytes sent, raises if the connection is gone
+    def Flush(self):
+        sentBytes = 0
+        while True:
+            if None == self.__Sending:
+                try:
+                    self.__Sending = memoryview(self.__SendQueue.popleft())
+                except IndexError:
+                    return sentBytes
+
+            try:
+                sent = self.Socket.send(self.__Sending)
+            except (BlockingIOError,InterruptedError):
+                return sentBytes
+
+            sentBytes += sent
+            self.__Sending = self.__Sending[sent:]
+            if 0 == len(self.__Sending):
+                self.__Sending = None
+
+    def Close(self):
+        try:
+            self.Socket.close()
+        except Exception:
+            pass
 
 class ServerTCP(ServerUDP):
+    MaxQueuedPerClient = 10000          # framed packets waiting to go to a single client
+    MaxFrameSize = 16 * 1024 * 1024     # biggest packet accepted
+
     def __init__(self,ConnPoint,ConnType,downstreamServer,upstreamServer):
         super().__init__(ConnPoint,ConnType)     
         self._downstreamServer = downstreamServer
@@ -137,16 +322,30 @@ class ServerTCP(ServerUDP):
         self.MarkedForRemoval = False
         self.m_PacketsSent = 0
         self.m_BytestSent = 0
+        self.m_PacketsDropped = 0
+        self.m_RateLimitWaitTime = 0.0
         self.m_hasTimedOut = False
 
+        # all connections are handled by one thread, using a selector
+        self._Selector = selectors.DefaultSelector()
+        self._Connections = {}               # socket --> TCPConnection
+        self._ConnectionsLock = threading.Lock()
+        self.__WakeRecv,self.__WakeSend = socket.socketpair() # to get the selector thread's attention when there is something to send
+        self.__WakeRecv.setblocking(False)
+        self.__WakeSend.setblocking(False)
+        self._Selector.register(self.__WakeRecv,selectors.EVENT_READ)
+
         self._secondaryInit()
 
     def getResolvedIP(self):
         return self.getIP()
 
+    def GetQueueDepth(self):
+        with self._ConnectionsLock:
+            return sum([conn.QueueDepth() for conn in self._Connections.values()])
+
     
     def _secondaryInit(self):
-        self.__clients=[]   
         # Get messages to send towards Marvin
         self.m_Name = "ProxyTCP Server:"+str(self)
         #TargetManager.GetTargetManager().AddDownstreamTarget(self,self.m_Name)
@@ -156,7 +355,8 @@ class ServerTCP(ServerUDP):
     def Start(self):
         try:
             self.m_socket.bind((self.getIP(),self.getPort()))
-            #self.m_socket.setblocking(True)
+            self.m_socket.listen(5)
+            self.m_socket.setblocking(False)
         except Exception as ex:
             Log.getLogger().error("Invalid Socket IP or Port " + str(self) +" - " + str(ex))
             return False
@@ -169,119 +369,159 @@ class ServerTCP(ServerUDP):
 
         Log.getLogger().info(self.getTypeStr() +" listening on -->" + str(self))
         
-        ThreadManager.GetThreadManager().CreateThread(self.m_Name,self.acceptThread)
+        self._Selector.register(self.m_socket,selectors.EVENT_READ)
+        ThreadManager.GetThreadManager().CreateThread(self.m_Name,self._selectorProc)
         ThreadManager.GetThreadManager().StartThread(self.m_Name)
 
         return True
 
-    def _CheckForTimedOutConnection(self):
-        
-        if len(self.__clients) > 0:
-            removeList=[]
-            for clientSocket in self.__clients:
-                if True == clientSocket._closed:
-                    removeList.append(clientSocket)
+    def _AddConnection(self,sock,address):
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP,socket.TCP_NODELAY,1)
+        conn = TCPConnection(sock,address,ServerTCP.MaxQueuedPerClient,ServerTCP.MaxFrameSize)
+        with self._ConnectionsLock:
+            self._Connections[sock] = conn
+        self._Selector.register(sock,selectors.EVENT_READ,conn)
+        return conn
+
+    def _CloseConnection(self,conn):
+        with self._ConnectionsLock:
+            self._Connections.pop(conn.Socket,None)
+        try:
+            self._Selector.unregister(conn.Socket)
+        except (KeyError,ValueError):
+            pass
+        conn.Close()
 
-            for clientSocket in removeList:
-                self.__clients.remove(clientSocket)
+    def __Wake(self):
+        try:
+            self.__WakeSend.send(b'\0')
+        except (BlockingIOError,InterruptedError):
+            pass # plenty of wake ups in there already
 
-    def Send(self,sendPacket,ignoreTimeout=False):        
-        self._CheckForTimedOutConnection() # need only do this when somebody is writing
+    def Send(self,sendPacket,ignoreTimeout=False,encoded=None):
+        if None == encoded:
+            encoded = sendPacket.encode('utf-8')
+        framedPacket = b''.join((TCP_FRAME_START,encoded,TCP_FRAME_END))
 
-        if len(self.__clients) < 1:
-            return
+        with self._ConnectionsLock:
+            if len(self._Connections) < 1:
+                return False
 
-        delimeteredPacket = TCP_PACKET_DELIMITER_START + sendPacket + TCP_PACKET_DELIMITER_END
-        delimeteredPacket = bytes(delimeteredPacket,'utf-8')
-        for clientSocket in self.__clients:
-            try:
-                sentSize = 0
-                sendLen = len(delimeteredPacket)
-                while sentSize < sendLen:
-                    sentSize += clientSocket.send(delimeteredPacket[sentSize:])
-            except:
-                continue # go onto next one
+            for conn in self._Connections.values():
+                if not conn.Queue(framedPacket):
+                    self.m_PacketsDropped += 1
 
+        self.__Wake()
         return True
-                        
 
-    def acceptThread(self,fnKillSignalled,userData):
-        self.m_socket.listen(5)
-        while not fnKillSignalled(): # run until signalled to end - call passed function to check for the signal
+    def _accept(self):
+        while True:
             try:
                 clientSock, clientAddr = self.m_socket.accept()
-                clientThreadName = self.m_Name + str(clientAddr)
-                ThreadManager.GetThreadManager().CreateThread(clientThreadName,self.recvTCP_WorkerProc,(clientSock,clientAddr))
-                ThreadManager.GetThreadManager().StartThread(clientThreadName)
-                
-                self.__clients.append(clientSock)
+            except (BlockingIOError,InterruptedError,socket.timeout):
+                return
+            except OSError as ex: # such as out of file handles, try again next time
+                Log.getLogger().error("Proxy unable to accept connection: " + str(ex))
+                return
 
-            except socket.timeout:
-                time.sleep(.5)
-                pass                    
+            Log.getLogger().info("Proxy client connected " + str(clientAddr))
+            self._AddConnection(clientSock,clientAddr)
 
+    def _read(self,conn,buffSize):
+        try:
+            rawData = conn.Socket.recv(buffSize)
+        except (BlockingIOError,InterruptedError):
+            return
+
+        if not rawData:  # other end disconnected
+            Log.getLogger().debug("Client Disconnected " + str(conn.Address))
+            self._CloseConnection(conn)
+            return
+
+        self.m_rxBytes += len(rawData)
+        for frame in conn.Frames.Add(rawData):
+            self.m_rxPackets +=1
+            try:
+                packet = frame.decode("utf-8")
+            except UnicodeDecodeError:
+                Log.getLogger().error("Invalid data received on TCP proxy connection from " + str(conn.Address))
+                continue
+            self._processIncomingData(packet,conn.Address)
+
+    def _write(self,conn):
+        self.m_BytestSent += conn.Flush()
+
+    # only watch for writable when there is something to write, otherwise it always is
+    def _updateInterest(self):
+        with self._ConnectionsLock:
+            connList = list(self._Connections.values())
+
+        for conn in connList:
+            wantWrite = conn.HasDataToSend()
+            if wantWrite != conn.WantWrite:
+                conn.WantWrite = wantWrite
+                events = selectors.EVENT_READ | selectors.EVENT_WRITE if wantWrite else selectors.EVENT_READ
+                self._Selector.modify(conn.Socket,events,conn)
+
+    def _onIdle(self):
+        pass
 
-    def recvTCP_WorkerProc(self,fnKillSignalled,userData):
+    def _selectorProc(self,fnKillSignalled,userData):
         from Helpers import Configuration
         buffSize = Configuration.get().GetRecvBufferSize()
-        clientSock, clientAddr = userData
-        clientSock.settimeout(.1)
-
-        currPacket=None
         try:
             while not fnKillSignalled(): # run until signalled to end - call passed function to check for the signal
-                try:
-                    rawData = clientSock.recv(buffSize).decode("utf-8")
-                    if not rawData:  # other end disconnected
-                        Log.getLogger().debug("Client Disconnected " + str(userData))
-                        clientSock.close()
-                        return
-
-                    self.m_rxBytes += len(rawData)
-                    
-                    for dataByte in rawData:
-                        if dataByte == TCP_PACKET_DELIMITER_START:
-                            if None != currPacket:
-                                #print("Received Start of Packet before an End Of Packet Delimeter")
+                for key,mask in self._Selector.select(0.25): # wake up once in a while to check if signalled to exit
+                    if key.fileobj is self.__WakeRecv:
+                        try:
+                            while self.__WakeRecv.recv(4096):
                                 pass
-                            
-                            currPacket =""
+                        except (BlockingIOError,InterruptedError):
+                            pass
 
-                        elif dataByte == TCP_PACKET_DELIMITER_END:
-                            self.m_rxPackets +=1
-                            self._processIncomingData(currPacket,clientAddr)
+                    elif key.fileobj is self.m_socket:
+                        self._accept()
 
-                            currPacket = None
+                    else:
+                        conn = key.data
+                        try:
+                            if mask & selectors.EVENT_READ:
+                                self._read(conn,buffSize)
+                            if mask & selectors.EVENT_WRITE and conn.Socket in self._Connections:
+                                self._write(conn)
 
-                        else:
-                            currPacket += dataByte
+                        except Exception as ex: # socket.error
+                            Log.getLogger().info("Proxy connection " + str(conn.Address) + " lost: " + str(ex))
+                            self._CloseConnection(conn)
 
-                except Exception as _:# socket.error:
-                    time.sleep(.01) #no data, so sleep for 10ms
-                    continue
-
-                if not fnKillSignalled():
-                    pass
-                    #dataHandler.HandleLiveData(rawData,clientAddr)
+                self._updateInterest()
+                self._onIdle()
 
         except Exception as ex:
             Log.getLogger().debug("Thread Error: " + str(ex) + " --> " + traceback.format_exc())
 
+        with self._ConnectionsLock:
+            connList = list(self._Connections.values())
+        for conn in connList:
+            self._CloseConnection(conn)
+
     def _processIncomingData(self,buffer,clientAddr):
         # for Server packets, the data is coming from direction of Marvin 
         DataHandler.GetDataHandler().HandleLiveData(buffer,clientAddr)
 
-        pass
-#            dataHandler.HandleLiveData(currPacket,clientAddr)
-
-
 
 class ClientTCP(ServerTCP):
+    ReconnectInterval = 500 # ms
+
     def __init__(self,ConnPoint,ConnType,downstreamServer,upstreamServer):
         super().__init__(ConnPoint,ConnType,downstreamServer,upstreamServer)     
+        self.m_socket.close() # connects rather than listens
+        self.m_socket = None
+        self.__Connection = None
+        self.__LastConnectAttempt = 0
 
     def _secondaryInit(self):
-        self.__clients=[]
         # Get messages to send towards Minion
         self.m_Name = "ProxyTCP Client:"+str(self)
         TargetManager.GetTargetManager().AddDownstreamTarget(self,self.m_Name)
@@ -289,106 +529,34 @@ class ClientTCP(ServerTCP):
 
     def _processIncomingData(self,buffer,clientAddr):
         DataHandler.GetDataHandler().HandleLiveData(buffer,(self.getIP(),self.getPort()))
-        pass
 
     def _connect(self):
+        self.__LastConnectAttempt = Time.GetCurrMS()
         try:
-            self.m_socket = socket.socket(socket.AF_INET,socket.SOCK_STREAM)
-            self.m_socket.settimeout(.5)
-
-            self.m_socket.connect((self.getIP(),self.getPort()))
+            sock = socket.socket(socket.AF_INET,socket.SOCK_STREAM)
+            sock.settimeout(.5)
+            sock.connect((self.getIP(),self.getPort()))
 
         except Exception as _:
-            self.m_socket = None
             Log.getLogger().info("Unable to connect to Oscar Proxy Server {}:{}".format(self.getIP(),self.getPort()))
             return False
 
+        self.__Connection = self._AddConnection(sock,(self.getIP(),self.getPort()))
         return True
 
-    def _CheckForTimedOutConnection(self):
-        pass
+    def _CloseConnection(self,conn):
+        super()._CloseConnection(conn)
+        self.__Connection = None # go reconnect
+
+    # keeps trying to connect
+    def _onIdle(self):
+        if None == self.__Connection and Time.GetCurrMS() - self.__LastConnectAttempt >= ClientTCP.ReconnectInterval:
+            self._connect()
 
     def Start(self):
         Log.getLogger().info(self.getTypeStr() +" Connecting to -->" + str(self))
         
-        ThreadManager.GetThreadManager().CreateThread(self.m_Name,self.recvTCP_WorkerProc_Client,None)
+        ThreadManager.GetThreadManager().CreateThread(self.m_Name,self._selectorProc,None)
         ThreadManager.GetThreadManager().StartThread(self.m_Name)
 
         return True
-
-
-    def recvTCP_WorkerProc_Client(self,fnKillSignalled,_):
-        from Helpers import Configuration
-        buffSize = Configuration.get().GetRecvBufferSize()
-        self._connect()
-        currPacket=None
-        try:
-            while not fnKillSignalled(): # run until signalled to end - call passed function to check for the signal
-                if None == self.m_socket:
-                    time.sleep(.5)    
-                    self._connect()
-                    continue
-
-                try:
-                    rawData = self.m_socket.recv(buffSize).decode("utf-8")
-                    if len(rawData) == 0:  # other end disconnected
-                        time.sleep(.5)    
-                        self.m_socket.close()                    
-                        self._connect()
-                        currPacket=None
-                        continue
-
-                    self.m_rxBytes += len(rawData)
-                    
-                    for dataByte in rawData:
-                        if dataByte == TCP_PACKET_DELIMITER_START:
-                            if None != currPacket:
-#                                print("Received Start of Packet before an End Of Packet Delimeter")
-                                pass
-
-                            currPacket =""
-
-                        elif dataByte == TCP_PACKET_DELIMITER_END:
-                            self.m_rxPackets +=1
-                            self._processIncomingData(currPacket,None)
-                            currPacket = None
-
-                        else:
-                            currPacket += dataByte
-
-                except socket.timeout:
-                    pass
-
-                except Exception as _:# socket.error:
-                    self.m_socket.close()                    
-                    self.m_socket = None
-                    pass
-
-                    continue
-
-                if not fnKillSignalled():
-                    pass
-                    #dataHandler.HandleLiveData(rawData,clientAddr)
-
-        except Exception as ex:
-            Log.getLogger().debug("Thread Error: " + str(ex) + " --> " + traceback.format_exc())        
-
-    def Send(self,sendPacket,ignoreTimeout=False):        
-
-        if None == self.m_socket: # lost connection
-            return False
-
-        delimeteredPacket = TCP_PACKET_DELIMITER_START + sendPacket + TCP_PACKET_DELIMITER_END
-        delimeteredPacket = bytes(delimeteredPacket,'utf-8')
-
-        try:
-            sentSize = 0
-            sendLen = len(delimeteredPacket)
-            while sentSize < sendLen:
-                sentSize += self.m_socket.send(delimeteredPacket[sentSize:])
-
-        except Exception as _:
-            pass
-
-        return True
-                        
\ No newline at end of file
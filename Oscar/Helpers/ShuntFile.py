@@ -0,0 +1,107 @@
+##############################################################################
+#  Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+##############################################################################
+#    File Abstract:
+#    In memory copy of a shunt file.  Datapoints update the copy and mark it
+#    dirty, the shunt worker thread writes dirty files out every so often.
+#    Files are replaced with a rename, so anyone reading them never sees a
+#    half written file.
+##############################################################################
+import os
+import time
+from tempfile import mkstemp
+
+class ShuntFile(object):
+    def __init__(self,filename):
+        self.Filename = filename
+        self.Dirty = False
+        self.__Lines = None  # file contents, read in 1st time a value is set
+        self.__Index = {}    # "namespace.ID=" --> index in __Lines
+        self.__History = []  # history lines not yet written, for history only files
+
+    def __Load(self):
+        self.__Lines = []
+        try:
+            with open(self.Filename) as fp:
+                self.__Lines = fp.readlines()
+        except (IOError,OSError):
+            pass # not there yet, will get created
+
+        if len(self.__Lines) > 0 and not self.__Lines[-1].endswith("\n"):
+            self.__Lines[-1] += "\n"
+
+        for index,line in enumerate(self.__Lines):
+            if "=" in line:
+                key = line.split("=",1)[0] + "="
+                if not key in self.__Index: # 1st one wins, same as always
+                    self.__Index[key] = index
+
+        self.__Lines.extend(self.__History) # keep anything not yet written in order
+        self.__History = []
+
+    # collector style, namespace.ID=value, one line per ID
+    def SetValue(self,namespace,ID,value):
+        if None == self.__Lines:
+            self.__Load()
+
+        key = namespace + "." + ID + "="
+        entry = key + value + "\n"
+        if key in self.__Index:
+            self.__Lines[self.__Index[key]] = entry
+        else:
+            self.__Index[key] = len(self.__Lines)
+            self.__Lines.append(entry)
+
+        self.Dirty = True
+
+    def AddHistory(self,namespace,ID,value):
+        entry = time.strftime("%c") + " " + namespace + "." + ID + "=" + value + "\n"
+        if None == self.__Lines:
+            self.__History.append(entry)
+        else:
+            self.__Lines.append(entry)
+
+        self.Dirty = True
+
+    # returns (append,text), where append is True if text just gets tacked onto the end of the file
+    # call with the shunt lock held, the write itself can be done without it
+    def TakeContents(self):
+        self.Dirty = False
+        if None == self.__Lines: # only history so far, no need to re-write what is already there
+            text = "".join(self.__History)
+            self.__History = []
+            return (True,text)
+
+        return (False,"".join(self.__Lines))
+
+def WriteShuntFile(filename,append,text):
+    if append:
+        with open(filename,"a") as fp:
+            fp.write(text)
+        return
+
+    dirName = os.path.dirname(os.path.abspath(filename))
+    fd,tempPath = mkstemp(dir=dirName,prefix=".shunt") # same dir, so rename doesn't cross filesystems
+    try:
+        with os.fdopen(fd,"w") as fp:
+            fp.write(text)
+        os.replace(tempPath,filename)
+
+    except Exception:
+        try:
+            os.remove(tempPath)
+        except OSError:
+            pass
+        raise
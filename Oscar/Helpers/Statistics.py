@@ -22,6 +22,7 @@ from Util import Time
 
 class Statistics(object):
     _instance = None
+    HighWaterMarks = ["_IncomingQueueHighWaterMark","_LargestRecvBatch"] # merged by taking the biggest, rather than adding
     def __init__(self):
         if Statistics._instance == None: # singleton pattern
             Statistics._instance = self
@@ -49,6 +50,21 @@ class Statistics(object):
         self._TotalLocalOscarTasksRecieved=0
         self._TotalMarvinTasksReceived = 0
         self._TotalShuntedPackets = 0
+        self._TotalIncomingPacketsDropped = 0 # dropped because the incoming queue was full
+        self._IncomingQueueHighWaterMark = 0  # deepest the incoming queue has been
+        self._WorkerPacketsProcessed = []     # packets processed by each incoming worker thread
+        self._ControlPacketsProcessed = 0     # by the control worker, ahead of data
+        self._RateLimitWaits = 0              # times a target had to wait for the rate limiter before sending
+        self._RateLimitWaitTime = 0.0         # ms spent waiting on the rate limiter, all targets
+        self._RecvBatches = 0                 # times a UDP listener woke up and drained its socket
+        self._LargestRecvBatch = 0            # most packets drained in one go
+        self._KernelRecvDrops = {}            # listener --> packets the OS dropped because its socket buffer was full
+        self._SourceDrops = {}                # "IP:Port" --> packets dropped because that sender had too many queued
+        self._ShardSnapshots = {}             # ingest process --> last counters it sent
+        self._ShuntCacheHits = 0              # rule cache lookups from ingest processes, this
+        self._ShuntCacheMisses = 0            # process's own are counted by the caches themselves
+        self._BITWCacheHits = 0
+        self._BITWCacheMisses = 0
 
     def OnMarvinTaskReceived(self):
         self._TotalMarvinTasksReceived += 1
@@ -68,6 +84,93 @@ class Statistics(object):
     def OnMinionTaskReceived(self):
         self._TotalMinionTasksReceived +=1
 
+    def OnIncomingPacketDropped(self,numberDropped=1):
+        self._TotalIncomingPacketsDropped += numberDropped
+
+    def OnSourcePacketsDropped(self,source,numberDropped):
+        self._SourceDrops[source] = self._SourceDrops.get(source,0) + numberDropped
+        self._TotalIncomingPacketsDropped += numberDropped
+
+    # (source,dropped) for the source with the most dropped, or None
+    def GetWorstSource(self):
+        sourceList = list(self._SourceDrops.items())
+        if len(sourceList) < 1:
+            return None
+        return max(sourceList,key=lambda entry: entry[1])
+
+    def OnIncomingQueueDepth(self,depth):
+        if depth > self._IncomingQueueHighWaterMark:
+            self._IncomingQueueHighWaterMark = depth
+
+    def SetIncomingWorkerCount(self,count):
+        self._WorkerPacketsProcessed = [0] * count
+
+    def OnPacketProcessedByWorker(self,workerIndex,count=1):
+        self._WorkerPacketsProcessed[workerIndex] += count
+
+    def OnControlPacketProcessed(self):
+        self._ControlPacketsProcessed += 1
+
+    def OnRecvBatch(self,count):
+        self._RecvBatches += 1
+        if count > self._LargestRecvBatch:
+            self._LargestRecvBatch = count
+
+    # drops is None if the OS doesn't tell us
+    def OnKernelRecvDrops(self,listenerName,drops):
+        self._KernelRecvDrops[listenerName] = drops
+
+    # counters for an ingest process to send to the main Oscar
+    def GetSnapshot(self):
+        snapshot = {}
+        for name,value in list(self.__dict__.items()):
+            if isinstance(value,(int,float)) and not isinstance(value,bool):
+                snapshot[name] = value
+
+        snapshot["_KernelRecvDrops"] = dict(self._KernelRecvDrops)
+        snapshot["_SourceDrops"] = dict(self._SourceDrops)
+        (snapshot["_ShuntCacheHits"],snapshot["_ShuntCacheMisses"]),(snapshot["_BITWCacheHits"],snapshot["_BITWCacheMisses"]) = self.GetRuleCacheStats()
+        return snapshot
+
+    # adds in what an ingest process has done since the last snapshot it sent
+    def MergeSnapshot(self,shardIndex,snapshot):
+        previous = self._ShardSnapshots.get(shardIndex,{})
+        self._ShardSnapshots[shardIndex] = snapshot
+        for name,value in snapshot.items():
+            if "_KernelRecvDrops" == name:
+                for listenerName,drops in value.items():
+                    self._KernelRecvDrops["Ingest " + str(shardIndex) + " " + listenerName] = drops
+
+            elif "_SourceDrops" == name:
+                previousDrops = previous.get(name,{})
+                for source,dropped in value.items():
+                    self._SourceDrops[source] = self._SourceDrops.get(source,0) + dropped - previousDrops.get(source,0)
+
+            elif name in Statistics.HighWaterMarks:
+                setattr(self,name,max(getattr(self,name,0),value))
+
+            else:
+                setattr(self,name,getattr(self,name,0) + value - previous.get(name,0))
+
+    # ((hits,misses) for shunt rules,(hits,misses) for BITW rules), including ingest processes
+    def GetRuleCacheStats(self):
+        from Helpers import Configuration
+        shuntCache = Configuration.get().GetShuntCache()
+        bitwCache = Configuration.get().GetBITW_Cache()
+        return ((shuntCache.GetHits() + self._ShuntCacheHits,shuntCache.GetMisses() + self._ShuntCacheMisses),
+                (bitwCache.GetHits() + self._BITWCacheHits,bitwCache.GetMisses() + self._BITWCacheMisses))
+
+    # total for all listeners, None if unknown
+    def GetKernelRecvDrops(self):
+        dropList = [drops for drops in list(self._KernelRecvDrops.values()) if None != drops]
+        if len(dropList) < 1:
+            return None
+        return sum(dropList)
+
+    def OnRateLimitWait(self,waitMS):
+        self._RateLimitWaits += 1
+        self._RateLimitWaitTime += waitMS
+
     def OnPacketDropped(self,numberDropped=1):
         self._TotalPacketsDropped += numberDropped
 
@@ -21,6 +21,8 @@ import socket
 import threading
 import time
 import random
+import re
+import collections
 from Util import Time
 from Util import Sleep
 from Helpers import ThreadManager
@@ -29,10 +31,39 @@ from xml.parsers.expat import ExpatError
 from Data import ConnectionPoint
 from Data.ConnectionPoint import ConnectionType
 from Helpers import Statistics
+from Helpers import RateLimiter
 
 from Helpers import Log
 
+XML_HEADER = "<?xml version=\"1.0\" encoding=\"utf-8\"?>"
+GROUP_START = "<OscarGroup>"
+GROUP_END = "</OscarGroup>"
+
+# what to do when a Target's send queue is full
+class DropPolicy(object):
+    DropOldest = 0
+    DropNewest = 1
+    KeepLatest = 2 # replace queued data for the same Namespace+ID with the new value, otherwise drop the newest
+
+    @staticmethod
+    def FromString(strPolicy):
+        strPolicy = strPolicy.lower()
+        if strPolicy == "dropoldest":
+            return DropPolicy.DropOldest
+        if strPolicy == "dropnewest":
+            return DropPolicy.DropNewest
+        if strPolicy == "keeplatest":
+            return DropPolicy.KeepLatest
+        return None
+
+# returned by Target.Send() when the queue was full and the packet dropped, it has already been counted
+QUEUE_FULL = None
+
+_DatapointKeyPattern = re.compile(r"<Namespace>(.*?)</Namespace>\s*<ID>(.*?)</ID>")
+
 class Target(ConnectionPoint.ConnectionPoint):
+    WakeupInterval = 0.25 # seconds, check for timeouts etc. even if nothing to send
+
     def __init__(self,ip=None,Port=None,ConnType=ConnectionType.Unknown,canTimeout=True):
         super(Target,self).__init__(ip,Port,ConnType)
         self.ConfigurationDefinedTarget = ip
@@ -43,7 +74,10 @@ class Target(ConnectionPoint.ConnectionPoint):
         self.m_BytestSent = 0
         self.m_InitialRefreshSent = False
         self.m_objLockDict = threading.Lock()
-        self.m_SendList = []
+        self.m_SendSignal = threading.Condition(self.m_objLockDict) # signalled when something is added to m_SendList
+        self.m_SendList = collections.deque() # each entry is a [buffer,encoded] list, so KeepLatest can replace it in place
+        self.m_QueuedByID = {} # Namespace+ID -> entry in m_SendList, only used for KeepLatest
+        self.m_PacketsDropped = 0
         self.m_hasTimedOut = False
         self.m_LastDNSResolution = Time.GetCurrMS()
         self.m_DNSResolutionPeriod = 30000 #30 seconds
@@ -51,6 +85,30 @@ class Target(ConnectionPoint.ConnectionPoint):
         self.threadName = None
         self.lastRefreshRequestID = 0
         self.MarkedForRemoval = False
+        self.m_CoalesceMaxSize = 0 # if > 0, pack Oscar data packets into <OscarGroup> packets up to this size
+
+        self.m_RateLimited = False
+        self.m_RateLimiter = None
+        self.m_RateLimitWaitTime = 0.0 # ms spent waiting on the rate limiter
+        self.m_RateLimitParkedAt = None # when this target 1st had to wait for tokens, None if not waiting
+
+        from Helpers import Configuration
+        if ConnType != ConnectionType.Minion and ConnType != ConnectionType.UpstreamOscar: # Minions don't know what an OscarGroup is
+            if Configuration.get().GetCoalesceDownstream():
+                self.m_CoalesceMaxSize = Configuration.get().GetCoalesceMTU() - 20 - 8 # IPV4 + UDP Header
+
+            # only limit what goes downstream, heartbeats and refresh requests going upstream must always get out
+            self.m_RateLimited = Configuration.get().IsRateLimited()
+            self.m_RateLimiter = RateLimiter.RateLimiter(Configuration.get().GetTargetRateLimit()) # this target's own token buckets
+
+        self.m_MaxQueued,self.m_DropPolicy = Configuration.get().GetTargetQueueSettings(ip,Port)
+
+        self.m_SendEngine = None
+        if Configuration.get().GetSendEngine(): # one thread sends for every target
+            from Helpers import SendEngine
+            self.m_SendEngine = SendEngine.get()
+            self.m_SendEngine.AddTarget(self)
+            return
 
         try:
             self.m_socket = socket.socket(socket.AF_INET,socket.SOCK_DGRAM,socket.IPPROTO_UDP)
@@ -67,16 +125,60 @@ class Target(ConnectionPoint.ConnectionPoint):
     def getResolvedIP(self):
         return self.m_IP_InUse
 
-    def Send(self,buffer,ignoreTimeout=False):
+    # encoded is buffer already in utf-8 bytes, is shared with other targets so never modified
+    # returns True if queued, False if timed out, QUEUE_FULL if dropped because the queue is full
+    def Send(self,buffer,ignoreTimeout=False,encoded=None):
         timedOut = self.__CheckForTimeout()
         if False == ignoreTimeout and True == timedOut: #some messages (like connection info to Marvin, should always go)
             return False
 
+        key = None
+        if DropPolicy.KeepLatest == self.m_DropPolicy and not buffer.startswith(GROUP_START,len(XML_HEADER)):
+            match = _DatapointKeyPattern.search(buffer)
+            if None != match:
+                key = match.group(1) + ":" + match.group(2)
+
         self.m_objLockDict.acquire()
-        self.m_SendList.append(buffer)
-        self.m_objLockDict.release() 
+        try:
+            if len(self.m_SendList) >= self.m_MaxQueued:
+                if not self.__HandleFullQueue(buffer,encoded,key):
+                    return QUEUE_FULL
+
+            else:
+                entry = [buffer,encoded]
+                self.m_SendList.append(entry)
+                if None != key:
+                    self.m_QueuedByID[key] = entry
+
+            self.m_SendSignal.notify()
+
+        finally:
+            self.m_objLockDict.release() 
+
+        if None != self.m_SendEngine:
+            self.m_SendEngine.Wake(self)
+
         return True
 
+    # must hold lock, returns True if the buffer made it into the queue
+    def __HandleFullQueue(self,buffer,encoded,key):
+        self.m_PacketsDropped += 1
+        Statistics.GetStatistics().OnPacketDropped()
+
+        if DropPolicy.DropOldest == self.m_DropPolicy:
+            self.m_SendList.popleft()
+            self.m_SendList.append([buffer,encoded])
+            return True
+
+        if DropPolicy.KeepLatest == self.m_DropPolicy and None != key and key in self.m_QueuedByID:
+            self.m_QueuedByID[key][:] = [buffer,encoded] # old value never got sent, send the latest in its place
+            return True
+
+        return False # drop newest
+
+    def GetQueueDepth(self):
+        return len(self.m_SendList)
+
     def __CheckForTimeout(self):
         from Helpers import Configuration
 
@@ -103,6 +205,11 @@ class Target(ConnectionPoint.ConnectionPoint):
         self.m_hasTimedOut = False
         self.LastPacket = None
 
+    # in an ingest process the main Oscar gets the heartbeats, this keeps the copy of the target in step
+    def MirrorWatchdogState(self,hasTimedOut):
+        self.m_lastHeartbeat = Time.GetCurrMS()
+        self.m_hasTimedOut = hasTimedOut
+
     def StrokeWatchdogTimer(self):
         if True == self.m_CanTimeout:
             self.m_lastHeartbeat = Time.GetCurrMS()
@@ -130,68 +237,189 @@ class Target(ConnectionPoint.ConnectionPoint):
     
     #actual thread proc to send the data
     def WorkerProc(self,fnKillSignalled,userData):
-        #sequentialSent = 0 - experiment to reduce CPU utilization, but I think it was a bad idea now
         while not fnKillSignalled(): # run until signalled to end - call passed function to check for the signal
-            if self.alternateWorker():
-                pass
-                #sequentialSent +=1
-
-            else:
-                Sleep.SleepMs(100) # no data to send, so rest for a while
-                #sequentialSent = 0
+            self.m_objLockDict.acquire()
+            if len(self.m_SendList) == 0:
+                self.m_SendSignal.wait(Target.WakeupInterval) # sleep until there is something to send
+            self.m_objLockDict.release()
 
-            #if sequentialSent > 10:
-                #Sleep.SleepMs(10) # sent 10 packets without a rest, take a snooze
-             #   sequentialSent = 0
+            self.alternateWorker()
 
         # all done, so close things down
         if None != self.m_socket:
             self.m_socket.close()
 
     def StopProcessing(self):
+        if None != self.m_SendEngine:
+            self.m_SendEngine.RemoveTarget(self)
+            return
+
         ThreadManager.GetThreadManager().StopThread(self.threadName)
         ThreadManager.GetThreadManager().RemoveThread(self.threadName)
 
+    # returns the packet without the xml header if it can go in an <OscarGroup>, otherwise None
+    def __GetGroupableBody(self,buffer):
+        if buffer.startswith(XML_HEADER):
+            body = buffer[len(XML_HEADER):]
+        else:
+            body = buffer
 
-    def alternateWorker(self):  ## Maybe have one thread that goes and
-        self.m_objLockDict.acquire() # thread safety
+        if body.startswith("<Oscar Type=\"Data\">"):
+            return body
 
-        if len(self.m_SendList) == 0: # rest if nothing to send, or sent a bunch of packets without a sleep
-            dataToProcess = False
+        if body.startswith(GROUP_START) and body.endswith(GROUP_END):
+            return body[len(GROUP_START):-len(GROUP_END)]
 
-        else:
-            buffer = self.m_SendList[0]
-            del self.m_SendList[0]
-            dataToProcess = True
+        return None # control packet, always goes on its own
+
+    # packs data packets into as few <OscarGroup> packets as possible, keeping everything in order
+    # sendList is (buffer,encoded,packetCount) entries, packets sent as they came in keep their encoded bytes
+    def __Coalesce(self,sendList):
+        retList = []
+        pending = []
+        pendingSize = len(XML_HEADER) + len(GROUP_START) + len(GROUP_END)
+        emptySize = pendingSize
+
+        for sendEntry in sendList:
+            body = self.__GetGroupableBody(sendEntry[0])
+            if None != body and (0 == len(pending) or pendingSize + len(body) <= self.m_CoalesceMaxSize):
+                pending.append((sendEntry,body))
+                pendingSize += len(body)
+                continue
+
+            if 1 == len(pending):
+                retList.append(pending[0][0]) # just one, send it as it came in
+            elif len(pending) > 1:
+                retList.append((XML_HEADER + GROUP_START + "".join([entry[1] for entry in pending]) + GROUP_END,None,sum([entry[0][2] for entry in pending])))
+
+            pending = []
+            pendingSize = emptySize
+
+            if None == body:
+                retList.append(sendEntry)
+            else:
+                pending.append((sendEntry,body))
+                pendingSize += len(body)
+
+        if 1 == len(pending):
+            retList.append(pending[0][0])
+        elif len(pending) > 1:
+            retList.append((XML_HEADER + GROUP_START + "".join([entry[1] for entry in pending]) + GROUP_END,None,sum([entry[0][2] for entry in pending])))
+
+        return retList
 
+    # takes everything that is queued up, returns list of (buffer,encoded,packetCount) or None
+    # packetCount is how many packets went into the entry, more than 1 once coalesced
+    def TakeSendList(self):
+        self.m_objLockDict.acquire() # thread safety
+        if len(self.m_SendList) == 0:
+            sendList = None
+        else:
+            sendList = [(entry[0],entry[1],1) for entry in self.m_SendList]
+            self.m_SendList = collections.deque()
+            self.m_QueuedByID = {}
         self.m_objLockDict.release() 
 
-        if dataToProcess:
-            if None == self.m_IP_InUse:
-                Log.getLogger().info("Getting IP address for host: " + self.ConfigurationDefinedTarget)
-                try:
-                    self.m_LastDNSResolution = Time.GetCurrMS()
-                    self.m_IP_InUse = socket.gethostbyname(self.ConfigurationDefinedTarget)  #use this for looking at heartbeats
+        return sendList
+
+    # DNS lookup, can take a while
+    def ResolveAddress(self):
+        Log.getLogger().info("Getting IP address for host: " + self.ConfigurationDefinedTarget)
+        try:
+            self.m_LastDNSResolution = Time.GetCurrMS()
+            self.m_IP_InUse = socket.gethostbyname(self.ConfigurationDefinedTarget)  #use this for looking at heartbeats
+
+        except Exception as _:
+            self.m_IP_InUse = self.ConfigurationDefinedTarget
+
+    # None if not looked up yet
+    def GetSendAddress(self):
+        if None == self.m_IP_InUse:
+            return None
+        return (self.m_IP_InUse,self.getPort())
+
+    # resolves the address if need be and coalesces, returns (address,sendList)
+    # address is None if the send engine is still looking it up
+    def PrepareSendList(self,sendList):
+        if None == self.m_IP_InUse:
+            if None != self.m_SendEngine:
+                self.m_SendEngine.ResolveAddress(self) # done on another thread, so everyone else keeps sending
+            else:
+                self.ResolveAddress()
+
+        if self.m_CoalesceMaxSize > 0 and len(sendList) > 1:
+            sendList = self.__Coalesce(sendList)
 
-                except Exception as _:
-                    self.m_IP_InUse = self.ConfigurationDefinedTarget
+        return (self.GetSendAddress(),sendList)
 
-            try:
-                self.m_socket.sendto(bytes(buffer,'utf-8'),(self.m_IP_InUse,self.getPort()))
-                self.m_PacketsSent +=1
-                self.m_BytestSent += len(buffer)
+    # returns seconds to wait before sending size bytes, 0 if it can go now.
+    # The wait is recorded once the tokens are got, from when this target was 1st told to wait
+    def AcquireSendTokens(self,size):
+        wait = RateLimiter.Acquire(self.m_RateLimiter,size)
+        if wait > 0:
+            if None == self.m_RateLimitParkedAt:
+                self.m_RateLimitParkedAt = time.monotonic()
 
-            except Exception as ex:
-                Log.getLogger().info("It appears that the target [" + self.ConfigurationDefinedTarget + "] has went away.")
-                self.m_objLockDict.acquire()
-                Statistics.GetStatistics().OnPacketDropped(len(self.m_SendList) + 1)
-                self.m_SendList.clear()
-                self.m_objLockDict.release()
+        elif None != self.m_RateLimitParkedAt:
+            waitMS = (time.monotonic() - self.m_RateLimitParkedAt) * 1000.0
+            self.m_RateLimitParkedAt = None
+            self.m_RateLimitWaitTime += waitMS
+            Statistics.GetStatistics().OnRateLimitWait(waitMS)
 
+        return wait
 
+    def OnPacketSent(self,buffer):
+        self.m_PacketsSent +=1
+        self.m_BytestSent += len(buffer)
+
+    # couldn't send, so toss what is queued as well as the send list entries left unsent
+    def OnSendFailed(self,unsentList):
+        Log.getLogger().info("It appears that the target [" + self.ConfigurationDefinedTarget + "] has went away.")
+        self.m_objLockDict.acquire()
+        dropped = len(self.m_SendList) + sum([entry[2] for entry in unsentList])
+        self.m_PacketsDropped += dropped
+        Statistics.GetStatistics().OnPacketDropped(dropped)
+        self.m_SendList.clear()
+        self.m_QueuedByID = {}
+        self.m_RateLimitParkedAt = None # nothing left to wait for
+        self.m_objLockDict.release()
+
+    # sends everything that is queued up
+    def alternateWorker(self):
+        sendList = self.TakeSendList()
+
+        if None != sendList:
+            address,sendList = self.PrepareSendList(sendList)
+            sentCount = 0
+            for buffer,encoded,_ in sendList:
+                try:
+                    if None == encoded:
+                        encoded = buffer.encode('utf-8')
+                    if self.m_RateLimited:
+                        wait = self.AcquireSendTokens(len(encoded))
+                        while wait > 0: # only this target waits, everyone else keeps sending
+                            time.sleep(wait)
+                            wait = self.AcquireSendTokens(len(encoded))
+                    self.m_socket.sendto(encoded,address)
+                    self.OnPacketSent(buffer)
+                    sentCount += 1
+
+                except Exception as ex:
+                    self.OnSendFailed(sendList[sentCount:])
+                    break
+
+        self.Housekeeping()
+        return None != sendList
+
+    # DNS refresh and dynamic target removal, done every so often even if nothing is sent
+    def Housekeeping(self):
         if self.m_LastDNSResolution + self.m_DNSResolutionPeriod < Time.GetCurrMS() and self.m_hasTimedOut == True:
-            self.m_IP_InUse = None  # Force a DNS resolution, may help when move laptop and gets new address -
-                                    # eventually
+            if None == self.m_SendEngine:
+                self.m_IP_InUse = None  # Force a DNS resolution, may help when move laptop and gets new address -
+                                        # eventually
+            else:
+                self.m_LastDNSResolution = Time.GetCurrMS() # don't ask again while it is being looked up
+                self.m_SendEngine.ResolveAddress(self) # old address is used until it is done
 
 #        if self.m_hasTimedOut:
 #            Log.getLogger().error("Timed out" + str(ConnectionType.DynamicMarvin))
@@ -200,6 +428,4 @@ class Target(ConnectionPoint.ConnectionPoint):
             self.MarkedForRemoval = True
             self.Type +=1 
 
-        return dataToProcess
-
 
@@ -25,14 +25,9 @@ from Util import Sleep
 from Helpers import Statistics
 from Helpers import Target
 from Helpers import ThreadManager
+from Helpers import ShuntFile
 import threading
 import sys
-import re
-import time
-import os
-from os import remove, close
-from tempfile import mkstemp
-from shutil import move, copy
 
  
 class TargetManager():
@@ -47,18 +42,10 @@ class TargetManager():
         self._UpstreamTargets = {} # data being sent towards Minion
         self._DownstreamTargets = {} # data being sent torwads Marvin
         TargetManager._instance = self
-    
 
-        from Helpers import Configuration
-
-        self.__UseGoverner = Configuration.get().GetUseGoverner()
-        self.__GovernerThreshhold = Configuration.get().GetGovernerThreshhold()
-        self.__GovernerBackoffPeriod = Configuration.get().GetGovernerBackoffPeriod()
-        self.__GovernerMaxPacketsBeforeRest = Configuration.get().GetGovernerMaxPacketsBeforeRest()
-        self.__PacketSentSinceRest = 0
-        self.__BytestSentSinceRest = 0
-        self.__ShuntedDataByFile = {}
+        self.__ShuntFiles = {} # filename --> ShuntFile, contents kept in memory and written periodically
         self.__ShuntLock = threading.Lock()
+        self.__ShuntForwarder = None # in an ingest process, shunt files are written by the main Oscar
         self.__ShuntThreadCreated = False
         self.__DownstreamPacketQueue = []
         self.__DownstreamPacketLock = threading.Lock()
@@ -117,32 +104,6 @@ class TargetManager():
         del self._DownstreamTargets[TargetID]
 
 
-    def __ResetGovernerStats(self):
-        self.__PacketSentSinceRest = 0
-        self.__BytestSentSinceRest = 0
-
-    def __GovernerRest(self):
-        Sleep.SleepMs(self.__GovernerBackoffPeriod)
-
-    ## This is to make sure we don't overflow TX socket buffer
-    def __Governer(self,sentSize):
-        self.__PacketSentSinceRest += 1
-        self.__BytestSentSinceRest += sentSize
-        if self.__PacketSentSinceRest >= self.__GovernerMaxPacketsBeforeRest:
-            self.__GovernerRest()
-            self.__PacketSentSinceRest = 0
-            #Log.getLogger().debug("sleeping - Packets")
-
-            return
-
-        if self.__BytestSentSinceRest >= self.__GovernerThreshhold:
-            #Log.getLogger().debug("sleeping - Buff Size: " +
-            #str(self.__BytestSentSinceRest))
-
-            self.__GovernerRest()
-            self.__ResetGovernerStats()
-            return
-
     # Towards a Marvin
     def SendToDownstreamTarget(self,sendBuffer,TargetID,ignoreTimeout):
         target = self.GetDownstreamTarget(TargetID)
@@ -151,15 +112,18 @@ class TargetManager():
             Log.getLogger().error("Attempted to send to invalid downstream target id: " + TargetID)
             return False
 
-        if True == target.Send(sendBuffer,ignoreTimeout):
+        return self.__SendToDownstreamTarget(target,sendBuffer,None,ignoreTimeout)
+
+    # encoded is the utf-8 bytes of sendBuffer, if already done, so it can be shared by all targets
+    def __SendToDownstreamTarget(self,target,sendBuffer,encoded,ignoreTimeout):
+        result = target.Send(sendBuffer,ignoreTimeout,encoded)
+        if True == result:
             Statistics.GetStatistics().OnPacketSentDownstream(sendBuffer)
-            if self.__UseGoverner:
-                self.__Governer(len(sendBuffer))
             return True
 
-        else:
+        if False == result: # timed out, a full queue was already counted by the target
             Statistics.GetStatistics().OnPacketDropped()
-            return False
+        return False
 
     # towards a Minion
     def SendToUpstreamTarget(self,sendBuffer,TargetID):
@@ -257,9 +221,12 @@ class TargetManager():
         from Helpers import Configuration
         sentCount = 0
 
-        for targetKey in self._DownstreamTargets.keys():
-            if True == self.SendToDownstreamTarget(sendBuffer,targetKey,ignoreTimeout):
-                sentCount += 1
+        targetList = list(self._DownstreamTargets.values()) # snapshot, targets can come and go while sending
+        if len(targetList) > 0:
+            encoded = sendBuffer.encode('utf-8') # once, every target queues the same bytes
+            for objTarget in targetList:
+                if True == self.__SendToDownstreamTarget(objTarget,sendBuffer,encoded,ignoreTimeout):
+                    sentCount += 1
 
         if sentCount > 0:
             Statistics.GetStatistics().OnPacketBroadcastDownstream()
@@ -282,6 +249,12 @@ class TargetManager():
         return sentCount
 
 
+    # shunt a datapoint that didn't come in as XML
+    def ShuntData(self,Namespace,ID,Value):
+        from Helpers import Configuration
+        if Configuration.get().GetShunting():
+            self._ShuntWorker(Namespace,ID,Value)
+
     def HandleShuntingData(self,node):
         try:
             namespace = node.getElementsByTagName('Namespace')[0].firstChild.nodeValue
@@ -299,65 +272,11 @@ class TargetManager():
         config = Configuration.get()
 
         Namespace = config.HandleBITWNamespace(Namespace)
-        lowerNS = Namespace.lower()
-
-        lowerID = ID.lower()
-        key = lowerNS + lowerID
 
         try:
-            if key in config.GetNotShuntedMap():
-                return # already know this one isn't shunted
-
-            elif key in config.GetResolvedShuntMap():
-                self.Shunt(Namespace,ID,config.GetResolvedShuntMap()[key],Value)
-                return
-
-            elif lowerNS in config.GetShuntMap():
-                nsMap = config.GetShuntMap()[lowerNS]
-                if id in nsMap: # matches a shunt, but wasn't in resolved
-                    dataTuple = nsMap[id]
-                    config.GetResolvedShuntMap()[key] = dataTuple
-                    self.Shunt(Namespace,ID,dataTuple,Value)
-                    return
-
-                for idKey, dataTuple in nsMap.items():
-                    idPattern = dataTuple[3]
-                    matched = idPattern.match(lowerID)
-                    if None != matched:
-                        #Found a match!
-                        dataTuple = nsMap[idKey]
-                        config.GetResolvedShuntMap()[key] = dataTuple
-                        self.Shunt(Namespace,ID,dataTuple,Value)
-                        return
-
-
-            else:
-                for nsKey in config.GetShuntMap().keys():
-                    nsPattern = re.compile(nsKey) 
-                    matched = nsPattern.match(lowerNS)          
-                    if None != matched:  # Matched on RegEx Namespace, now check for ID
-                        nsMap = config.GetShuntMap()[nsKey]                    
-                        if id in nsMap: # ID isn't a RegEx
-                            dataTuple = nsMap[id]
-                            config.GetResolvedShuntMap()[key] = dataTuple
-                            self.Shunt(Namespace,ID,dataTuple,Value)
-                            return
-
-                        # see if ID is a regEx match
-                        for idKey, dataTuple in nsMap.items():
-                            idPattern = dataTuple[3]
-                            matched = idPattern.match(lowerID)
-                        
-                            if None != matched:
-                                #Found a match!
-                                dataTuple = nsMap[idKey]
-                                config.GetResolvedShuntMap()[key] = dataTuple
-                                self.Shunt(Namespace,ID,dataTuple,Value)
-                                return
-                                
-                config.GetNotShuntedMap()[key] = key # didn't match any filters, so add to a map so we don't do all the checking
-                                                     # again
-
+            dataTuple = config.ResolveShunt(Namespace,ID) # rules are pre-compiled, and result cached
+            if None != dataTuple:
+                self.Shunt(Namespace,ID,dataTuple,Value)
 
         except Exception as Ex:
              Log.getLogger().error("Unknown error in _ShuntWorker: " + str(Ex))
@@ -403,19 +322,27 @@ class TargetManager():
                 return
 
 
+    def SetShuntForwarder(self,fnForward):
+        self.__ShuntForwarder = fnForward
+
     def Shunt(self,namespace,ID,dataTuple,Value):
+        if None != self.__ShuntForwarder:
+            self.__ShuntForwarder(namespace,ID,Value)
+            return
 
         Statistics.GetStatistics().OnPacketShunted()
-        newTuple = (namespace,ID,dataTuple[4],Value)
         shuntFile = dataTuple[2]
 
         self.__ShuntLock.acquire()
 
         try:
-            if not shuntFile in self.__ShuntedDataByFile:
-                self.__ShuntedDataByFile[shuntFile] = []
+            if not shuntFile in self.__ShuntFiles:
+                self.__ShuntFiles[shuntFile] = ShuntFile.ShuntFile(shuntFile)
 
-            self.__ShuntedDataByFile[shuntFile].append(newTuple)
+            if True == dataTuple[4]: # history
+                self.__ShuntFiles[shuntFile].AddHistory(namespace,ID,Value)
+            else:
+                self.__ShuntFiles[shuntFile].SetValue(namespace,ID,Value)
 
         except Exception as Ex:
             Log.getLogger().info("Unknown in Shunt function:  " + str(Ex))
@@ -429,6 +356,20 @@ class TargetManager():
             ThreadManager.GetThreadManager().CreateThread(threadName,self.ShuntWorkerProc)
             ThreadManager.GetThreadManager().StartThread(threadName)
 
+    # writes out every shunt file that changed since last time, once each
+    def FlushShuntFiles(self):
+        self.__ShuntLock.acquire()
+        try:
+            dirtyList = [(objFile.Filename,objFile.TakeContents()) for objFile in self.__ShuntFiles.values() if objFile.Dirty]
+        finally:
+            self.__ShuntLock.release()
+
+        for filename,contents in dirtyList: # file I/O without holding the lock
+            append,text = contents
+            try:
+                ShuntFile.WriteShuntFile(filename,append,text)
+            except Exception as Ex:
+                Log.getLogger().error("Unable to write shunt file " + filename + ": " + str(Ex))
 
     def ShuntWorkerProc(self,fnKillSignalled,userData):
         from Helpers import Configuration
@@ -436,99 +377,20 @@ class TargetManager():
         sleepTime = Configuration.get().GetShuntWorkerInterval()
         try:
             while not fnKillSignalled(): # run until signalled to end - call passed function to check for the signal
-                self.__ShuntLock.acquire()
-                DupMap = None
-                try:
-                    DupMap = self.__ShuntedDataByFile
-                    self.__ShuntedDataByFile = {}
-                except Exception as Ex:
-                    Log.getLogger().info("Unknown error in Shunt Worker Proc:  " + str(Ex))
-        
-                finally:
-                    self.__ShuntLock.release()
-
-                if None != DupMap:
-                    for file in DupMap.keys():
-                        tfh, tfh_path = mkstemp() # create temp file, copy target file to it then do all updates and copy it
-                                                  # back to original
-                        close(tfh)
-
-                        if os.path.exists(file):
-                            copy(file,tfh_path) #copy contents to temp file
-
-                        mapEntry = DupMap[file]
-                        for shuntEntry in mapEntry:
-                            namespace = shuntEntry[0]
-                            ID = shuntEntry[1]
-                            History = shuntEntry[2]
-                            Value = shuntEntry[3]
-                            if True == History:
-                                self.ShuntHistory(namespace,ID,Value,tfh_path)
-                            else:
-                                self.ShuntDynamicCollectorStyle(namespace,ID,Value,tfh_path)
-
-                        #all done processing this file, so copy temp file to
-                        #real file
-                        #Remove original file
-                        try:
-                            remove(file)
-                        except Exception as Ex:
-                            pass
-                        #Move new file
-                        move(tfh_path, file)
-
-                        
-            Sleep.SleepMs(sleepTime)
+                Sleep.SleepMs(sleepTime)
+                self.FlushShuntFiles()
+
+            self.FlushShuntFiles() # anything that came in while asleep
 
         except Exception as Ex:
             Log.getLogger().info("Unknown error in Shunt Worker Proc:  " + str(Ex))      
 
-
-    def ShuntDynamicCollectorStyle(self,namespace,ID,Value,shuntFile):
-
-        fpShuntFile, absolute_path = mkstemp()
-        
-        searchStr = namespace + "." + ID + "="
-        Entry = searchStr + Value + "\n"
-        Found = False
-        with open(absolute_path,'w') as fpTargetFile:
-            try:
-                with open(shuntFile) as fpInputFile:
-                    for line in fpInputFile:
-                        if not Found and searchStr in line:
-                            fpTargetFile.write(Entry)
-                            Found = True
-                        else:
-                            fpTargetFile.write(line)
-
-                    if not Found:
-                        fpTargetFile.write(Entry)
-
-            except Exception as _: # file went away while running
-                    fpTargetFile.write("##### Generated by Oscar Shunt #####\n")
-                    fpTargetFile.write(Entry)
-
-
-        close(fpShuntFile)
-        #Remove original file
-        try:
-            remove(shuntFile)
-        except Exception as _:
-            pass
-        #Move new file
-        move(absolute_path, shuntFile)
-
     def DebugRefresh(self):
         for targ in self._UpstreamTargets:
             self._UpstreamTargets[targ].m_InitialRefreshSent = False
             self._UpstreamTargets[targ].StrokeWatchdogTimer()
             return #only need it for the 1st one
 
-    def ShuntHistory(self,namespace,ID,value,fileName):
-        strData = time.strftime("%c") + " " + namespace + "." + ID + "=" + value + "\n"
-        with open(fileName,"a") as sf:
-            sf.write(strData)
-
 def GetTargetManager():
     if TargetManager._instance == None:
         TargetManager._instance = TargetManager()
@@ -30,6 +30,7 @@ else:
     from Data.ConnectionPoint import ConnectionType
     from Helpers.Playback import RepeatMode
     from Helpers import Server
+    from Helpers import IngestShard
     from Helpers import ThreadManager
     from Util import Sleep
     from Util import Time
@@ -39,6 +40,7 @@ else:
     from Helpers import GuiMgr
     from Helpers import VersionMgr
     from Helpers import Playback
+    from Helpers import Recorder
 
 def existFile(filename):
     if not os.path.exists(filename):
@@ -46,31 +48,103 @@ def existFile(filename):
         return False
     return True
 
-def performBatchConvert(filematch):
-    import os
-    import fnmatch
+# converts a single recording to csv, returns (inputFilename,csvFilename,error,seconds)
+# error is None if it worked
+def convertToCSV(inputFilename,include,exclude):
+    startTime = Time.GetCurrMS()
+    baseName,_ = os.path.splitext(inputFilename)
+    csvFilename = baseName+".csv"
+    error = None
+    try:
+        if Playback.get().ReadFromFile(inputFilename):
+            Playback.get().WriteCSVFile(csvFilename,1,include,exclude)
+        else:
+            error = "unable to read file"
+    except Exception as Ex:
+        error = str(Ex)
+
+    Playback.get().Clear()
+    return (inputFilename,csvFilename,error,(Time.GetCurrMS() - startTime)/1000.0)
 
+# runs in a child process, which only lives for the one file so a bad file can't hurt the others
+def batchConvertWorker(workItem):
+    inputFilename,include,exclude = workItem
     GuiMgr.Initialize(GuiMgr.UI.NONE,None,None)
+    try:
+        return convertToCSV(inputFilename,include,exclude)
+    finally:
+        GuiMgr.Quit()
+
+def performBatchConvert(filematch,include=None,exclude=None,workerCount=None):
+    import fnmatch
+    import multiprocessing
+
     #dir_path = os.path.dirname(os.path.realpath(filematch))
-    convertCount = 0
     rel_path,filename = os.path.split(filematch)
     if len(rel_path) < 1:
         rel_path='.'
-    for file in os.listdir(rel_path):
-        if fnmatch.fnmatch(file, filename):
-            inputFilename = os.path.join(rel_path,file)
-            if Playback.get().ReadFromFile(inputFilename):
-                baseName,_ = os.path.splitext(inputFilename)
-                csvFilename = baseName+".csv"
-                Playback.get().WriteCSVFile(csvFilename,1)
-                print("{0} --> {1}".format(inputFilename,csvFilename))
+    fileList = [os.path.join(rel_path,file) for file in os.listdir(rel_path) if fnmatch.fnmatch(file, filename)]
+
+    if None == workerCount or workerCount < 1:
+        workerCount = multiprocessing.cpu_count()
+    workerCount = min(workerCount,max(len(fileList),1))
+
+    startTime = Time.GetCurrMS()
+    convertCount = 0
+    failCount = 0
+
+    def report(result):
+        inputFilename,csvFilename,error,seconds = result
+        if None == error:
+            print("[{0}/{1}] {2} --> {3} ({4:.1f}s)".format(convertCount + failCount,len(fileList),inputFilename,csvFilename,seconds))
+        else:
+            print("[{0}/{1}] {2} FAILED: {3} ({4:.1f}s)".format(convertCount + failCount,len(fileList),inputFilename,error,seconds))
+
+    if workerCount < 2:
+        GuiMgr.Initialize(GuiMgr.UI.NONE,None,None)
+        for inputFilename in fileList:
+            result = convertToCSV(inputFilename,include,exclude)
+            if None == result[2]:
                 convertCount += 1
-                Playback.get().Clear()
-    print("Converted {0} files".format(convertCount))
-    GuiMgr.Quit()
+            else:
+                failCount += 1
+            report(result)
+        GuiMgr.Quit()
+
+    else:
+        print("Converting {0} files using {1} processes".format(len(fileList),workerCount))
+        pool = multiprocessing.Pool(workerCount,maxtasksperchild=1)
+        try:
+            for result in pool.imap_unordered(batchConvertWorker,[(inputFilename,include,exclude) for inputFilename in fileList]):
+                if None == result[2]:
+                    convertCount += 1
+                else:
+                    failCount += 1
+                report(result)
+            pool.close()
+
+        except KeyboardInterrupt:
+            pool.terminate()
+            raise
+
+        except Exception as Ex: # a worker process died outright
+            print("Batch convert aborted: " + str(Ex))
+            pool.terminate()
+
+        pool.join()
+
+    print("Converted {0} files, {1} failed, in {2:.1f} seconds".format(convertCount,failCount,(Time.GetCurrMS() - startTime)/1000.0))
    
     
 
+def performConvert(inputFilename,outputFilename):
+    GuiMgr.Initialize(GuiMgr.UI.NONE,None,None)
+    if Playback.get().ReadFromFile(inputFilename):
+        Playback.get().WriteToFile(outputFilename)
+        print("{0} --> {1}".format(inputFilename,outputFilename))
+        Playback.get().Clear()
+    GuiMgr.Quit()
+
 def HandleCommandlineArguments():
     parser = argparse.ArgumentParser(description='Oscar the wonderful')
 
@@ -86,6 +160,8 @@ def HandleCommandlineArguments():
 
     group_Play = parser.add_argument_group('Playback',"Parameters to be used when you use the --playback option")
     group_Play.add_argument("-s","--speed",help='specifies payback speed',type=float)
+    group_Play.add_argument("-at","--at",help='start playback this many seconds into the recording',type=float)
+    group_Play.add_argument("-af","--asfast",help='playback as fast as possible, ignoring recorded times (for load testing)',action="store_true")
 
     foo = group_Play.add_mutually_exclusive_group()
     foo.add_argument("-ex","--exit",help="exit after playback finished,not valid with repeat or loop",action="store_true")
@@ -98,6 +174,10 @@ def HandleCommandlineArguments():
     parser.add_argument("-t","--time",help='specifies time (in minutes) to run before automatically exiting, used with Recording and Playback',type=int)
     parser.add_argument("-ng","--nogui",help='run without GUI',action="store_true")
     parser.add_argument("-bc","--batchconvert",help="batch convert biff files to csv",type=str)
+    parser.add_argument("-inc","--include",help="with --batchconvert, only export IDs matching these patterns (ID or Namespace:ID, wildcards ok)",nargs='+',type=str)
+    parser.add_argument("-exc","--exclude",help="with --batchconvert, do not export IDs matching these patterns (ID or Namespace:ID, wildcards ok)",nargs='+',type=str)
+    parser.add_argument("-bw","--batchworkers",help="number of processes used by --batchconvert (default is one per CPU, 1 converts in this process)",type=int)
+    parser.add_argument("-cv","--convert",help="convert a recording to the format of the output file extension (.biff, .bifc or .bifm)",nargs=2,metavar=('INPUT','OUTPUT'),type=str)
     
     try:    
         args = parser.parse_args()
@@ -117,7 +197,12 @@ def HandleCommandlineArguments():
         Log.setLevel(logging.DEBUG)
 
     if None != args.batchconvert:
-        performBatchConvert(args.batchconvert)
+        performBatchConvert(args.batchconvert,args.include,args.exclude,args.batchworkers)
+        return False
+
+    if None != args.convert:
+        if existFile(args.convert[0]):
+            performConvert(args.convert[0],args.convert[1])
         return False
 
     conf = Configuration.get()
@@ -150,6 +235,11 @@ def HandleCommandlineArguments():
     if None != args.speed:
         conf.SetPlaybackSpeed(args.speed)
 
+    conf.SetPlaybackAsFastAsPossible(args.asfast)
+
+    if None != args.at:
+        conf.SetPlaybackStartOffset(args.at)
+
     conf.SetAutrunLocations(args.begin,args.end)
 
     if args.repeat:
@@ -172,7 +262,8 @@ def StartupWorkerProc(fnKillSignalled,userData):
     Sleep.SleepMs(500)
     downstreamServer.Start()
     upstreamServer.DropPackets(True)
-    upstreamServer.Start()
+    if not IngestShard.IsShared(): # otherwise the ingest processes are listening
+        upstreamServer.Start()
 
     Watchdog.ConnectionUpdateTimer()
     Watchdog.WatchdogTimer()
@@ -183,11 +274,14 @@ def StartupWorkerProc(fnKillSignalled,userData):
         #GuiMgr.OnStopPlayback()
         #GuiMgr.OnStopRecording(True) #drop all recorded packets
         GuiMgr.OnSetPlaybackSpeed(Configuration.get().GetPlaybackSpeed())
+        Playback.get().SetAsFastAsPossible(Configuration.get().GetPlaybackAsFastAsPossible())
         ss = Configuration.get().GetAutorunLocations()
 
         #GuiMgr.OnEnablePlayback()
         GuiMgr.ReadFromFile(Configuration.get().GetAutorunFilename())
         GuiMgr.OnStopPlayback()
+        if conf.GetPlaybackStartOffset() > 0:
+            Playback.get().SeekToTime(conf.GetPlaybackStartOffset() * 1000) # uses the time index, rather than going through the data
         Sleep.SleepMs(100) # let gui worker threads catch up, so gui updates properly
         GuiMgr.OnStartPlayback()
         GuiMgr.OnSetRepeatMode(Configuration.get().GetAutoRunMode(),ss[0],ss[1])
@@ -206,9 +300,11 @@ def StartupWorkerProc(fnKillSignalled,userData):
 
         Log.getLogger().info("Shutting down after time period")
         if conf.GetRecordFilename():  # was a recording session, so quit after that time
+            streamed = Recorder.get().IsStreaming()
             GuiMgr.OnStopRecording()
-            GuiMgr.WriteToFile(conf.GetRecordFilename())
-            Log.getLogger().info("Saving Recorded data to file: " + conf.GetRecordFilename())
+            if not streamed: # if streamed, it is already in the file
+                GuiMgr.WriteToFile(conf.GetRecordFilename())
+                Log.getLogger().info("Saving Recorded data to file: " + conf.GetRecordFilename())
 
         GuiMgr.Quit()
 
@@ -234,7 +330,7 @@ def main():
     proxyClient = None
     goodToGo = True
 
-    if upstreamServer.Start():
+    if IngestShard.StartIngest(upstreamServer): # may be split across processes
         if None == downstreamConnInfo:
             return
 